@@ -0,0 +1,156 @@
+"""
+Benchmark: bulk ledger maintenance, per-row triggers vs. set-based recomputation.
+
+Seeds a temporary kaji.db with synthetic purchases, then runs each bulk operation
+on a fresh copy twice:
+  - "triggers":  the plain DELETE/UPDATE statement, summaries kept by the per-row triggers
+  - "set_based": ledger_maintenance (triggers suspended, affected months recomputed)
+and checks that both leave the summaries identical to a full rebuild.
+
+    python bench/bench_ledger_maintenance.py --purchases 20000 --out result.json
+"""
+import argparse
+import json
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(APP_DIR))
+
+import db  # noqa: E402
+import ledger_maintenance  # noqa: E402
+
+
+def seed(n_purchases: int, n_genres: int, n_items: int, n_months: int, rng: random.Random):
+    db.init_db()
+    genres = [db.ensure_genre(f"Genre {g}") for g in range(n_genres)]
+    stores = [db.ensure_store(f"Store {s}") for s in range(5)]
+    payments = [db.ensure_payment(name) for name in ("cash", "card", "bank", "pay")]
+    # skewed so that the first genre / item are the big ones
+    items = [db.ensure_item(genres[min(int(rng.expovariate(0.5)), n_genres - 1)], f"Item {i}", "pc")
+             for i in range(n_items)]
+    rows = []
+    for _ in range(n_purchases):
+        m = rng.randrange(n_months)
+        y, mo = 2015 + m // 12, m % 12 + 1
+        qty = rng.choice((1, 1, 2, 3))
+        total = round(rng.uniform(50, 3000), 0)
+        rows.append((items[min(int(rng.expovariate(0.02)), n_items - 1)], f"{y}-{mo:02d}-{rng.randint(1, 28):02d}",
+                     rng.choice(stores), qty, total, total / qty, rng.choice(payments)))
+    conn = db.get_conn()
+    conn.executemany("""
+        INSERT INTO purchases(item_id, date, store_id, qty, total_amount, unit_price, payment_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+    conn.commit()
+    conn.close()
+    return genres, items, payments
+
+
+def _snapshot():
+    conn = db.get_conn()
+    out = {t: sorted((r[0], r[1], *(round(x, 6) for x in r[2:])) for r in conn.execute(f"SELECT * FROM {t}"))
+           for t in ("monthly_genre_items", "monthly_genre_summary", "monthly_payment_summary")}
+    conn.close()
+    return out
+
+
+def _with_triggers(sql_steps):
+    def run():
+        conn = db.get_conn()
+        for sql, params in sql_steps:
+            conn.execute(sql, params)
+        conn.commit()
+        conn.close()
+    return run
+
+
+def operations(genres, items, payments):
+    g, it, (p_old, p_new) = genres[0], items[0], payments[:2]
+    return {
+        "delete_genre": (
+            _with_triggers([
+                ("DELETE FROM purchases WHERE item_id IN (SELECT id FROM items WHERE genre_id=?)", (g,)),
+                ("DELETE FROM items WHERE genre_id=?", (g,)),
+                ("DELETE FROM genres WHERE id=?", (g,)),
+            ]),
+            lambda: ledger_maintenance.delete_genre(g),
+        ),
+        "delete_item": (
+            _with_triggers([
+                ("DELETE FROM purchases WHERE item_id=?", (it,)),
+                ("DELETE FROM items WHERE id=?", (it,)),
+            ]),
+            lambda: ledger_maintenance.delete_item(it),
+        ),
+        "change_item_genre": (
+            _with_triggers([("UPDATE items SET genre_id=? WHERE id=?", (genres[-1], it))]),
+            lambda: ledger_maintenance.change_item_genre(it, genres[-1]),
+        ),
+        "reassign_payment": (
+            _with_triggers([("UPDATE purchases SET payment_id=? WHERE payment_id=?", (p_new, p_old))]),
+            lambda: ledger_maintenance.reassign_payment(p_old, p_new),
+        ),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Bulk ledger maintenance benchmark")
+    ap.add_argument("--purchases", type=int, default=20000)
+    ap.add_argument("--genres", type=int, default=10)
+    ap.add_argument("--items", type=int, default=300)
+    ap.add_argument("--months", type=int, default=120)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", type=Path, default=None, help="write the results as JSON")
+    args = ap.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="ledger-bench-") as tmp:
+        seeded = Path(tmp) / "seeded.db"
+        db.DB_PATH = seeded
+        genres, items, payments = seed(args.purchases, args.genres, args.items, args.months,
+                                       random.Random(args.seed))
+        conn = db.get_conn()
+        sizes = {
+            "genre_purchases": conn.execute(
+                "SELECT COUNT(*) FROM purchases p JOIN items i ON i.id=p.item_id WHERE i.genre_id=?",
+                (genres[0],)).fetchone()[0],
+            "item_purchases": conn.execute(
+                "SELECT COUNT(*) FROM purchases WHERE item_id=?", (items[0],)).fetchone()[0],
+            "payment_purchases": conn.execute(
+                "SELECT COUNT(*) FROM purchases WHERE payment_id=?", (payments[0],)).fetchone()[0],
+        }
+        conn.close()
+        print(f"{args.purchases} purchases; touched rows: {sizes}")
+
+        for name, (row_by_row, set_based) in operations(genres, items, payments).items():
+            timings = {}
+            snaps = {}
+            for label, fn in (("triggers", row_by_row), ("set_based", set_based)):
+                db.DB_PATH = Path(tmp) / f"{name}_{label}.db"
+                shutil.copy(seeded, db.DB_PATH)
+                t0 = time.perf_counter()
+                fn()
+                timings[label] = (time.perf_counter() - t0) * 1000.0
+                snaps[label] = _snapshot()
+                db.rebuild_monthly_summaries()
+                assert snaps[label] == _snapshot(), f"{name}/{label}: summaries drifted"
+            assert snaps["triggers"] == snaps["set_based"]
+            speedup = timings["triggers"] / timings["set_based"] if timings["set_based"] else None
+            results.append({"name": name, "purchases": args.purchases, **{f"{k}_ms": round(v, 2) for k, v in timings.items()},
+                            "speedup": round(speedup, 1) if speedup else None})
+            print(f"  {name:<18} triggers {timings['triggers']:>10.1f} ms   set_based {timings['set_based']:>8.1f} ms"
+                  f"   x{speedup:.1f}")
+
+    if args.out:
+        args.out.write_text(json.dumps({"args": {k: str(v) for k, v in vars(args).items()},
+                                        "touched": sizes, "results": results}, indent=2), encoding="utf-8")
+        print(f"wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
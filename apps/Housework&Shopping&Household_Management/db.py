@@ -86,6 +86,9 @@ def init_db():
     conn.commit()
     conn.close()
     _init_bs_tables()
+    _init_purchase_month()
+    _init_summary_triggers()
+    _init_ledger_version()
 
 def seed_minimal():
     conn = get_conn()
@@ -181,44 +184,21 @@ def insert_purchase(item_id: int, date_iso: str, store_id: int, qty: float, tota
     unit_price = total / qty if qty else 0.0
     conn = get_conn()
     cur = conn.cursor()
-
-    cur.execute("""
-        INSERT INTO purchases(item_id, date, store_id, qty, total_amount, unit_price, payment_id)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (item_id, date_iso, store_id, qty, total, unit_price, payment_id))
-
-    month = date_iso[:7]
-    # get item's genre
-    cur.execute("SELECT genre_id FROM items WHERE id=?", (item_id,))
-    row = cur.fetchone()
-    if not row:
+    try:
+        cur.execute("SELECT 1 FROM items WHERE id=?", (item_id,))
+        if not cur.fetchone():
+            raise ValueError("Invalid item.")
+        # monthly summaries are maintained by the purchases triggers
+        cur.execute("""
+            INSERT INTO purchases(item_id, date, store_id, qty, total_amount, unit_price, payment_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (item_id, date_iso, store_id, qty, total, unit_price, payment_id))
+        conn.commit()
+    except Exception:
         conn.rollback()
+        raise
+    finally:
         conn.close()
-        raise ValueError("Invalid item.")
-    genre_id = row[0]
-
-    # genre monthly summary (upsert)
-    cur.execute("""
-        INSERT INTO monthly_genre_summary(month, genre_id, total_amount)
-        VALUES (?, ?, ?)
-        ON CONFLICT(month, genre_id) DO UPDATE SET total_amount = total_amount + excluded.total_amount
-    """, (month, genre_id, total))
-
-    # membership
-    cur.execute("""
-        INSERT OR IGNORE INTO monthly_genre_items(month, genre_id, item_id)
-        VALUES (?, ?, ?)
-    """, (month, genre_id, item_id))
-
-    # payment monthly summary (upsert)
-    cur.execute("""
-        INSERT INTO monthly_payment_summary(month, payment_id, total_amount)
-        VALUES (?, ?, ?)
-        ON CONFLICT(month, payment_id) DO UPDATE SET total_amount = total_amount + excluded.total_amount
-    """, (month, payment_id, total))
-
-    conn.commit()
-    conn.close()
 
 def get_item_unit(item_id: int) -> Optional[str]:
     conn = get_conn()
@@ -274,94 +254,21 @@ def get_purchases_by_genre_item(genre_id: int, item_id: int | None):
     return rows
 
 def update_purchase(purchase_id: int, date_iso: str, store_id: int, qty: float, total: float, payment_id: int):
-    """Update a purchase and adjust monthly summaries accordingly (idempotent, atomic)."""
+    """Update a purchase; monthly summaries follow via the purchases triggers (atomic)."""
     if qty <= 0:
         raise ValueError("Quantity must be positive.")
 
     conn = get_conn()
     cur = conn.cursor()
     try:
-        cur.execute("BEGIN")
-
-        # fetch current values
-        cur.execute("""
-            SELECT p.item_id, p.date, p.total_amount, p.payment_id
-            FROM purchases p WHERE p.id = ?
-        """, (purchase_id,))
-        row = cur.fetchone()
-        if not row:
-            raise ValueError("Target record not found.")
-        item_id, old_date, old_total, old_payment_id = row
-        old_month = old_date[:7]
-        new_month = date_iso[:7]
-
-        # item's genre
-        cur.execute("SELECT genre_id FROM items WHERE id=?", (item_id,))
-        r = cur.fetchone()
-        if not r:
-            raise ValueError("Invalid item.")
-        genre_id = r[0]
-
-        # decrement old month×genre (delete row if 0)
-        cur.execute("SELECT total_amount FROM monthly_genre_summary WHERE month=? AND genre_id=?", (old_month, genre_id))
-        r = cur.fetchone()
-        if r:
-            new_total_amt = max(0.0, float(r[0]) - float(old_total))
-            if new_total_amt == 0.0:
-                cur.execute("DELETE FROM monthly_genre_summary WHERE month=? AND genre_id=?", (old_month, genre_id))
-            else:
-                cur.execute("UPDATE monthly_genre_summary SET total_amount=? WHERE month=? AND genre_id=?", (new_total_amt, old_month, genre_id))
-
-        # decrement old month×payment (delete row if 0)
-        cur.execute("SELECT total_amount FROM monthly_payment_summary WHERE month=? AND payment_id=?", (old_month, old_payment_id))
-        r = cur.fetchone()
-        if r:
-            new_total_amt = max(0.0, float(r[0]) - float(old_total))
-            if new_total_amt == 0.0:
-                cur.execute("DELETE FROM monthly_payment_summary WHERE month=? AND payment_id=?", (old_month, old_payment_id))
-            else:
-                cur.execute("UPDATE monthly_payment_summary SET total_amount=? WHERE month=? AND payment_id=?", (new_total_amt, old_month, old_payment_id))
-
-        # update purchase
         unit_price = total / qty
         cur.execute("""
             UPDATE purchases
             SET date=?, store_id=?, qty=?, total_amount=?, unit_price=?, payment_id=?
             WHERE id=?
         """, (date_iso, store_id, qty, total, unit_price, payment_id, purchase_id))
-
-        # increment new month×genre (upsert)
-        cur.execute("""
-            INSERT INTO monthly_genre_summary(month, genre_id, total_amount)
-            VALUES (?, ?, ?)
-            ON CONFLICT(month, genre_id)
-            DO UPDATE SET total_amount = total_amount + excluded.total_amount
-        """, (new_month, genre_id, total))
-
-        # increment new month×payment (upsert)
-        cur.execute("""
-            INSERT INTO monthly_payment_summary(month, payment_id, total_amount)
-            VALUES (?, ?, ?)
-            ON CONFLICT(month, payment_id)
-            DO UPDATE SET total_amount = total_amount + excluded.total_amount
-        """, (new_month, payment_id, total))
-
-        # membership
-        cur.execute("""
-            INSERT OR IGNORE INTO monthly_genre_items(month, genre_id, item_id)
-            VALUES (?, ?, ?)
-        """, (new_month, genre_id, item_id))
-
-        # if month changed, clean old membership when no purchases remain
-        if old_month != new_month:
-            cur.execute("""
-                SELECT COUNT(*) FROM purchases WHERE item_id=? AND substr(date,1,7)=?
-            """, (item_id, old_month))
-            if cur.fetchone()[0] == 0:
-                cur.execute("""
-                    DELETE FROM monthly_genre_items WHERE month=? AND genre_id=? AND item_id=?
-                """, (old_month, genre_id, item_id))
-
+        if cur.rowcount == 0:
+            raise ValueError("Target record not found.")
         conn.commit()
     except Exception:
         conn.rollback()
@@ -370,89 +277,11 @@ def update_purchase(purchase_id: int, date_iso: str, store_id: int, qty: float,
         conn.close()
 
 def delete_purchase(purchase_id: int):
-    """Delete a purchase and update monthly summaries/memberships (idempotent)."""
+    """Delete a purchase; monthly summaries/memberships follow via the triggers (idempotent)."""
     conn = get_conn()
     cur = conn.cursor()
     try:
-        cur.execute("BEGIN")
-
-        # fetch target row (no-op if missing)
-        cur.execute("""
-            SELECT p.item_id, p.date, p.total_amount, p.payment_id
-            FROM purchases p
-            WHERE p.id = ?
-        """, (purchase_id,))
-        row = cur.fetchone()
-        if not row:
-            cur.execute("ROLLBACK")
-            return
-
-        item_id, date_iso, total, payment_id = row
-        month = date_iso[:7]
-
-        # item's genre (no-op if missing)
-        cur.execute("SELECT genre_id FROM items WHERE id=?", (item_id,))
-        row = cur.fetchone()
-        if not row:
-            cur.execute("ROLLBACK")
-            return
-        genre_id = row[0]
-
-        # decrement month×genre
-        cur.execute("""
-            SELECT total_amount FROM monthly_genre_summary
-            WHERE month=? AND genre_id=?
-        """, (month, genre_id))
-        r = cur.fetchone()
-        if r:
-            new_total = max(0.0, float(r[0]) - float(total))
-            if new_total == 0.0:
-                cur.execute("""
-                    DELETE FROM monthly_genre_summary
-                    WHERE month=? AND genre_id=?
-                """, (month, genre_id))
-            else:
-                cur.execute("""
-                    UPDATE monthly_genre_summary
-                    SET total_amount=?
-                    WHERE month=? AND genre_id=?
-                """, (new_total, month, genre_id))
-
-        # decrement month×payment
-        cur.execute("""
-            SELECT total_amount FROM monthly_payment_summary
-            WHERE month=? AND payment_id=?
-        """, (month, payment_id))
-        r = cur.fetchone()
-        if r:
-            new_total = max(0.0, float(r[0]) - float(total))
-            if new_total == 0.0:
-                cur.execute("""
-                    DELETE FROM monthly_payment_summary
-                    WHERE month=? AND payment_id=?
-                """, (month, payment_id))
-            else:
-                cur.execute("""
-                    UPDATE monthly_payment_summary
-                    SET total_amount=?
-                    WHERE month=? AND payment_id=?
-                """, (new_total, month, payment_id))
-
-        # delete purchase row
         cur.execute("DELETE FROM purchases WHERE id=?", (purchase_id,))
-
-        # clean monthly_genre_items if no purchases remain for this item in that month
-        cur.execute("""
-            SELECT COUNT(*)
-            FROM purchases
-            WHERE item_id=? AND substr(date,1,7)=?
-        """, (item_id, month))
-        if cur.fetchone()[0] == 0:
-            cur.execute("""
-                DELETE FROM monthly_genre_items
-                WHERE month=? AND genre_id=? AND item_id=?
-            """, (month, genre_id, item_id))
-
         conn.commit()
     except Exception:
         conn.rollback()
@@ -471,62 +300,9 @@ def update_item_unit(item_id: int, new_unit: str):
     conn.close()
     
 def change_item_genre(item_id: int, new_genre_id: int):
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # old genre
-    cur.execute("SELECT genre_id FROM items WHERE id=?", (item_id,))
-    row = cur.fetchone()
-    if not row:
-        conn.close()
-        raise ValueError("Item not found.")
-    old_genre = row[0]
-    if old_genre == new_genre_id:
-        conn.close()
-        return
-
-    # transfer monthly totals per purchase from old→new
-    cur.execute("""
-        SELECT date, total_amount FROM purchases WHERE item_id=?
-    """, (item_id,))
-    rows = cur.fetchall()
-    for (date_iso, total) in rows:
-        month = date_iso[:7]
-        # decrement old
-        cur.execute("SELECT total_amount FROM monthly_genre_summary WHERE month=? AND genre_id=?", (month, old_genre))
-        r = cur.fetchone()
-        if r:
-            current = r[0]
-            cur.execute("UPDATE monthly_genre_summary SET total_amount=? WHERE month=? AND genre_id=?",
-                        (max(0.0, current - total), month, old_genre))
-        # increment new
-        cur.execute("""
-            INSERT INTO monthly_genre_summary(month, genre_id, total_amount)
-            VALUES (?, ?, ?)
-            ON CONFLICT(month, genre_id) DO UPDATE SET total_amount = total_amount + excluded.total_amount
-        """, (month, new_genre_id, total))
-        # membership
-        cur.execute("""
-            INSERT OR IGNORE INTO monthly_genre_items(month, genre_id, item_id)
-            VALUES (?, ?, ?)
-        """, (month, new_genre_id, item_id))
-        # cleanup old membership if no other purchases remain for old genre that month
-        cur.execute("""
-            SELECT COUNT(*) FROM purchases p
-            JOIN items i ON p.item_id = i.id
-            WHERE p.item_id=? AND substr(p.date,1,7)=? AND i.genre_id=?
-        """, (item_id, month, old_genre))
-        cnt = cur.fetchone()[0]
-        if cnt == 0:
-            cur.execute("""
-                DELETE FROM monthly_genre_items WHERE month=? AND genre_id=? AND item_id=?
-            """, (month, old_genre, item_id))
-
-    # finally update item's genre
-    cur.execute("UPDATE items SET genre_id=? WHERE id=?", (new_genre_id, item_id))
-
-    conn.commit()
-    conn.close()
+    """Move an item to another genre; its monthly totals/memberships move with it."""
+    from ledger_maintenance import change_item_genre as _change  # lazy: ledger_maintenance imports db
+    _change(item_id, new_genre_id)
     
 def ensure_genre(name: str) -> int:
     name = (name or "").strip()
@@ -578,7 +354,7 @@ def get_available_months():
     conn = get_conn()
     cur = conn.cursor()
     cur.execute("""
-        SELECT DISTINCT substr(date,1,7) AS month FROM purchases ORDER BY month ASC
+        SELECT DISTINCT month FROM purchases ORDER BY month ASC
     """)
     rows = [r[0] for r in cur.fetchall()]
     conn.close()
@@ -588,7 +364,7 @@ def get_month_total(month: str) -> float:
     conn = get_conn()
     cur = conn.cursor()
     cur.execute("""
-        SELECT COALESCE(SUM(total_amount),0) FROM purchases WHERE substr(date,1,7)=?
+        SELECT COALESCE(SUM(total_amount),0) FROM purchases WHERE month=?
     """, (month,))
     row = cur.fetchone()
     conn.close()
@@ -618,7 +394,7 @@ def get_month_genre_item_totals(month: str, genre_id: int):
         SELECT i.name, SUM(p.total_amount) as total
         FROM purchases p
         JOIN items i ON p.item_id = i.id
-        WHERE substr(p.date,1,7)=? AND i.genre_id=?
+        WHERE p.month=? AND i.genre_id=?
         GROUP BY i.id, i.name
         HAVING total > 0
         ORDER BY total DESC, i.name ASC
@@ -649,163 +425,21 @@ def get_monthly_payment_totals(month: str):
 
 def delete_item_and_update_summaries(item_id: int):
     """
-    Delete all purchase records tied to an item, keep monthly_genre_summary /
-    monthly_payment_summary / monthly_genre_items consistent, and finally delete the item.
+    Delete all purchase records tied to an item, then the item itself,
+    recomputing the affected months of the monthly summaries (see ledger_maintenance).
     """
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # get item's genre id
-    cur.execute("SELECT genre_id FROM items WHERE id=?", (item_id,))
-    row = cur.fetchone()
-    if not row:
-        conn.close()
-        raise ValueError("Item not found.")
-    genre_id = row[0]
-
-    # fetch all purchases for the item
-    cur.execute("""
-        SELECT id, date, total_amount, payment_id FROM purchases WHERE item_id=?
-    """, (item_id,))
-    purchases = cur.fetchall()
-
-    # adjust summaries and delete purchases one by one
-    for pid, date_iso, total, payment_id in purchases:
-        month = date_iso[:7]
-        # genre summary decrement
-        cur.execute("SELECT total_amount FROM monthly_genre_summary WHERE month=? AND genre_id=?", (month, genre_id))
-        r = cur.fetchone()
-        if r:
-            current = r[0]
-            new_total = max(0.0, current - float(total))
-            cur.execute("UPDATE monthly_genre_summary SET total_amount=? WHERE month=? AND genre_id=?", (new_total, month, genre_id))
-        # payment summary decrement
-        cur.execute("SELECT total_amount FROM monthly_payment_summary WHERE month=? AND payment_id=?", (month, payment_id))
-        r = cur.fetchone()
-        if r:
-            current = r[0]
-            new_total = max(0.0, current - float(total))
-            cur.execute("UPDATE monthly_payment_summary SET total_amount=? WHERE month=? AND payment_id=?", (new_total, month, payment_id))
-        # delete the purchase row
-        cur.execute("DELETE FROM purchases WHERE id=?", (pid,))
-
-        # clean membership if no purchases remain for that month
-        cur.execute("SELECT COUNT(*) FROM purchases WHERE item_id=? AND substr(date,1,7)=?", (item_id, month))
-        cnt = cur.fetchone()[0]
-        if cnt == 0:
-            cur.execute("DELETE FROM monthly_genre_items WHERE month=? AND genre_id=? AND item_id=?", (month, genre_id, item_id))
-
-    # finally delete the item
-    cur.execute("DELETE FROM items WHERE id=?", (item_id,))
-
-    conn.commit()
-    conn.close()
+    from ledger_maintenance import delete_item
+    delete_item(item_id)
     
 def delete_genre_and_update_summaries(genre_id: int):
     """
     Delete items and purchase records under a given genre consistently, then delete the genre.
     Affected tables:
-      - purchases (delete)
-      - monthly_genre_summary (decrement / delete rows when zero)
-      - monthly_payment_summary (decrement)
-      - monthly_genre_items (delete memberships)
+      - purchases (delete) → monthly summaries recomputed for the affected months
       - items (delete) → genres (delete)
     """
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # ensure the genre exists
-    cur.execute("SELECT id FROM genres WHERE id=?", (genre_id,))
-    if not cur.fetchone():
-        conn.close()
-        raise ValueError("Genre not found.")
-
-    # items under this genre
-    cur.execute("SELECT id FROM items WHERE genre_id=?", (genre_id,))
-    item_ids = [r[0] for r in cur.fetchall()]
-
-    # no items: remove any leftover genre rows in summary, then delete the genre
-    if not item_ids:
-        cur.execute("DELETE FROM monthly_genre_summary WHERE genre_id=?", (genre_id,))
-        cur.execute("DELETE FROM genres WHERE id=?", (genre_id,))
-        conn.commit()
-        conn.close()
-        return
-
-    # iterate purchases per item, decrement summaries, delete purchases
-    for item_id in item_ids:
-        cur.execute("""
-            SELECT id, date, total_amount, payment_id
-            FROM purchases
-            WHERE item_id=?
-        """, (item_id,))
-        rows = cur.fetchall()
-        for pid, date_iso, total, payment_id in rows:
-            month = date_iso[:7]
-
-            # month×genre decrement (no negative)
-            cur.execute("""
-                SELECT total_amount
-                FROM monthly_genre_summary
-                WHERE month=? AND genre_id=?
-            """, (month, genre_id))
-            r = cur.fetchone()
-            if r:
-                new_total = max(0.0, float(r[0]) - float(total))
-                if new_total == 0.0:
-                    cur.execute("""
-                        DELETE FROM monthly_genre_summary
-                        WHERE month=? AND genre_id=?
-                    """, (month, genre_id))
-                else:
-                    cur.execute("""
-                        UPDATE monthly_genre_summary
-                        SET total_amount=?
-                        WHERE month=? AND genre_id=?
-                    """, (new_total, month, genre_id))
-
-            # month×payment decrement
-            cur.execute("""
-                SELECT total_amount
-                FROM monthly_payment_summary
-                WHERE month=? AND payment_id=?
-            """, (month, payment_id))
-            r = cur.fetchone()
-            if r:
-                new_total = max(0.0, float(r[0]) - float(total))
-                cur.execute("""
-                    UPDATE monthly_payment_summary
-                    SET total_amount=?
-                    WHERE month=? AND payment_id=?
-                """, (new_total, month, payment_id))
-
-            # delete purchase
-            cur.execute("DELETE FROM purchases WHERE id=?", (pid,))
-
-            # clean membership
-            cur.execute("""
-                SELECT COUNT(*)
-                FROM purchases
-                WHERE item_id=? AND substr(date,1,7)=?
-            """, (item_id, month))
-            cnt = cur.fetchone()[0]
-            if cnt == 0:
-                cur.execute("""
-                    DELETE FROM monthly_genre_items
-                    WHERE month=? AND genre_id=? AND item_id=?
-                """, (month, genre_id, item_id))
-
-        # delete item
-        cur.execute("DELETE FROM items WHERE id=?", (item_id,))
-
-    # cleanup any remaining summary rows for the genre
-    cur.execute("DELETE FROM monthly_genre_summary WHERE genre_id=?", (genre_id,))
-
-    # delete the genre itself
-    cur.execute("DELETE FROM genres WHERE id=?", (genre_id,))
-
-    conn.commit()
-    conn.close()
+    from ledger_maintenance import delete_genre
+    delete_genre(genre_id)
 
 # rename helpers
 def update_genre_name(genre_id: int, new_name: str):
@@ -857,53 +491,10 @@ def reassign_store_in_purchases(old_store_id: int, new_store_id: int):
     cur.execute("UPDATE purchases SET store_id=? WHERE store_id=?", (new_store_id, old_store_id))
     conn.commit(); conn.close()
 
-# reassign payment method in purchases (move monthly payment summaries accordingly)
+# reassign payment method in purchases (monthly payment summaries recomputed for the affected months)
 def reassign_payment_in_purchases(old_payment_id: int, new_payment_id: int):
-    if old_payment_id == new_payment_id:
-        return
-    conn = get_conn(); cur = conn.cursor()
-    try:
-        cur.execute("BEGIN")
-
-        # sums per month for the old payment
-        cur.execute("""
-            SELECT substr(date,1,7) AS month, SUM(total_amount) AS s
-            FROM purchases
-            WHERE payment_id=?
-            GROUP BY substr(date,1,7)
-        """, (old_payment_id,))
-        rows = cur.fetchall()
-
-        # decrement old payment monthly totals (delete row if 0)
-        for month, s in rows:
-            s = float(s or 0.0)
-            cur.execute("SELECT total_amount FROM monthly_payment_summary WHERE month=? AND payment_id=?", (month, old_payment_id))
-            r = cur.fetchone()
-            if r:
-                new_total = max(0.0, float(r[0]) - s)
-                if new_total == 0.0:
-                    cur.execute("DELETE FROM monthly_payment_summary WHERE month=? AND payment_id=?", (month, old_payment_id))
-                else:
-                    cur.execute("UPDATE monthly_payment_summary SET total_amount=? WHERE month=? AND payment_id=?", (new_total, month, old_payment_id))
-
-        # increment new payment monthly totals (upsert)
-        for month, s in rows:
-            s = float(s or 0.0)
-            cur.execute("""
-                INSERT INTO monthly_payment_summary(month, payment_id, total_amount)
-                VALUES (?, ?, ?)
-                ON CONFLICT(month, payment_id)
-                DO UPDATE SET total_amount = total_amount + excluded.total_amount
-            """, (month, new_payment_id, s))
-
-        # reassign purchases
-        cur.execute("UPDATE purchases SET payment_id=? WHERE payment_id=?", (new_payment_id, old_payment_id))
-
-        conn.commit()
-    except Exception:
-        conn.rollback()
-    finally:
-        conn.close()
+    from ledger_maintenance import reassign_payment
+    reassign_payment(old_payment_id, new_payment_id)
 
 # safe deletes (only when not referenced)
 def delete_store(store_id: int):
@@ -997,6 +588,260 @@ def get_purchases_filtered(genre_id: int, item_id: int | None, store_id: int | N
     conn.close()
     return rows
 
+# ====== purchases.month: generated 'YYYY-MM' column + indexes ============================
+
+_PURCHASE_INDEXES = {
+    "idx_purchases_month_item": "purchases(month, item_id)",
+    "idx_purchases_item_date": "purchases(item_id, date)",
+    "idx_purchases_payment_date": "purchases(payment_id, date)",
+    "idx_purchases_store": "purchases(store_id)",
+}
+
+def _init_purchase_month():
+    """
+    Add purchases.month (= substr(date,1,7)) as a VIRTUAL generated column so month filters
+    and groupings can use an index. ALTER TABLE cannot add STORED columns; an indexed
+    VIRTUAL column is stored in the index, which is what the queries read.
+    """
+    conn = get_conn(); cur = conn.cursor()
+    cur.execute("PRAGMA table_xinfo(purchases);")
+    cols = [r[1] for r in cur.fetchall()]
+    if "month" not in cols:
+        cur.execute("ALTER TABLE purchases ADD COLUMN month TEXT GENERATED ALWAYS AS (substr(date,1,7)) VIRTUAL;")
+    for name, target in _PURCHASE_INDEXES.items():
+        cur.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target};")
+    conn.commit(); conn.close()
+
+# ====== Monthly summaries: maintained by triggers on purchases / items ======================
+#
+# Invariants (what rebuild_monthly_summaries() recomputes from scratch):
+#   monthly_genre_items     (month, genre, item) exists iff the item (in its current genre) has purchases that month
+#   monthly_genre_summary   SUM(total_amount) per (month, genre); the row exists iff a membership row exists
+#   monthly_payment_summary SUM(total_amount) per (month, payment); the row exists iff purchases exist
+# Bulk operations (ledger_maintenance.py) put a row in summary_suspend inside their transaction,
+# which switches the triggers off, and recompute the affected months in one pass instead.
+
+_SUMMARY_TRIGGERS = {
+    "trg_purchases_ai": """
+    CREATE TRIGGER trg_purchases_ai AFTER INSERT ON purchases
+    WHEN NOT EXISTS (SELECT 1 FROM summary_suspend)
+    BEGIN
+        INSERT INTO monthly_genre_summary(month, genre_id, total_amount)
+        SELECT NEW.month, genre_id, NEW.total_amount FROM items WHERE id = NEW.item_id
+        ON CONFLICT(month, genre_id) DO UPDATE SET total_amount = total_amount + excluded.total_amount;
+
+        INSERT OR IGNORE INTO monthly_genre_items(month, genre_id, item_id)
+        SELECT NEW.month, genre_id, NEW.item_id FROM items WHERE id = NEW.item_id;
+
+        INSERT INTO monthly_payment_summary(month, payment_id, total_amount)
+        VALUES (NEW.month, NEW.payment_id, NEW.total_amount)
+        ON CONFLICT(month, payment_id) DO UPDATE SET total_amount = total_amount + excluded.total_amount;
+    END;
+    """,
+    "trg_purchases_ad": """
+    CREATE TRIGGER trg_purchases_ad AFTER DELETE ON purchases
+    WHEN NOT EXISTS (SELECT 1 FROM summary_suspend)
+    BEGIN
+        {remove_old}
+    END;
+    """,
+    # an update is "remove OLD, add NEW"
+    "trg_purchases_au": """
+    CREATE TRIGGER trg_purchases_au AFTER UPDATE OF item_id, date, total_amount, payment_id ON purchases
+    WHEN NOT EXISTS (SELECT 1 FROM summary_suspend)
+    BEGIN
+        {remove_old}
+
+        INSERT INTO monthly_genre_summary(month, genre_id, total_amount)
+        SELECT NEW.month, genre_id, NEW.total_amount FROM items WHERE id = NEW.item_id
+        ON CONFLICT(month, genre_id) DO UPDATE SET total_amount = total_amount + excluded.total_amount;
+
+        INSERT OR IGNORE INTO monthly_genre_items(month, genre_id, item_id)
+        SELECT NEW.month, genre_id, NEW.item_id FROM items WHERE id = NEW.item_id;
+
+        INSERT INTO monthly_payment_summary(month, payment_id, total_amount)
+        VALUES (NEW.month, NEW.payment_id, NEW.total_amount)
+        ON CONFLICT(month, payment_id) DO UPDATE SET total_amount = total_amount + excluded.total_amount;
+    END;
+    """,
+    # moving an item to another genre moves all of its months at once
+    "trg_items_genre_au": """
+    CREATE TRIGGER trg_items_genre_au AFTER UPDATE OF genre_id ON items
+    WHEN OLD.genre_id <> NEW.genre_id AND NOT EXISTS (SELECT 1 FROM summary_suspend)
+    BEGIN
+        UPDATE monthly_genre_summary
+        SET total_amount = total_amount - (
+            SELECT COALESCE(SUM(p.total_amount), 0) FROM purchases p
+            WHERE p.item_id = NEW.id AND p.month = monthly_genre_summary.month
+        )
+        WHERE genre_id = OLD.genre_id
+          AND month IN (SELECT month FROM monthly_genre_items WHERE genre_id = OLD.genre_id AND item_id = NEW.id);
+
+        INSERT INTO monthly_genre_summary(month, genre_id, total_amount)
+        SELECT month, NEW.genre_id, SUM(total_amount) FROM purchases
+        WHERE item_id = NEW.id
+        GROUP BY month
+        ON CONFLICT(month, genre_id) DO UPDATE SET total_amount = total_amount + excluded.total_amount;
+
+        DELETE FROM monthly_genre_items WHERE genre_id = OLD.genre_id AND item_id = NEW.id;
+        INSERT OR IGNORE INTO monthly_genre_items(month, genre_id, item_id)
+        SELECT DISTINCT month, NEW.genre_id, NEW.id FROM purchases WHERE item_id = NEW.id;
+
+        DELETE FROM monthly_genre_summary
+        WHERE genre_id = OLD.genre_id
+          AND NOT EXISTS (
+            SELECT 1 FROM monthly_genre_items m
+            WHERE m.month = monthly_genre_summary.month AND m.genre_id = OLD.genre_id
+          );
+    END;
+    """,
+}
+
+# shared by the delete/update triggers: take OLD out of the three summaries
+_REMOVE_OLD = """
+        UPDATE monthly_genre_summary SET total_amount = total_amount - OLD.total_amount
+        WHERE month = OLD.month
+          AND genre_id = (SELECT genre_id FROM items WHERE id = OLD.item_id);
+
+        DELETE FROM monthly_genre_items
+        WHERE month = OLD.month AND item_id = OLD.item_id
+          AND NOT EXISTS (
+            SELECT 1 FROM purchases WHERE item_id = OLD.item_id AND purchases.month = OLD.month
+          );
+
+        DELETE FROM monthly_genre_summary
+        WHERE month = OLD.month
+          AND genre_id = (SELECT genre_id FROM items WHERE id = OLD.item_id)
+          AND NOT EXISTS (
+            SELECT 1 FROM monthly_genre_items m
+            WHERE m.month = monthly_genre_summary.month AND m.genre_id = monthly_genre_summary.genre_id
+          );
+
+        UPDATE monthly_payment_summary SET total_amount = total_amount - OLD.total_amount
+        WHERE month = OLD.month AND payment_id = OLD.payment_id;
+
+        DELETE FROM monthly_payment_summary
+        WHERE month = OLD.month AND payment_id = OLD.payment_id
+          AND NOT EXISTS (
+            SELECT 1 FROM purchases WHERE payment_id = OLD.payment_id AND purchases.month = OLD.month
+          );
+"""
+
+# PRAGMA user_version: 1 = summaries have been rebuilt once under the triggers
+_SUMMARY_SCHEMA_VERSION = 1
+
+def _rebuild_monthly_summaries(cur):
+    cur.execute("DELETE FROM monthly_genre_items")
+    cur.execute("DELETE FROM monthly_genre_summary")
+    cur.execute("DELETE FROM monthly_payment_summary")
+    cur.execute("""
+        INSERT INTO monthly_genre_items(month, genre_id, item_id)
+        SELECT DISTINCT p.month, i.genre_id, p.item_id
+        FROM purchases p JOIN items i ON i.id = p.item_id
+    """)
+    cur.execute("""
+        INSERT INTO monthly_genre_summary(month, genre_id, total_amount)
+        SELECT p.month, i.genre_id, SUM(p.total_amount)
+        FROM purchases p JOIN items i ON i.id = p.item_id
+        GROUP BY p.month, i.genre_id
+    """)
+    cur.execute("""
+        INSERT INTO monthly_payment_summary(month, payment_id, total_amount)
+        SELECT month, payment_id, SUM(total_amount)
+        FROM purchases
+        GROUP BY month, payment_id
+    """)
+
+def rebuild_monthly_summaries():
+    """Recompute all monthly summary tables from purchases (one transaction)."""
+    conn = get_conn(); cur = conn.cursor()
+    try:
+        cur.execute("BEGIN")
+        _rebuild_monthly_summaries(cur)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def _init_summary_triggers():
+    """(Re)create the summary triggers; on first install, rebuild the summaries from purchases once."""
+    conn = get_conn(); cur = conn.cursor()
+    try:
+        cur.execute("BEGIN")
+        cur.execute("CREATE TABLE IF NOT EXISTS summary_suspend(id INTEGER PRIMARY KEY CHECK (id = 1))")
+        # a crash cannot leave the flag set (it is only written inside a transaction), but be safe
+        cur.execute("DELETE FROM summary_suspend")
+        for name, sql in _SUMMARY_TRIGGERS.items():
+            cur.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cur.execute(sql.replace("{remove_old}", _REMOVE_OLD))
+        cur.execute("PRAGMA user_version")
+        if cur.fetchone()[0] < _SUMMARY_SCHEMA_VERSION:
+            # summaries written by the old hand-maintained code may have drifted
+            _rebuild_monthly_summaries(cur)
+            cur.execute(f"PRAGMA user_version = {_SUMMARY_SCHEMA_VERSION}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+# ====== Ledger version: bumped on every write that can change what the household page shows ==
+#
+# ledger_dashboard.py caches its payload per version. Unlike the summary triggers these are
+# never suspended, so bulk maintenance bumps the version too.
+
+_LEDGER_VERSION_EVENTS = {
+    "trg_ledger_version_purchases_ai": "AFTER INSERT ON purchases",
+    "trg_ledger_version_purchases_ad": "AFTER DELETE ON purchases",
+    "trg_ledger_version_purchases_au": "AFTER UPDATE ON purchases",
+    "trg_ledger_version_items_au": "AFTER UPDATE OF name, genre_id ON items",
+    "trg_ledger_version_items_ad": "AFTER DELETE ON items",
+    "trg_ledger_version_genres_au": "AFTER UPDATE OF name ON genres",
+    "trg_ledger_version_genres_ad": "AFTER DELETE ON genres",
+    "trg_ledger_version_payments_au": "AFTER UPDATE OF name ON payments",
+    "trg_ledger_version_payments_ad": "AFTER DELETE ON payments",
+}
+
+def _init_ledger_version():
+    conn = get_conn(); cur = conn.cursor()
+    try:
+        cur.execute("BEGIN")
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS ledger_version(
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        );
+        """)
+        cur.execute("INSERT OR IGNORE INTO ledger_version(id, version) VALUES (1, 0)")
+        for name, event in _LEDGER_VERSION_EVENTS.items():
+            cur.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cur.execute(f"""
+            CREATE TRIGGER {name} {event}
+            BEGIN
+                UPDATE ledger_version SET version = version + 1 WHERE id = 1;
+            END;
+            """)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def get_ledger_version(cur=None) -> int:
+    """Current ledger version (see _init_ledger_version); pass a cursor to read it in its transaction."""
+    if cur is not None:
+        cur.execute("SELECT version FROM ledger_version WHERE id = 1")
+        return int(cur.fetchone()[0])
+    conn = get_conn()
+    try:
+        return get_ledger_version(conn.cursor())
+    finally:
+        conn.close()
+
 # ====== BS: balance snapshots (observed balances for accounts & cash) =======================
 
 def _init_bs_tables():
@@ -0,0 +1,99 @@
+"""
+Everything the household page (pages/60_household.py) shows for a set of months, in one go.
+
+load_ledger_dashboard(months) reads, on one connection and inside one read transaction,
+  totals    month, total                                    (all purchases of the month, summed from
+                                                            purchases like db.get_month_total)
+  genres    month, genre_id, genre, total                   (> 0, largest first)
+  items     month, genre_id, item_id, item, total           (> 0, largest first within a genre)
+  payments  month, payment_id, payment, total               (> 0, largest first)
+with one grouped query each, instead of one connection per month / genre.
+
+Results are cached per month list and ledger version (db.get_ledger_version, bumped by triggers
+on every purchase write and on item / genre / payment renames and deletes), so a rerun without
+writes costs a single version lookup. The cached DataFrames are shared: treat them as read-only.
+"""
+import threading
+
+import pandas as pd
+
+from db import get_conn, get_ledger_version
+
+_CACHE_MAX = 16
+_cache = {}  # tuple(months) -> (version, payload)
+_lock = threading.Lock()
+
+
+def _in(months):
+    # "IN (NULL)" matches nothing, so an empty month list gives empty frames
+    return ",".join("?" * len(months)) or "NULL"
+
+
+def _query(conn, months):
+    ph = _in(months)
+    totals = pd.read_sql_query(f"""
+        SELECT month, SUM(total_amount) AS total
+        FROM purchases
+        WHERE month IN ({ph})
+        GROUP BY month
+        ORDER BY month
+    """, conn, params=months)
+    genres = pd.read_sql_query(f"""
+        SELECT m.month, g.id AS genre_id, g.name AS genre, m.total_amount AS total
+        FROM monthly_genre_summary m
+        JOIN genres g ON g.id = m.genre_id
+        WHERE m.month IN ({ph}) AND m.total_amount > 0
+        ORDER BY m.month, m.total_amount DESC, g.id
+    """, conn, params=months)
+    items = pd.read_sql_query(f"""
+        SELECT p.month, i.genre_id, i.id AS item_id, i.name AS item, SUM(p.total_amount) AS total
+        FROM purchases p
+        JOIN items i ON i.id = p.item_id
+        WHERE p.month IN ({ph})
+        GROUP BY p.month, i.id
+        HAVING total > 0
+        ORDER BY p.month, i.genre_id, total DESC, i.name
+    """, conn, params=months)
+    payments = pd.read_sql_query(f"""
+        SELECT m.month, pay.id AS payment_id, pay.name AS payment, m.total_amount AS total
+        FROM monthly_payment_summary m
+        JOIN payments pay ON pay.id = m.payment_id
+        WHERE m.month IN ({ph}) AND m.total_amount > 0
+        ORDER BY m.month, m.total_amount DESC, pay.id
+    """, conn, params=months)
+    return {"totals": totals, "genres": genres, "items": items, "payments": payments}
+
+
+def load_ledger_dashboard(months):
+    """
+    Return {"totals", "genres", "items", "payments"} DataFrames for the given months
+    ('YYYY-MM'; columns as in the module docstring).
+    """
+    key = tuple(sorted(set(months)))
+    with _lock:
+        hit = _cache.get(key)
+    if hit is not None and hit[0] == get_ledger_version():
+        return hit[1]
+
+    conn = get_conn()
+    try:
+        cur = conn.cursor()
+        # the version and the rows come from the same snapshot
+        cur.execute("BEGIN")
+        version = get_ledger_version(cur)
+        payload = _query(conn, list(key))
+        conn.commit()
+    finally:
+        conn.close()
+
+    with _lock:
+        _cache.pop(key, None)
+        while len(_cache) >= _CACHE_MAX:
+            _cache.pop(next(iter(_cache)))
+        _cache[key] = (version, payload)
+    return payload
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
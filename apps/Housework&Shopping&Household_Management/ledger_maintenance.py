@@ -0,0 +1,214 @@
+"""
+Set-based maintenance of the household ledger.
+
+Bulk operations (deleting a genre or an item, reassigning a payment method)
+touch many purchases at once. Running them through the per-row summary
+triggers costs several statements per purchase, so here:
+
+  1. the months the operation touches are collected into a temp table,
+  2. the summary triggers are switched off (a row in summary_suspend),
+  3. the bulk DELETE/UPDATE statements run,
+  4. the monthly summary rows the operation can change (those months, and only
+     the genres / payment methods involved) are recomputed with grouped
+     INSERT ... SELECT ... GROUP BY,
+
+all inside one transaction, so other connections never see the triggers off
+or the summaries half-updated.
+
+An operation called while another one is running on the same thread joins the
+outer transaction as a savepoint (a second connection would wait on the outer
+BEGIN IMMEDIATE until it timed out), and the triggers stay off until the level
+that switched them off finishes.
+"""
+import threading
+from contextlib import contextmanager
+
+from db import get_conn
+
+# the cursor of the maintenance transaction open on this thread, and whether it has the triggers off
+_active = threading.local()
+
+
+def _suspend_triggers(cur, clear_months: bool):
+    cur.execute("CREATE TEMP TABLE IF NOT EXISTS affected_months(month TEXT PRIMARY KEY)")
+    if clear_months:
+        cur.execute("DELETE FROM affected_months")
+    cur.execute("INSERT INTO summary_suspend(id) VALUES (1)")
+    _active.suspended = True
+
+
+@contextmanager
+def _maintenance(suspend: bool = True):
+    """One write transaction (summary triggers suspended unless suspend=False); yields a cursor."""
+    if getattr(_active, "cur", None) is not None:
+        with _nested(suspend) as cur:
+            yield cur
+        return
+    conn = get_conn()
+    cur = conn.cursor()
+    _active.cur, _active.suspended = cur, False
+    try:
+        cur.execute("BEGIN IMMEDIATE")
+        if suspend:
+            _suspend_triggers(cur, clear_months=True)
+        yield cur
+        if suspend:
+            cur.execute("DELETE FROM summary_suspend")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        _active.cur, _active.suspended = None, False
+        conn.close()
+
+
+@contextmanager
+def _nested(suspend: bool):
+    """
+    A _maintenance inside another one: a savepoint on the outer cursor. Only switches the
+    triggers off (and back on) if the outer level has not, and keeps the outer's affected_months.
+    """
+    cur = _active.cur
+    owns_suspend = suspend and not _active.suspended
+    cur.execute("SAVEPOINT ledger_maintenance")
+    try:
+        if owns_suspend:
+            _suspend_triggers(cur, clear_months=False)
+        yield cur
+        if owns_suspend:
+            cur.execute("DELETE FROM summary_suspend")
+        cur.execute("RELEASE ledger_maintenance")
+    except Exception:
+        # also takes back this level's summary_suspend row
+        cur.execute("ROLLBACK TO ledger_maintenance")
+        cur.execute("RELEASE ledger_maintenance")
+        raise
+    finally:
+        if owns_suspend:
+            _active.suspended = False
+
+
+def _mark_months(cur, where_sql: str, params=()):
+    """Add the months of the purchases matching where_sql (alias p) to affected_months."""
+    cur.execute(f"""
+        INSERT OR IGNORE INTO affected_months(month)
+        SELECT DISTINCT p.month FROM purchases p WHERE {where_sql}
+    """, params)
+
+
+def _in_list(column: str, ids):
+    """SQL fragment restricting column to ids (None = no restriction)."""
+    if ids is None:
+        return "1", ()
+    ids = tuple(ids)
+    return f"{column} IN ({','.join('?' * len(ids))})", ids
+
+
+def recompute_months(cur, *, genre_ids=None, payment_ids=None, genres: bool = True, payments: bool = True):
+    """
+    Recompute the monthly summaries for the months in affected_months from purchases.
+    genre_ids / payment_ids narrow the recomputation to the genres / payments an operation
+    can change (None = all); genres / payments=False skip that side entirely.
+    """
+    if genres:
+        g_sql, g_params = _in_list("genre_id", genre_ids)
+        cur.execute(f"DELETE FROM monthly_genre_items WHERE month IN (SELECT month FROM affected_months) AND {g_sql}", g_params)
+        cur.execute(f"DELETE FROM monthly_genre_summary WHERE month IN (SELECT month FROM affected_months) AND {g_sql}", g_params)
+        g_sql, g_params = _in_list("i.genre_id", genre_ids)
+        cur.execute(f"""
+            INSERT INTO monthly_genre_items(month, genre_id, item_id)
+            SELECT DISTINCT p.month, i.genre_id, p.item_id
+            FROM items i JOIN purchases p ON p.item_id = i.id
+            WHERE p.month IN (SELECT month FROM affected_months) AND {g_sql}
+        """, g_params)
+        cur.execute(f"""
+            INSERT INTO monthly_genre_summary(month, genre_id, total_amount)
+            SELECT p.month, i.genre_id, SUM(p.total_amount)
+            FROM items i JOIN purchases p ON p.item_id = i.id
+            WHERE p.month IN (SELECT month FROM affected_months) AND {g_sql}
+            GROUP BY p.month, i.genre_id
+        """, g_params)
+    if payments:
+        p_sql, p_params = _in_list("payment_id", payment_ids)
+        cur.execute(f"DELETE FROM monthly_payment_summary WHERE month IN (SELECT month FROM affected_months) AND {p_sql}", p_params)
+        p_sql, p_params = _in_list("p.payment_id", payment_ids)
+        cur.execute(f"""
+            INSERT INTO monthly_payment_summary(month, payment_id, total_amount)
+            SELECT p.month, p.payment_id, SUM(p.total_amount)
+            FROM purchases p
+            WHERE p.month IN (SELECT month FROM affected_months) AND {p_sql}
+            GROUP BY p.month, p.payment_id
+        """, p_params)
+
+
+def delete_genre(genre_id: int):
+    """Delete a genre with all of its items and their purchases."""
+    with _maintenance() as cur:
+        cur.execute("SELECT 1 FROM genres WHERE id=?", (genre_id,))
+        if not cur.fetchone():
+            raise ValueError("Genre not found.")
+        _mark_months(cur, "p.item_id IN (SELECT id FROM items WHERE genre_id=?)", (genre_id,))
+        cur.execute("DELETE FROM purchases WHERE item_id IN (SELECT id FROM items WHERE genre_id=?)", (genre_id,))
+        # the genre's own rows go entirely (anything outside the affected months can only be drift)
+        cur.execute("DELETE FROM monthly_genre_items WHERE genre_id=?", (genre_id,))
+        cur.execute("DELETE FROM monthly_genre_summary WHERE genre_id=?", (genre_id,))
+        cur.execute("DELETE FROM items WHERE genre_id=?", (genre_id,))
+        cur.execute("DELETE FROM genres WHERE id=?", (genre_id,))
+        # other genres are untouched; only the payment totals of those months change
+        recompute_months(cur, genres=False)
+
+
+def delete_item(item_id: int):
+    """Delete an item and all of its purchases."""
+    with _maintenance() as cur:
+        cur.execute("SELECT genre_id FROM items WHERE id=?", (item_id,))
+        row = cur.fetchone()
+        if not row:
+            raise ValueError("Item not found.")
+        _mark_months(cur, "p.item_id=?", (item_id,))
+        cur.execute("DELETE FROM purchases WHERE item_id=?", (item_id,))
+        cur.execute("DELETE FROM monthly_genre_items WHERE item_id=?", (item_id,))
+        cur.execute("DELETE FROM items WHERE id=?", (item_id,))
+        recompute_months(cur, genre_ids=[row[0]])
+
+
+def change_item_genre(item_id: int, new_genre_id: int):
+    """
+    Move an item to another genre. The items trigger already does this as a handful of
+    grouped statements (subtract the item's per-month sums from the old genre, add them to
+    the new one), which is cheaper than re-summing both genres, so it is left on here
+    (unless an enclosing operation has switched it off; then both genres are recomputed).
+    """
+    with _maintenance(suspend=False) as cur:
+        cur.execute("SELECT genre_id FROM items WHERE id=?", (item_id,))
+        row = cur.fetchone()
+        if not row:
+            raise ValueError("Item not found.")
+        if row[0] == new_genre_id:
+            return
+        if not _active.suspended:
+            cur.execute("UPDATE items SET genre_id=? WHERE id=?", (new_genre_id, item_id))
+            return
+        _mark_months(cur, "p.item_id=?", (item_id,))
+        cur.execute("UPDATE items SET genre_id=? WHERE id=?", (new_genre_id, item_id))
+        # payment totals do not depend on the genre
+        recompute_months(cur, genre_ids=[row[0], new_genre_id], payments=False)
+
+
+def reassign_payment(old_payment_id: int, new_payment_id: int):
+    """Move every purchase paid with old_payment_id to new_payment_id."""
+    if old_payment_id == new_payment_id:
+        return
+    with _maintenance() as cur:
+        _mark_months(cur, "p.payment_id=?", (old_payment_id,))
+        cur.execute("UPDATE purchases SET payment_id=? WHERE payment_id=?", (new_payment_id, old_payment_id))
+        # genre totals do not depend on the payment method
+        recompute_months(cur, payment_ids=[old_payment_id, new_payment_id], genres=False)
+
+
+def recompute(months):
+    """Recompute all monthly summaries of the given months from purchases (repair after drift)."""
+    with _maintenance() as cur:
+        cur.executemany("INSERT OR IGNORE INTO affected_months(month) VALUES (?)", [(m,) for m in months])
+        recompute_months(cur)
@@ -0,0 +1,157 @@
+"""
+Verify (and optionally repair) the household ledger's monthly summaries.
+
+Recomputes monthly_genre_summary / monthly_payment_summary / monthly_genre_items
+from purchases and diffs them against the stored rows:
+
+    python ledger_verify.py                 # report only; exit code 1 if anything differs
+    python ledger_verify.py --repair        # recompute the months that differ
+    python ledger_verify.py --db path/to/kaji.db --tolerance 0.01
+
+Purchases are read in one pass ordered by month (served by the month index), and
+only one month's totals are held at a time, so time is O(rows) and memory does not
+grow with the number of years in the ledger.
+"""
+import argparse
+import sys
+from collections import defaultdict
+from itertools import groupby
+from pathlib import Path
+
+import db
+
+
+def _stored(cur, month: str):
+    cur.execute("SELECT genre_id, total_amount FROM monthly_genre_summary WHERE month=?", (month,))
+    genres = {g: float(t) for g, t in cur.fetchall()}
+    cur.execute("SELECT payment_id, total_amount FROM monthly_payment_summary WHERE month=?", (month,))
+    payments = {p: float(t) for p, t in cur.fetchall()}
+    cur.execute("SELECT genre_id, item_id FROM monthly_genre_items WHERE month=?", (month,))
+    members = set(cur.fetchall())
+    return genres, payments, members
+
+
+def _diff_totals(kind: str, month: str, expected: dict, stored: dict, tolerance: float):
+    out = []
+    for key in sorted(expected.keys() | stored.keys()):
+        e, s = expected.get(key), stored.get(key)
+        if s is None:
+            out.append((month, kind, key, "missing", e, None))
+        elif e is None:
+            out.append((month, kind, key, "extra", None, s))
+        elif abs(e - s) > tolerance:
+            out.append((month, kind, key, "amount", e, s))
+    return out
+
+
+def _diff_members(month: str, expected: set, stored: set):
+    return ([(month, "item", key, "missing", None, None) for key in sorted(expected - stored)]
+            + [(month, "item", key, "extra", None, None) for key in sorted(stored - expected)])
+
+
+def verify(tolerance: float = 0.005):
+    """
+    Yield discrepancies as (month, kind, key, problem, expected, stored):
+      kind    "genre" (key = genre_id), "payment" (key = payment_id), "item" (key = (genre_id, item_id))
+      problem "missing" (no stored row), "extra" (stored row without purchases), "amount"
+    """
+    conn = db.get_conn()
+    try:
+        cur = conn.cursor()
+        # items are few compared with purchases; genre per item avoids a join that would
+        # defeat the month-ordered index scan
+        genre_of = dict(cur.execute("SELECT id, genre_id FROM items").fetchall())
+
+        # months that only exist in the summaries (no purchases left) are checked too
+        summary_months = [r[0] for r in cur.execute("""
+            SELECT month FROM monthly_genre_summary
+            UNION SELECT month FROM monthly_payment_summary
+            UNION SELECT month FROM monthly_genre_items
+            ORDER BY month
+        """).fetchall()]
+
+        lookup = conn.cursor()
+        stream = conn.cursor()
+        stream.execute("SELECT month, item_id, payment_id, total_amount FROM purchases ORDER BY month")
+        seen = set()
+        for month, rows in groupby(stream, key=lambda r: r[0]):
+            seen.add(month)
+            genres, payments, members = defaultdict(float), defaultdict(float), set()
+            for _, item_id, payment_id, total in rows:
+                total = float(total)
+                payments[payment_id] += total
+                gid = genre_of.get(item_id)
+                if gid is None:
+                    yield (month, "item", (None, item_id), "orphan purchase", total, None)
+                    continue
+                genres[gid] += total
+                members.add((gid, item_id))
+            s_genres, s_payments, s_members = _stored(lookup, month)
+            yield from _diff_totals("genre", month, genres, s_genres, tolerance)
+            yield from _diff_totals("payment", month, payments, s_payments, tolerance)
+            yield from _diff_members(month, members, s_members)
+
+        for month in summary_months:
+            if month in seen:
+                continue
+            s_genres, s_payments, s_members = _stored(lookup, month)
+            yield from _diff_totals("genre", month, {}, s_genres, tolerance)
+            yield from _diff_totals("payment", month, {}, s_payments, tolerance)
+            yield from _diff_members(month, set(), s_members)
+    finally:
+        conn.close()
+
+
+def _fmt(v):
+    return "-" if v is None else f"{v:,.2f}"
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Verify the household ledger's monthly summaries against purchases.")
+    ap.add_argument("--db", type=Path, default=None, help=f"SQLite file (default: {db.DB_PATH})")
+    ap.add_argument("--repair", action="store_true", help="recompute the summaries of the months that differ")
+    ap.add_argument("--tolerance", type=float, default=0.005, help="allowed difference per amount")
+    ap.add_argument("--max-report", type=int, default=50, help="print at most this many discrepancies")
+    args = ap.parse_args(argv)
+
+    if args.db:
+        if not args.db.exists():
+            print(f"No such database: {args.db}", file=sys.stderr)
+            return 2
+        db.DB_PATH = args.db
+    conn = db.get_conn()
+    cols = [r[1] for r in conn.execute("PRAGMA table_xinfo(purchases)")]
+    conn.close()
+    if "month" not in cols:
+        print("purchases.month is missing; start the app once (init_db) to upgrade the schema.", file=sys.stderr)
+        return 2
+
+    bad_months = set()
+    count = 0
+    for month, kind, key, problem, expected, stored in verify(args.tolerance):
+        count += 1
+        bad_months.add(month)
+        if count <= args.max_report:
+            print(f"{month}  {kind:<7} {str(key):<14} {problem:<16} expected {_fmt(expected):>14}  stored {_fmt(stored):>14}")
+    if count > args.max_report:
+        print(f"... {count - args.max_report} more")
+
+    if not count:
+        print("OK: monthly summaries match purchases.")
+        return 0
+    print(f"{count} discrepancies in {len(bad_months)} month(s).")
+    if not args.repair:
+        return 1
+
+    from ledger_maintenance import recompute
+    recompute(sorted(bad_months))
+    remaining = sum(1 for _ in verify(args.tolerance))
+    if remaining:
+        print(f"Repair incomplete: {remaining} discrepancies remain.")
+        return 1
+    print(f"Repaired {len(bad_months)} month(s).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
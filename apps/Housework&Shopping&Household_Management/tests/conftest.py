@@ -0,0 +1,62 @@
+# =============================
+# tests/conftest.py
+# -----------------------------
+# Run from the app directory (the Schedule app has its own db module, so run its suite separately):
+#
+#   cd "apps/Housework&Shopping&Household_Management" && python -m pytest tests
+import sys
+from pathlib import Path
+
+import pytest
+
+APP_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(APP_DIR))
+
+import db  # noqa: E402
+
+
+@pytest.fixture
+def ledger_db(tmp_path, monkeypatch):
+    """An initialised kaji.db in a temp directory."""
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "kaji.db")
+    db.init_db()
+    return db.DB_PATH
+
+
+_EXPECTED = {
+    "monthly_genre_items": """
+        SELECT DISTINCT p.month, i.genre_id, p.item_id FROM purchases p JOIN items i ON i.id = p.item_id
+    """,
+    "monthly_genre_summary": """
+        SELECT p.month, i.genre_id, ROUND(SUM(p.total_amount), 6)
+        FROM purchases p JOIN items i ON i.id = p.item_id GROUP BY p.month, i.genre_id
+    """,
+    "monthly_payment_summary": """
+        SELECT month, payment_id, ROUND(SUM(total_amount), 6) FROM purchases GROUP BY month, payment_id
+    """,
+}
+
+
+def summaries_snapshot():
+    """(stored, expected) rows of the three summary tables; expected is a GROUP BY over purchases."""
+    conn = db.get_conn()
+    try:
+        stored = {t: sorted(tuple(round(x, 6) if isinstance(x, float) else x for x in r)
+                            for r in conn.execute(f"SELECT * FROM {t}"))
+                  for t in _EXPECTED}
+        expected = {t: sorted(conn.execute(sql).fetchall()) for t, sql in _EXPECTED.items()}
+    finally:
+        conn.close()
+    return stored, expected
+
+
+@pytest.fixture
+def assert_summaries_match():
+    """Check the stored summaries against the GROUP BY oracle and ledger_verify."""
+    import ledger_verify
+
+    def check():
+        stored, expected = summaries_snapshot()
+        assert stored == expected
+        assert list(ledger_verify.verify()) == []
+    return check
@@ -0,0 +1,50 @@
+import pytest
+
+import db
+import ledger_dashboard
+
+
+@pytest.fixture
+def ledger(ledger_db):
+    ledger_dashboard.clear_cache()
+    genre = db.ensure_genre("Food")
+    item = db.ensure_item(genre, "Rice", "kg")
+    store = db.ensure_store("Market")
+    cash, card = db.ensure_payment("cash"), db.ensure_payment("card")
+    db.insert_purchase(item, "2024-01-05", store, 1, 100.0, cash)
+    db.insert_purchase(item, "2024-01-20", store, 2, 50.5, card)
+    db.insert_purchase(item, "2024-02-01", store, 1, 30.0, cash)
+    yield item, store, cash
+    ledger_dashboard.clear_cache()
+
+
+def _totals(months):
+    df = ledger_dashboard.load_ledger_dashboard(months)["totals"]
+    return dict(zip(df["month"], df["total"]))
+
+
+def test_totals_are_all_purchases_of_the_month(ledger):
+    assert _totals(["2024-01", "2024-02", "2024-03"]) == {
+        m: db.get_month_total(m) for m in ("2024-01", "2024-02")
+    }
+
+
+def test_totals_do_not_depend_on_the_summaries(ledger):
+    conn = db.get_conn()
+    conn.execute("DELETE FROM monthly_payment_summary")
+    conn.commit()
+    conn.close()
+    assert _totals(["2024-01"]) == {"2024-01": pytest.approx(150.5)}
+
+
+def test_cached_payload_follows_writes(ledger):
+    item, store, cash = ledger
+    first = ledger_dashboard.load_ledger_dashboard(["2024-01"])
+    assert ledger_dashboard.load_ledger_dashboard(["2024-01"]) is first
+    db.insert_purchase(item, "2024-01-25", store, 1, 9.5, cash)
+    assert _totals(["2024-01"]) == {"2024-01": pytest.approx(160.0)}
+
+
+def test_empty_month_list(ledger):
+    payload = ledger_dashboard.load_ledger_dashboard([])
+    assert all(df.empty for df in payload.values())
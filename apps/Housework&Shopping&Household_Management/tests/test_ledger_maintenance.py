@@ -0,0 +1,171 @@
+"""
+ledger_maintenance: the bulk operations leave the summaries equal to a GROUP BY over
+purchases, summary_suspend never outlives a transaction, and nested operations share
+one transaction without switching the triggers back on early.
+"""
+import random
+
+import pytest
+
+import db
+import ledger_maintenance
+from ledger_maintenance import _maintenance
+
+
+@pytest.fixture
+def ledger(ledger_db):
+    """Three genres, a dozen items, four payment methods and 400 purchases over a year."""
+    rng = random.Random(3)
+    genres = [db.ensure_genre(f"Genre {g}") for g in range(3)]
+    items = [db.ensure_item(genres[i % 3], f"Item {i}", "pc") for i in range(12)]
+    store = db.ensure_store("Market")
+    payments = [db.ensure_payment(name) for name in ("cash", "card", "bank", "pay")]
+    conn = db.get_conn()
+    conn.executemany(
+        "INSERT INTO purchases(item_id, date, store_id, qty, total_amount, unit_price, payment_id) "
+        "VALUES (?, ?, ?, 1, ?, ?, ?)",
+        [(rng.choice(items), f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}", store,
+          amount, amount, rng.choice(payments))
+         for amount in (round(rng.uniform(1, 300), 2) for _ in range(400))],
+    )
+    conn.commit()
+    conn.close()
+    return genres, items, store, payments
+
+
+def _query(sql, params=()):
+    conn = db.get_conn()
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def _suspended():
+    return _query("SELECT COUNT(*) FROM summary_suspend")[0][0]
+
+
+# ----- bulk operations -----
+
+def test_each_bulk_operation_keeps_the_summaries(ledger, assert_summaries_match):
+    genres, items, store, payments = ledger
+    assert_summaries_match()
+    ledger_maintenance.reassign_payment(payments[0], payments[1])
+    assert_summaries_match()
+    ledger_maintenance.change_item_genre(items[0], genres[2])
+    assert_summaries_match()
+    ledger_maintenance.delete_item(items[1])
+    assert_summaries_match()
+    ledger_maintenance.delete_genre(genres[0])
+    assert_summaries_match()
+    assert _suspended() == 0
+
+
+def test_recompute_repairs_drift(ledger, assert_summaries_match):
+    conn = db.get_conn()
+    conn.execute("UPDATE monthly_genre_summary SET total_amount = total_amount + 1 WHERE month = '2024-03'")
+    conn.execute("DELETE FROM monthly_payment_summary WHERE month = '2024-04'")
+    conn.commit()
+    conn.close()
+    ledger_maintenance.recompute(["2024-03", "2024-04"])
+    assert_summaries_match()
+
+
+def test_missing_targets_raise_and_change_nothing(ledger, assert_summaries_match):
+    with pytest.raises(ValueError):
+        ledger_maintenance.delete_genre(9999)
+    with pytest.raises(ValueError):
+        ledger_maintenance.delete_item(9999)
+    with pytest.raises(ValueError):
+        ledger_maintenance.change_item_genre(9999, 1)
+    assert _suspended() == 0
+    assert_summaries_match()
+
+
+# ----- summary_suspend on failure -----
+
+def test_summary_suspend_is_reset_when_the_body_raises(ledger, assert_summaries_match):
+    genres, items, store, payments = ledger
+    before = _query("SELECT COUNT(*) FROM purchases")[0][0]
+    with pytest.raises(RuntimeError):
+        with _maintenance() as cur:
+            cur.execute("DELETE FROM purchases WHERE item_id=?", (items[0],))
+            assert cur.execute("SELECT COUNT(*) FROM summary_suspend").fetchone()[0] == 1
+            raise RuntimeError("boom")
+    assert _suspended() == 0
+    assert _query("SELECT COUNT(*) FROM purchases")[0][0] == before
+    assert ledger_maintenance._active.cur is None and not ledger_maintenance._active.suspended
+
+    # the triggers are live again for ordinary writes
+    db.insert_purchase(items[0], "2024-06-01", store, 1, 42.0, payments[0])
+    assert_summaries_match()
+
+
+# ----- nesting -----
+
+def test_nested_maintenance_does_not_reenable_the_triggers_early(ledger, assert_summaries_match):
+    genres, items, store, payments = ledger
+    with _maintenance() as cur:
+        with _maintenance() as inner:
+            assert inner is cur
+        # the inner level must not have deleted the outer's suspend row
+        assert cur.execute("SELECT COUNT(*) FROM summary_suspend").fetchone()[0] == 1
+        before = cur.execute("SELECT * FROM monthly_payment_summary ORDER BY 1, 2").fetchall()
+        cur.execute("INSERT INTO purchases(item_id, date, store_id, qty, total_amount, unit_price, payment_id) "
+                    "VALUES (?, '2024-05-05', ?, 1, 10, 10, ?)", (items[0], store, payments[0]))
+        # still suspended: the insert did not reach the summaries
+        assert cur.execute("SELECT * FROM monthly_payment_summary ORDER BY 1, 2").fetchall() == before
+        cur.execute("INSERT INTO affected_months(month) VALUES ('2024-05')")
+        ledger_maintenance.recompute_months(cur)
+    assert _suspended() == 0
+    assert_summaries_match()
+
+
+def test_nested_level_keeps_the_outer_affected_months(ledger, assert_summaries_match):
+    genres, items, store, payments = ledger
+    with _maintenance() as cur:
+        ledger_maintenance._mark_months(cur, "p.payment_id=?", (payments[2],))
+        cur.execute("UPDATE purchases SET payment_id=? WHERE payment_id=?", (payments[3], payments[2]))
+        # a whole operation inside the outer one, with its own marks and recompute
+        ledger_maintenance.delete_item(items[5])
+        assert cur.execute("SELECT COUNT(*) FROM summary_suspend").fetchone()[0] == 1
+        ledger_maintenance.recompute_months(cur, genres=False)
+    assert_summaries_match()
+
+
+def test_failing_nested_operation_rolls_back_to_its_savepoint(ledger, assert_summaries_match):
+    genres, items, store, payments = ledger
+    with _maintenance() as cur:
+        ledger_maintenance._mark_months(cur, "p.item_id=?", (items[0],))
+        cur.execute("DELETE FROM purchases WHERE item_id=?", (items[0],))
+        with pytest.raises(RuntimeError):
+            with _maintenance() as inner:
+                inner.execute("DELETE FROM purchases")
+                raise RuntimeError("boom")
+        with pytest.raises(ValueError):
+            ledger_maintenance.delete_genre(9999)
+        # the outer transaction is intact and still suspended
+        assert cur.execute("SELECT COUNT(*) FROM purchases").fetchone()[0] > 0
+        assert cur.execute("SELECT COUNT(*) FROM summary_suspend").fetchone()[0] == 1
+        ledger_maintenance.recompute_months(cur)
+    assert _query("SELECT COUNT(*) FROM purchases WHERE item_id=?", (items[0],))[0][0] == 0
+    assert _suspended() == 0
+    assert_summaries_match()
+
+
+def test_trigger_path_operation_inside_a_suspended_one(ledger, assert_summaries_match):
+    genres, items, store, payments = ledger
+    with _maintenance() as cur:
+        ledger_maintenance.change_item_genre(items[0], genres[1])
+        assert cur.execute("SELECT COUNT(*) FROM summary_suspend").fetchone()[0] == 1
+    assert_summaries_match()
+
+
+def test_suspending_operation_inside_a_trigger_path_one(ledger, assert_summaries_match):
+    genres, items, store, payments = ledger
+    with _maintenance(suspend=False) as cur:
+        ledger_maintenance.reassign_payment(payments[0], payments[1])
+        # switched off and back on by the inner level
+        assert cur.execute("SELECT COUNT(*) FROM summary_suspend").fetchone()[0] == 0
+        cur.execute("UPDATE items SET genre_id=? WHERE id=?", (genres[0], items[1]))
+    assert_summaries_match()
@@ -0,0 +1,128 @@
+"""
+The per-row summary triggers keep monthly_genre_summary / monthly_genre_items /
+monthly_payment_summary equal to a GROUP BY over purchases after every write.
+"""
+import random
+
+import pytest
+
+import db
+
+
+@pytest.fixture
+def ledger(ledger_db):
+    genres = [db.ensure_genre(name) for name in ("Food", "Household", "Hobby")]
+    items = [db.ensure_item(g, f"Item {g}-{n}", "pc") for g in genres for n in range(3)]
+    stores = [db.ensure_store(name) for name in ("Market", "Online")]
+    payments = [db.ensure_payment(name) for name in ("cash", "card", "bank")]
+    return genres, items, stores, payments
+
+
+def _purchase_ids():
+    conn = db.get_conn()
+    try:
+        return [r[0] for r in conn.execute("SELECT id FROM purchases ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def test_insert_adds_to_the_month(ledger, assert_summaries_match):
+    genres, items, stores, payments = ledger
+    db.insert_purchase(items[0], "2024-01-05", stores[0], 1, 120.5, payments[0])
+    db.insert_purchase(items[1], "2024-01-20", stores[1], 2, 80.25, payments[0])
+    db.insert_purchase(items[0], "2024-02-01", stores[0], 1, 10.0, payments[1])
+    assert_summaries_match()
+    assert db.get_month_total("2024-01") == pytest.approx(200.75)
+
+
+def test_update_moves_amount_between_months_payments_and_items(ledger, assert_summaries_match):
+    genres, items, stores, payments = ledger
+    db.insert_purchase(items[0], "2024-01-05", stores[0], 1, 100.0, payments[0])
+    db.insert_purchase(items[0], "2024-01-06", stores[0], 1, 50.0, payments[0])
+    pid = _purchase_ids()[0]
+
+    db.update_purchase(pid, "2024-03-01", stores[1], 2, 70.0, payments[2])
+    assert_summaries_match()
+
+    # item_id has no API of its own; the trigger covers it all the same
+    conn = db.get_conn()
+    conn.execute("UPDATE purchases SET item_id=? WHERE id=?", (items[-1], pid))
+    conn.commit()
+    conn.close()
+    assert_summaries_match()
+
+
+def test_delete_of_the_last_purchase_removes_the_rows(ledger, assert_summaries_match):
+    genres, items, stores, payments = ledger
+    db.insert_purchase(items[0], "2024-01-05", stores[0], 1, 100.0, payments[0])
+    db.insert_purchase(items[3], "2024-01-05", stores[0], 1, 30.0, payments[1])
+    first, second = _purchase_ids()
+
+    db.delete_purchase(first)
+    assert_summaries_match()
+    db.delete_purchase(second)
+    assert_summaries_match()
+    assert db.get_available_months() == []
+    # deleting again is a no-op
+    db.delete_purchase(second)
+    assert_summaries_match()
+
+
+def test_item_genre_move_merges_into_the_new_genre(ledger, assert_summaries_match):
+    genres, items, stores, payments = ledger
+    food_item, household_item = items[0], items[3]
+    db.insert_purchase(food_item, "2024-01-05", stores[0], 1, 100.0, payments[0])
+    db.insert_purchase(food_item, "2024-02-05", stores[0], 1, 40.0, payments[0])
+    db.insert_purchase(household_item, "2024-01-07", stores[0], 1, 25.0, payments[1])
+    db.insert_purchase(items[1], "2024-02-07", stores[0], 1, 5.0, payments[1])
+
+    db.change_item_genre(food_item, genres[1])
+    assert_summaries_match()
+
+    # straight through the items trigger as well
+    conn = db.get_conn()
+    conn.execute("UPDATE items SET genre_id=? WHERE id=?", (genres[2], food_item))
+    conn.commit()
+    conn.close()
+    assert_summaries_match()
+
+
+def test_payment_reassignment_and_delete(ledger, assert_summaries_match):
+    genres, items, stores, payments = ledger
+    db.insert_purchase(items[0], "2024-01-05", stores[0], 1, 100.0, payments[0])
+    db.insert_purchase(items[1], "2024-01-06", stores[0], 1, 60.0, payments[1])
+    db.insert_purchase(items[2], "2024-02-06", stores[0], 1, 10.0, payments[0])
+
+    db.reassign_payment_in_purchases(payments[0], payments[1])
+    assert_summaries_match()
+    db.delete_payment(payments[0])
+    assert_summaries_match()
+
+
+def test_random_writes_keep_the_summaries_equal_to_group_by(ledger, assert_summaries_match):
+    genres, items, stores, payments = ledger
+    rng = random.Random(7)
+
+    def day():
+        return f"2024-{rng.randint(1, 4):02d}-{rng.randint(1, 28):02d}"
+
+    def amount():
+        return round(rng.uniform(1, 500), 2)
+
+    for step in range(300):
+        pids = _purchase_ids()
+        op = rng.choice(("insert", "insert", "update", "delete", "genre", "payment") if pids else ("insert",))
+        if op == "insert":
+            db.insert_purchase(rng.choice(items), day(), rng.choice(stores), rng.choice((1, 2)), amount(),
+                               rng.choice(payments))
+        elif op == "update":
+            db.update_purchase(rng.choice(pids), day(), rng.choice(stores), 1, amount(), rng.choice(payments))
+        elif op == "delete":
+            db.delete_purchase(rng.choice(pids))
+        elif op == "genre":
+            db.change_item_genre(rng.choice(items), rng.choice(genres))
+        else:
+            db.reassign_payment_in_purchases(rng.choice(payments), rng.choice(payments))
+        if step % 10 == 0:
+            assert_summaries_match()
+    assert_summaries_match()
@@ -0,0 +1,124 @@
+# =============================
+# allocation.py（課題の日別配分シミュレーション）
+# -----------------------------
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+SEC_PER_DAY = 86400.0
+
+
+def norm_progress(p) -> float:
+    """progress を 0.0〜1.0 に正規化（% で入っているものにも対応）"""
+    try:
+        p = float(p)
+    except (TypeError, ValueError):
+        return 0.0
+    if p > 1.0:
+        p = p / 100.0
+    return min(max(p, 0.0), 1.0)
+
+
+def day_range(start: date, end: date) -> pd.DatetimeIndex:
+    return pd.date_range(start, end, freq="D")
+
+
+def simulate_tasks(tasks, start: date, end: date) -> np.ndarray:
+    """
+    期間内の日別×課題別の配分時間（能率補正前）を (日数, 課題数) の配列で返す。
+    各日、残り時間を「締切までの残り日数（当日含む・実数）」で均等割りし、
+    締切まで 1 日を切った日に残りを全て割り当てる（締切超過も同様）。
+    均等割りは残り時間 R・初日時点の残り日数 D に対して毎日 R/D になるので、ループ無しで閉形式で計算する。
+    """
+    n_days = (end - start).days + 1
+    if not tasks or n_days <= 0:
+        return np.zeros((max(n_days, 0), len(tasks or [])))
+
+    day0 = datetime.combine(start, datetime.min.time())
+    remaining = np.array([
+        max(0.0, float(t.get("required_hours", 0.0) or 0.0) * (1.0 - norm_progress(t.get("progress", 0.0) or 0.0)))
+        for t in tasks
+    ])
+    D = np.array([
+        (datetime.fromisoformat(f"{t['due_date']}T{t['due_time']}") - day0).total_seconds() / SEC_PER_DAY
+        for t in tasks
+    ])
+
+    # 残り日数が 1 以上ある日数（この間は毎日 R/D）
+    n_full = np.where(D >= 1.0, np.floor(D), 0.0)
+    per_day = np.divide(remaining, D, out=np.zeros_like(remaining), where=D >= 1.0)
+    last = remaining - n_full * per_day
+
+    k = np.arange(n_days)[:, None]
+    alloc = np.where(k < n_full, per_day, 0.0)
+    alloc = np.where(k == n_full, last, alloc)
+    return np.clip(alloc, 0.0, None)
+
+
+def _efficiency(efficiency, n_days: int) -> np.ndarray:
+    if efficiency is None:
+        return np.ones(n_days)
+    return np.asarray(efficiency, dtype=float)
+
+
+def daily_breakdown(tasks, start: date, end: date, efficiency=None) -> pd.DataFrame:
+    """
+    日別×課題別の必要時間（能率補正後）を縦長の DataFrame で返す。
+    efficiency は日別の能率配列（efficiency_index.multipliers）。省略時は 1.0。
+    列: date, task_id, title, hours（0 の行は除く）
+    """
+    tasks = list(tasks or [])
+    alloc = simulate_tasks(tasks, start, end)
+    hours = alloc / _efficiency(efficiency, alloc.shape[0])[:, None]
+
+    days = day_range(start, end)
+    df = pd.DataFrame({
+        "date": np.repeat(days.values, len(tasks)),
+        "task_id": np.tile([t["id"] for t in tasks], len(days)),
+        "title": np.tile([t["title"] for t in tasks], len(days)),
+        "hours": hours.ravel(),
+    })
+    return df[df["hours"] > 0].reset_index(drop=True)
+
+
+def total_task_hours(tasks, start: date, end: date, efficiency=None) -> float:
+    alloc = simulate_tasks(list(tasks or []), start, end)
+    return float((alloc / _efficiency(efficiency, alloc.shape[0])[:, None]).sum())
+
+
+def _slots_by_day(slots):
+    """空き時間（free_slots.find_free_slots の戻り値）を日付ごとの時系列リストに分割"""
+    out = {}
+    for s in sorted(slots, key=lambda x: x["start"]):
+        cur, end = s["start"], s["end"]
+        while cur < end:
+            nxt = min(end, datetime.combine(cur.date() + timedelta(days=1), datetime.min.time()))
+            out.setdefault(cur.date(), []).append([cur, nxt])
+            cur = nxt
+    return out
+
+
+def place_task_hours(daily: pd.DataFrame, slots) -> pd.DataFrame:
+    """
+    daily_breakdown の各日の必要時間を、その日の空き時間へ早い順に詰めて置く。
+    入りきらない分は置かない（hours の合計との差が不足分）。
+    列: date, task_id, title, start, end, hours
+    """
+    rows = []
+    free = _slots_by_day(slots)
+    for d, grp in daily.groupby(daily["date"].dt.date, sort=True):
+        day_slots = free.get(d, [])
+        k = 0
+        for t in grp.itertuples(index=False):
+            need = timedelta(hours=float(t.hours))
+            while need > timedelta(0) and k < len(day_slots):
+                s, e = day_slots[k]
+                take = min(need, e - s)
+                rows.append({"date": pd.Timestamp(d), "task_id": t.task_id, "title": t.title,
+                             "start": s, "end": s + take, "hours": take.total_seconds() / 3600.0})
+                need -= take
+                day_slots[k][0] = s + take
+                if day_slots[k][0] >= e:
+                    k += 1
+    return pd.DataFrame(rows, columns=["date", "task_id", "title", "start", "end", "hours"])
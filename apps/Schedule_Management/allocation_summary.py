@@ -0,0 +1,137 @@
+# =============================
+# allocation_summary.py（日別の時間配分スナップショット）
+# -----------------------------
+import threading
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from allocation import simulate_tasks
+from db import (
+    get_data_versions, list_allocation_daily, save_allocation_daily,
+    list_cached_events, list_tasks,
+)
+from efficiency_index import multipliers
+from routine_engine import daily_split
+
+CATEGORIES = ["schedule_h", "routine_h", "sleep_h", "task_h"]
+
+# (start, end, anchor, 入力の版数) → DataFrame。同じ条件の再描画は DB も見ない
+_memo = {}
+_memo_lock = threading.Lock()
+MEMO_SIZE = 32
+
+
+def _days(start: date, end: date):
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+def _fingerprint(d: date, versions: dict, anchor: date) -> str:
+    """その日の値を決める入力の版数。変わった日だけ計算し直す"""
+    return "|".join([
+        str(versions.get(f"event:{d.isoformat()}", 0)),
+        str(versions.get("routine", 0)),
+        str(versions.get("task", 0)),
+        str(versions.get("efficiency", 0)),
+        anchor.isoformat(),
+    ])
+
+
+def _schedule_hours(days):
+    """キャッシュ済み Outlook 予定の、各日（ロンドン 0:00〜24:00）に重なる時間"""
+    out = {d: 0.0 for d in days}
+    rows = [r for r in list_cached_events(min(days).isoformat(), max(days).isoformat())
+            if r["start_at"] and r["end_at"]]
+    if not rows:
+        return out
+    df = pd.DataFrame(rows)
+    df = df[df["event_date"].isin({d.isoformat() for d in days})]
+    st_ts = pd.to_datetime(df["start_at"], utc=True)
+    en_ts = pd.to_datetime(df["end_at"], utc=True)
+    day0 = pd.to_datetime(df["event_date"]).dt.tz_localize("Europe/London").dt.tz_convert("UTC")
+    day1 = (pd.to_datetime(df["event_date"]) + pd.Timedelta(days=1)).dt.tz_localize("Europe/London").dt.tz_convert("UTC")
+    secs = (np.minimum(en_ts, day1) - np.maximum(st_ts, day0)).dt.total_seconds().clip(lower=0)
+    for day, s in secs.groupby(df["event_date"]).sum().items():
+        out[date.fromisoformat(day)] = float(s) / 3600.0
+    return out
+
+
+def _routine_hours(days):
+    """各日の (その他 routine, Sleep) 時間。routine_engine が実施日ごとに展開した値"""
+    lo, hi = min(days), max(days)
+    other, sleep = daily_split(lo, hi)
+    return (
+        {d: float(other[(d - lo).days]) for d in days},
+        {d: float(sleep[(d - lo).days]) for d in days},
+    )
+
+
+def _task_hours(days, anchor: date):
+    """
+    anchor（今日）から課題をシミュレーションした各日の必要時間（能率補正後）。
+    閉形式なので日ごとの値は anchor と課題だけで決まり、表示期間には依存しない。anchor より前の日は 0。
+    """
+    out = {d: 0.0 for d in days}
+    future = [d for d in days if d >= anchor]
+    if not future:
+        return out
+    hi = max(future)
+    tasks = list_tasks(active=True)
+    if not tasks:
+        return out
+    per_day = simulate_tasks(tasks, anchor, hi).sum(axis=1) / multipliers(anchor, hi)
+    for d in future:
+        out[d] = float(per_day[(d - anchor).days])
+    return out
+
+
+def _compute(days, anchor: date):
+    sched = _schedule_hours(days)
+    other, sleep = _routine_hours(days)
+    task = _task_hours(days, anchor)
+    return {
+        d: {"schedule_h": sched[d], "routine_h": other[d], "sleep_h": sleep[d], "task_h": task[d]}
+        for d in days
+    }
+
+
+def daily_summary(start: date, end: date, *, anchor: date | None = None) -> pd.DataFrame:
+    """
+    [start, end] の日別カテゴリ時間。
+    列: date, schedule_h, routine_h, sleep_h, task_h, free_h
+    allocation_daily に保存済みで入力の版数が同じ日はそのまま使い、変わった日だけ計算し直す。
+    Outlook 予定はローカルキャッシュの値（取得は呼び出し側で get_events_range など）。
+    """
+    anchor = anchor or date.today()
+    days = _days(start, end)
+    if not days:
+        return pd.DataFrame(columns=["date", *CATEGORIES, "free_h"])
+
+    versions = get_data_versions(start.isoformat(), end.isoformat())
+    memo_key = (start, end, anchor, tuple(sorted(versions.items())))
+    with _memo_lock:
+        hit = _memo.get(memo_key)
+    if hit is not None:
+        return hit.copy()
+
+    fps = {d: _fingerprint(d, versions, anchor) for d in days}
+    cached = {r["day"]: r for r in list_allocation_daily(start.isoformat(), end.isoformat())}
+    stale = [d for d in days if (cached.get(d.isoformat()) or {}).get("fingerprint") != fps[d]]
+    if stale:
+        fresh = _compute(stale, anchor)
+        rows = [dict(fresh[d], day=d.isoformat(), fingerprint=fps[d]) for d in stale]
+        save_allocation_daily(rows, datetime.now(timezone.utc).isoformat())
+        for r in rows:
+            cached[r["day"]] = r
+
+    df = pd.DataFrame([cached[d.isoformat()] for d in days])
+    df["date"] = pd.to_datetime(df["day"])
+    df = df[["date", *CATEGORIES]].reset_index(drop=True)
+    df["free_h"] = (24.0 - df[CATEGORIES].sum(axis=1)).clip(lower=0)
+
+    with _memo_lock:
+        if len(_memo) >= MEMO_SIZE:
+            _memo.pop(next(iter(_memo)))
+        _memo[memo_key] = df
+    return df.copy()
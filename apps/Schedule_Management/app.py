@@ -24,5 +24,10 @@ maybe_exchange_code_silently()
 
 st.title("Plans are worthless, but planning is everything.")
 
-from db import init_db
+from db import init_db, purge_trash
 init_db()
+
+# Trash retention: purge old deleted candidates once per session
+if "trash_purged" not in st.session_state:
+    purge_trash()
+    st.session_state["trash_purged"] = True
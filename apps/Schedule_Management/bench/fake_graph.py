@@ -0,0 +1,203 @@
+# =============================
+# bench/fake_graph.py（ベンチマーク用の Microsoft Graph 偽サーバー）
+# -----------------------------
+# calendarView / calendarView/delta / $batch だけを返すローカル HTTP サーバー。
+# イベントは日付から決まる合成データ（1 日 events_per_day 件）。応答ごとに latency_ms だけ遅らせる。
+#
+#   python bench/fake_graph.py --port 8765 --latency-ms 50 --events-per-day 8
+#
+# graph_client.configure(f"http://127.0.0.1:{port}/v1.0") でアプリをこのサーバーに向けられる。
+import argparse
+import json
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+from zoneinfo import ZoneInfo
+
+LONDON = ZoneInfo("Europe/London")
+DEFAULT_PAGE = 50
+
+
+def _days(start: date, end: date):
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+def _london_dates(start_utc: str, end_utc: str):
+    """UTC の [start, end) に重なるロンドン日付の範囲"""
+    s = datetime.fromisoformat(start_utc.replace("Z", "+00:00")).astimezone(LONDON)
+    e = datetime.fromisoformat(end_utc.replace("Z", "+00:00")).astimezone(LONDON)
+    return s.date(), (e - timedelta(microseconds=1)).date()
+
+
+def make_events(d: date, events_per_day: int):
+    """その日の合成イベント（9:00 から 1 時間ごと、45 分）。Prefer: outlook.timezone=London の形"""
+    out = []
+    for i in range(events_per_day):
+        st = datetime(d.year, d.month, d.day, 9) + timedelta(hours=i % 14, minutes=15 * (i // 14))
+        en = st + timedelta(minutes=45)
+        out.append({
+            "id": f"ev-{d.isoformat()}-{i}",
+            "subject": f"Event {i} on {d.isoformat()}",
+            "start": {"dateTime": st.strftime("%Y-%m-%dT%H:%M:%S.0000000"), "timeZone": "Europe/London"},
+            "end": {"dateTime": en.strftime("%Y-%m-%dT%H:%M:%S.0000000"), "timeZone": "Europe/London"},
+        })
+    return out
+
+
+class FakeGraph:
+    """
+    with FakeGraph(latency_ms=20, events_per_day=8) as fg:
+        graph_client.configure(fg.url)
+    requests には受けたリクエスト数をパスごとに数える。
+    """
+
+    def __init__(self, *, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0,
+                 events_per_day: int = 8):
+        self.latency_ms = latency_ms
+        self.events_per_day = events_per_day
+        self.requests = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1.0"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-graph", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self, key):
+        with self._lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+    # ----- エンドポイント -----
+
+    def _events_between(self, q):
+        lo, hi = _london_dates(q["startdatetime"], q["enddatetime"])
+        events = []
+        for d in _days(lo, hi):
+            events.extend(make_events(d, self.events_per_day))
+        return events
+
+    def _page(self, path, q, events, size):
+        skip = int(q.get("$skip", 0))
+        body = {"value": events[skip:skip + size]}
+        if skip + size < len(events):
+            nq = {k: v for k, v in q.items() if k != "$skip"}
+            nq["$skip"] = skip + size
+            body["@odata.nextLink"] = f"{self.url}{path}?{urlencode(nq)}"
+        return body
+
+    def calendar_view(self, path, q, headers):
+        return self._page(path, q, self._events_between(q), int(q.get("$top", DEFAULT_PAGE)))
+
+    def delta(self, path, q, headers):
+        if "$deltatoken" in q:
+            # 変更なし
+            return {"value": [], "@odata.deltaLink": f"{self.url}{path}?{urlencode(q)}"}
+        size = DEFAULT_PAGE
+        for part in (headers.get("Prefer") or "").split(","):
+            k, _, v = part.strip().partition("=")
+            if k == "odata.maxpagesize" and v.isdigit():
+                size = int(v)
+        body = self._page(path, q, self._events_between(q), size)
+        if "@odata.nextLink" not in body:
+            body["@odata.deltaLink"] = f"{self.url}{path}?{urlencode({'$deltatoken': 'bench'})}"
+        return body
+
+    def batch(self, payload):
+        responses = []
+        for req in payload.get("requests", []):
+            body = dict(req.get("body") or {}, id=f"created-{req.get('id')}")
+            responses.append({"id": req.get("id"), "status": 201, "headers": {}, "body": body})
+        return {"responses": responses}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # ヘッダーと本文を別々に書くので、Nagle と遅延 ACK で 40ms 待たされないように
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _route(self):
+                parts = urlsplit(self.path)
+                path = parts.path.removeprefix("/v1.0")
+                q = {k.lower() if not k.startswith("$") else k: v[-1] for k, v in parse_qs(parts.query).items()}
+                return path, q
+
+            def do_GET(self):
+                path, q = self._route()
+                fake._count(path)
+                time.sleep(fake.latency_ms / 1000.0)
+                low = path.lower()
+                if low == "/me/calendarview":
+                    self._send(200, fake.calendar_view(path, q, self.headers))
+                elif low == "/me/calendarview/delta":
+                    self._send(200, fake.delta(path, q, self.headers))
+                else:
+                    self._send(404, {"error": {"message": f"not found: {path}"}})
+
+            def do_POST(self):
+                path, _ = self._route()
+                fake._count(path)
+                time.sleep(fake.latency_ms / 1000.0)
+                n = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(n) or b"{}")
+                if path == "/$batch":
+                    self._send(200, fake.batch(payload))
+                elif path == "/me/events":
+                    self._send(201, dict(payload, id="created"))
+                else:
+                    self._send(404, {"error": {"message": f"not found: {path}"}})
+
+        return Handler
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Fake Microsoft Graph server for benchmarks")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--events-per-day", type=int, default=8)
+    args = ap.parse_args()
+    fg = FakeGraph(host=args.host, port=args.port, latency_ms=args.latency_ms,
+                   events_per_day=args.events_per_day).start()
+    print(f"Fake Graph listening on {fg.url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fg.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+# =============================
+# bench/run_bench.py（Schedule_Management のベンチマーク）
+# -----------------------------
+# 偽 Graph サーバー（bench/fake_graph.py）を立て、一時 DB に候補・課題・routine を
+# 1k/10k/100k 行ずつ入れて、各処理の所要時間を JSON に書き出す。
+# db が .streamlit/secrets.toml を読むので、アプリのディレクトリから実行する:
+#
+#   python bench/run_bench.py --sizes 1000,10000,100000 --latency-ms 20
+#   python bench/run_bench.py --compare bench/results/<前回>.json
+#
+# --compare を付けると中央値を前回と比べ、threshold 倍（かつ min-delta-ms）を超えて遅くなったものがあれば終了コード 1。
+import argparse
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(APP_DIR))
+
+import db  # noqa: E402
+import graph_client  # noqa: E402
+import routine_engine  # noqa: E402
+import allocation_summary  # noqa: E402
+import efficiency_index  # noqa: E402
+from allocation import total_task_hours  # noqa: E402
+from allocation_summary import _schedule_hours, daily_summary  # noqa: E402
+from conflicts import find_conflicts  # noqa: E402
+from efficiency_index import multipliers  # noqa: E402
+from event_cache import get_events_range  # noqa: E402
+from fake_graph import FakeGraph  # noqa: E402
+
+TOKEN = "bench-token"
+WORDS = ["Meeting", "Lecture", "Seminar", "Review", "Lunch", "Call", "Workshop", "Interview",
+         "Lab", "Gym", "Reading", "Planning", "Sync", "Demo", "Exam", "Office hours"]
+
+
+# ----- 計測 -----
+
+def measure(fn, repeat: int, setup=None, warmup: int = 1):
+    """
+    fn を repeat 回実行した所要時間（ミリ秒）のリスト。setup は各回の前に実行（計測外）。
+    最初の warmup 回（接続の確立やインポートを含む）は捨てる。
+    """
+    times = []
+    for i in range(warmup + repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        if i >= warmup:
+            times.append((time.perf_counter() - t0) * 1000.0)
+    return times
+
+
+def record(results, name, rows, times, **extra):
+    results.append({
+        "name": name,
+        "rows": rows,
+        "repeat": len(times),
+        "min_ms": round(min(times), 3),
+        "median_ms": round(statistics.median(times), 3),
+        "mean_ms": round(statistics.fmean(times), 3),
+        "max_ms": round(max(times), 3),
+        **extra,
+    })
+    r = results[-1]
+    print(f"  {name:<28} rows={str(rows):>7}  median {r['median_ms']:>10.2f} ms  (min {r['min_ms']:.2f})")
+
+
+# ----- データ投入 -----
+
+def use_db(path: Path):
+    """DB を差し替える。版数がリセットされるので、版数で無効化するキャッシュも捨てる"""
+    db.DB_PATH = path
+    db.init_db()
+    routine_engine._months.clear()
+    routine_engine._months_version = None
+    allocation_summary._memo.clear()
+    efficiency_index.invalidate()
+
+
+def seed(n: int, today: date, rng: random.Random):
+    """候補・課題 n 行、routine n/100 行（最低 5 行）を入れる"""
+    cands, tasks = [], []
+    for i in range(n):
+        d = today + timedelta(days=rng.randint(-180, 180))
+        h, m = rng.randint(7, 20), rng.choice((0, 15, 30, 45))
+        dur = rng.choice((30, 45, 60, 90, 120))
+        en = min(h * 60 + m + dur, 24 * 60 - 1)
+        cands.append((
+            d.isoformat(), f"{rng.choice(WORDS)} {rng.choice(WORDS).lower()} #{i}",
+            f"{h:02d}:{m:02d}", f"{en // 60:02d}:{en % 60:02d}", f"https://example.com/c/{i}",
+        ))
+        due = today + timedelta(days=rng.randint(1, 120))
+        tasks.append((
+            f"Task {i}", due.isoformat(), "17:00", rng.choice((1.0, 2.0, 4.0, 8.0, 16.0)),
+            None, rng.choice((0.0, 0.0, 0.25, 0.5)),
+        ))
+    routines = [("Sleep", 7.0, 1, today.isoformat())]
+    for i in range(max(4, n // 100)):
+        routines.append((
+            f"Routine {i}", rng.choice((0.5, 1.0, 1.5, 2.0)), rng.choice((1, 2, 3, 7, 14)),
+            (today - timedelta(days=rng.randint(0, 13))).isoformat(),
+        ))
+    with db.get_conn() as conn:
+        cur = conn.cursor()
+        cur.executemany(
+            "INSERT INTO candidate(date, title, start_time, end_time, info_url) VALUES (?,?,?,?,?)", cands)
+        cur.executemany(
+            "INSERT INTO task(title, due_date, due_time, required_hours, info_url, progress) VALUES (?,?,?,?,?,?)",
+            tasks)
+        cur.executemany(
+            "INSERT INTO routine(title, hours, period_days, anchor_date) VALUES (?,?,?,?)", routines)
+    return {"candidate": len(cands), "task": len(tasks), "routine": len(routines)}
+
+
+def clear_event_cache():
+    """Graph から取り直させる（キャッシュ日と delta の同期状態を消す）"""
+    with db.get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM event_cache_day")
+        cur.execute("DELETE FROM event_sync_state")
+
+
+def clear_allocation():
+    with db.get_conn() as conn:
+        conn.execute("DELETE FROM allocation_daily")
+    allocation_summary._memo.clear()
+
+
+# ----- ベンチマーク -----
+
+def total_ms_hours(start: date, end: date) -> float:
+    """10) の Schedule 時間（Outlook 予定の合計）。キャッシュを温めてから日別に足す"""
+    get_events_range(TOKEN, start, end)
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    return sum(_schedule_hours(days).values())
+
+
+def bench_graph(results, args, today: date, tmp: Path):
+    """Graph 経由の処理（DB の行数には依存しない）"""
+    use_db(tmp / "bench_graph.sqlite3")
+    end = today + timedelta(days=args.days - 1)
+    print(f"graph (latency {args.latency_ms} ms, {args.events_per_day} events/day)")
+    record(results, "list_events", None,
+           measure(lambda: graph_client.list_events(TOKEN, today.isoformat()), args.repeat))
+    record(results, "list_events_range", None,
+           measure(lambda: graph_client.list_events_range(TOKEN, today.isoformat(), end.isoformat()), args.repeat))
+    record(results, "total_ms_hours_cold", None,
+           measure(lambda: total_ms_hours(today, end), args.repeat, setup=clear_event_cache))
+    record(results, "total_ms_hours_warm", None,
+           measure(lambda: total_ms_hours(today, end), args.repeat))
+
+
+def bench_size(results, args, n: int, today: date, tmp: Path):
+    use_db(tmp / f"bench_{n}.sqlite3")
+    t0 = time.perf_counter()
+    counts = seed(n, today, random.Random(args.seed))
+    print(f"rows={n} (seeded {counts} in {time.perf_counter() - t0:.1f} s)")
+    # 予定は先にキャッシュへ（以降は DB 側の処理だけを測る）
+    end = today + timedelta(days=args.days - 1)
+    get_events_range(TOKEN, today, end)
+
+    tasks = db.list_tasks(active=True)
+    record(results, "total_task_hours", n,
+           measure(lambda: total_task_hours(db.list_tasks(active=True), today, end, multipliers(today, end)),
+                   args.repeat), tasks=len(tasks))
+    record(results, "daily_summary_cold", n,
+           measure(lambda: daily_summary(today, end), args.repeat, setup=clear_allocation))
+    record(results, "daily_summary_warm", n,
+           measure(lambda: daily_summary(today, end), args.repeat))
+
+    record(results, "search_candidates_text", n,
+           measure(lambda: db.search_candidates("meeting", page_size=50), args.repeat))
+    rng = (today.isoformat(), end.isoformat())
+    record(results, "search_candidates_range", n,
+           measure(lambda: db.search_candidates("", date_range=rng, page_size=50), args.repeat))
+    first = db.search_candidates("", sort=("title", True), page_size=50)
+    record(results, "search_candidates_next", n,
+           measure(lambda: db.search_candidates("", sort=("title", True), page=first["next"], page_size=50),
+                   args.repeat))
+    record(results, "list_candidates_between", n,
+           measure(lambda: db.list_candidates_between(*rng), args.repeat))
+    record(results, "find_conflicts_week", n,
+           measure(lambda: find_conflicts(today, today + timedelta(days=6)), args.repeat))
+
+
+# ----- 出力・比較 -----
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=APP_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path: Path, threshold: float, min_delta_ms: float) -> int:
+    """前回の結果と中央値を比べ、threshold 倍かつ min_delta_ms を超えて遅くなった件数を返す"""
+    base = json.loads(baseline_path.read_text(encoding="utf-8"))
+    before = {(r["name"], r["rows"]): r["median_ms"] for r in base.get("results", [])}
+    worse = 0
+    print(f"\ncompare with {baseline_path} (commit {base.get('meta', {}).get('commit')})")
+    for r in results:
+        old = before.get((r["name"], r["rows"]))
+        if not old:
+            continue
+        ratio = r["median_ms"] / old
+        flag = "  REGRESSION" if ratio > threshold and r["median_ms"] - old > min_delta_ms else ""
+        worse += bool(flag)
+        print(f"  {r['name']:<28} rows={str(r['rows']):>7}  {old:>10.2f} -> {r['median_ms']:>10.2f} ms  x{ratio:.2f}{flag}")
+    return worse
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Schedule_Management benchmarks against a fake Graph server")
+    ap.add_argument("--sizes", default="1000,10000,100000", help="comma separated row counts")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--days", type=int, default=30, help="date range length for range queries")
+    ap.add_argument("--latency-ms", type=float, default=20.0, help="fake Graph latency per request")
+    ap.add_argument("--events-per-day", type=int, default=8)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", type=Path, default=None, help="JSON output (default: bench/results/<timestamp>.json)")
+    ap.add_argument("--compare", type=Path, default=None, help="previous JSON to compare medians with")
+    ap.add_argument("--threshold", type=float, default=1.2, help="slowdown ratio reported as a regression")
+    ap.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore slowdowns smaller than this")
+    args = ap.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    today = date.today()
+    started = datetime.now(timezone.utc)
+    results = []
+
+    with FakeGraph(latency_ms=args.latency_ms, events_per_day=args.events_per_day) as fg, \
+            tempfile.TemporaryDirectory(prefix="sched-bench-") as tmp:
+        graph_client.configure(fg.url)
+        try:
+            bench_graph(results, args, today, Path(tmp))
+            for n in sizes:
+                bench_size(results, args, n, today, Path(tmp))
+        finally:
+            db.close_pool()
+            graph_client.configure()
+        graph_requests = dict(fg.requests)
+
+    out = {
+        "meta": {
+            "started_at": started.isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "args": {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()},
+            "graph_requests": graph_requests,
+        },
+        "results": results,
+    }
+    path = args.out or APP_DIR / "bench" / "results" / f"bench-{started:%Y%m%d-%H%M%S}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(out, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\nwrote {path}")
+
+    if args.compare:
+        return 1 if compare(results, args.compare, args.threshold, args.min_delta_ms) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
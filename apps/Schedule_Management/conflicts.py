@@ -0,0 +1,158 @@
+# =============================
+# conflicts.py（候補と確定予定の重なり検出）
+# -----------------------------
+import json
+from datetime import date, datetime
+
+import numpy as np
+
+from db import (
+    list_candidates_between, list_cached_events,
+    list_candidates_on_dates, list_cached_events_on_dates,
+)
+from utils import hhmm_to_minutes
+
+MIN_PER_DAY = 1440
+
+
+def _abs_minutes(d: date, minutes: int) -> int:
+    """日付＋分を通し分（序数日 × 1440 + 分）に。日をまたぐ区間も 1 本の軸で比較できる"""
+    return d.toordinal() * MIN_PER_DAY + minutes
+
+
+def _dt_minutes(dt: datetime) -> int:
+    return _abs_minutes(dt.date(), dt.hour * 60 + dt.minute)
+
+
+class IntervalIndex:
+    """
+    半開区間 [start, end) を開始順にソートした配列で保持。
+    - overlapping_pairs(): 重なる組を全て列挙（ソート済み開始に対する searchsorted）
+    - query(lo, hi): [lo, hi) と重なる区間
+    重なり = 共通部分の長さが正（端が接するだけは重ならない）。長さ 0・終了が開始より前の区間は何とも重ならない。
+    """
+
+    def __init__(self, starts, ends, items):
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        order = np.argsort(starts, kind="stable")
+        self.starts = starts[order]
+        self.ends = ends[order]
+        self.items = [items[i] for i in order]
+        self._nonempty = self.ends > self.starts
+
+    def __len__(self):
+        return len(self.items)
+
+    def overlapping_pairs(self):
+        """
+        (i, j) の配列（i < j、開始順の添字）。開始順では j の開始 >= i の開始なので、
+        空でない区間どうしなら 重なる ⇔ starts[j] < ends[i]。i ごとの相手は (i, searchsorted(ends[i])) の
+        連続範囲になる。空の区間は相手の範囲を 0 にし（i 側）、最後に組から外す（j 側）。
+        """
+        n = len(self.starts)
+        if n < 2:
+            return np.empty((0, 2), dtype=np.int64)
+        ends = np.where(self._nonempty, self.ends, self.starts)
+        hi = np.searchsorted(self.starts, ends, side="left")
+        lo = np.arange(1, n + 1)
+        cnt = np.maximum(hi - lo, 0)
+        total = int(cnt.sum())
+        if total == 0:
+            return np.empty((0, 2), dtype=np.int64)
+        i = np.repeat(np.arange(n), cnt)
+        # 各 i の範囲内での連番を作って j = lo[i] + 連番
+        offsets = np.arange(total) - np.repeat(np.cumsum(cnt) - cnt, cnt)
+        j = lo[i] + offsets
+        keep = self._nonempty[j]
+        return np.stack([i[keep], j[keep]], axis=1)
+
+    def query(self, lo: int, hi: int):
+        if hi <= lo:
+            return []
+        k = np.searchsorted(self.starts, hi, side="left")
+        mask = (self.ends[:k] > lo) & self._nonempty[:k]
+        return [self.items[i] for i in np.nonzero(mask)[0]]
+
+
+def _candidate_span(c):
+    """候補の [開始, 終了) の通し分。解釈できなければ None"""
+    try:
+        d = date.fromisoformat(c["date"])
+        return _abs_minutes(d, hhmm_to_minutes(c["start_time"])), _abs_minutes(d, hhmm_to_minutes(c["end_time"]))
+    except (TypeError, ValueError):
+        return None
+
+
+def _make_index(candidates, cached_events) -> IntervalIndex:
+    starts, ends, items = [], [], []
+    for c in candidates:
+        span = _candidate_span(c)
+        if span is None:
+            continue
+        starts.append(span[0])
+        ends.append(span[1])
+        items.append({"kind": "candidate", "id": c["id"], "title": c["title"],
+                      "start": f"{c['date']} {c['start_time']}", "end": f"{c['date']} {c['end_time']}"})
+
+    # 複数日にまたがる予定は日付ごとに行があるので event_id で 1 つにまとめる
+    seen = set()
+    for r in cached_events:
+        if r["event_id"] in seen or not r["start_at"] or not r["end_at"]:
+            continue
+        seen.add(r["event_id"])
+        st_dt = datetime.fromisoformat(r["start_at"])
+        en_dt = datetime.fromisoformat(r["end_at"])
+        starts.append(_dt_minutes(st_dt))
+        ends.append(_dt_minutes(en_dt))
+        items.append({"kind": "event", "id": r["event_id"],
+                      "title": json.loads(r["payload"]).get("subject") or "(No title)",
+                      "start": st_dt.strftime("%Y-%m-%d %H:%M"), "end": en_dt.strftime("%Y-%m-%d %H:%M")})
+    return IntervalIndex(starts, ends, items)
+
+
+def build_index(start: date, end: date, access_token=None) -> IntervalIndex:
+    """
+    [start, end] の候補と Outlook 予定から区間インデックスを作る。
+    access_token があればキャッシュを更新してから使い、無ければ手元のキャッシュのみ。
+    """
+    if access_token:
+        from event_cache import get_events_range
+        get_events_range(access_token, start, end)
+    return _make_index(list_candidates_between(start.isoformat(), end.isoformat()),
+                       list_cached_events(start.isoformat(), end.isoformat()))
+
+
+def find_conflicts(start: date, end: date, access_token=None) -> dict:
+    """
+    [start, end] の候補ごとに、重なる確定予定・他の候補を返す。
+    戻り値: {候補ID: [{"kind", "id", "title", "start", "end"}, ...]}（重なりの無い候補は含まない）
+    """
+    idx = build_index(start, end, access_token)
+    out = {}
+    for i, j in idx.overlapping_pairs():
+        a, b = idx.items[i], idx.items[j]
+        if a["kind"] == "candidate":
+            out.setdefault(a["id"], []).append(b)
+        if b["kind"] == "candidate":
+            out.setdefault(b["id"], []).append(a)
+    return out
+
+
+def find_conflicts_for(candidates) -> dict:
+    """
+    candidates（画面に出ている候補の dict: id, date, start_time, end_time）だけについて、
+    重なる確定予定（キャッシュ）・他の候補を返す。戻り値の形は find_conflicts と同じ。
+    候補は 1 日の中の区間なので、読むのはその日付の候補・予定だけ（期間全体は読まない）。
+    """
+    dates = {c["date"] for c in candidates if c.get("date")}
+    idx = _make_index(list_candidates_on_dates(dates), list_cached_events_on_dates(dates))
+    out = {}
+    for c in candidates:
+        span = _candidate_span(c)
+        if span is None:
+            continue
+        hits = [x for x in idx.query(*span) if not (x["kind"] == "candidate" and x["id"] == c["id"])]
+        if hits:
+            out[c["id"]] = hits
+    return out
@@ -1,18 +1,102 @@
+import queue
 import sqlite3
+import threading
 from contextlib import contextmanager
 from pathlib import Path
 
+from migrations import migrate
+
 DB_PATH = Path("data.sqlite3")
 
+# 接続プール（使い終わった接続を閉じずに再利用する）
+POOL_SIZE = 8
+STATEMENT_CACHE_SIZE = 256
+
+_pool: queue.LifoQueue = queue.LifoQueue(maxsize=POOL_SIZE)
+_pool_path = None
+_pool_lock = threading.Lock()
+# スレッドごとの使用中の接続（get_conn の入れ子では同じ接続・同じトランザクションを使う）
+_local = threading.local()
+
+
+def _connect():
+    conn = sqlite3.connect(
+        DB_PATH,
+        timeout=30,
+        check_same_thread=False,  # プールに戻した接続は別スレッドが使う
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _checkout():
+    global _pool_path
+    with _pool_lock:
+        # DB_PATH が差し替えられたら古い接続は捨てる
+        if _pool_path != str(DB_PATH):
+            _drain()
+            _pool_path = str(DB_PATH)
+        try:
+            return _pool.get_nowait()
+        except queue.Empty:
+            pass
+    return _connect()
+
+
+def _checkin(conn):
+    with _pool_lock:
+        if _pool_path == str(DB_PATH):
+            try:
+                _pool.put_nowait(conn)
+                return
+            except queue.Full:
+                pass
+    conn.close()
+
+
+def _drain():
+    while True:
+        try:
+            _pool.get_nowait().close()
+        except queue.Empty:
+            return
+
+
+def close_pool():
+    """プール中の接続を全て閉じる（DB ファイルを差し替える前など）"""
+    with _pool_lock:
+        _drain()
+
+
 @contextmanager
 def get_conn():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    """
+    プールから接続を借りる。一番外側を抜けるときに commit（例外なら rollback）して返す。
+    同じスレッド内で入れ子になった呼び出しは同じ接続を使う。
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        _local.depth += 1
+        try:
+            yield conn
+        finally:
+            _local.depth -= 1
+        return
+
+    conn = _checkout()
+    _local.conn, _local.depth = conn, 1
     try:
         yield conn
-    finally:
         conn.commit()
-        conn.close()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        _local.conn = None
+        _checkin(conn)
 
 def init_db():
     with get_conn() as conn:
@@ -29,6 +113,46 @@ def init_db():
             );
             """
         )
+        # Outlook イベントのローカルキャッシュ（ロンドン日付ごと）
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS event_cache (
+                event_id TEXT NOT NULL,
+                event_date TEXT NOT NULL,
+                start_at TEXT,
+                end_at TEXT,
+                payload TEXT NOT NULL, -- Graph のイベント JSON
+                PRIMARY KEY(event_id, event_date)
+            );
+            """
+        )
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_event_cache_date ON event_cache(event_date, start_at)")
+        # キャッシュ済みの日付（イベント 0 件の日も含む）
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS event_cache_day (
+                event_date TEXT PRIMARY KEY,
+                fetched_at TEXT NOT NULL
+            );
+            """
+        )
+        # calendarView/delta の同期状態（同期ウィンドウごと）
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS event_sync_state (
+                window_start TEXT NOT NULL,
+                window_end TEXT NOT NULL,
+                delta_link TEXT,
+                last_sync_at TEXT,
+                last_changed INTEGER NOT NULL DEFAULT 0,
+                last_bytes INTEGER NOT NULL DEFAULT 0,
+                full_bytes INTEGER NOT NULL DEFAULT 0, -- 直近の初回（全件）同期のバイト数
+                total_bytes INTEGER NOT NULL DEFAULT 0,
+                sync_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY(window_start, window_end)
+            );
+            """
+        )
         # 候補（ドラフト予定）
         cur.execute(
             """
@@ -106,6 +230,11 @@ def init_db():
             );
             """
         )
+        # インデックス等のスキーマ変更（PRAGMA user_version で管理）
+        migrate(conn)
+    # 列構成が変わっている可能性があるので作り直させる
+    _columns_cache.clear()
+    _fts_mode.clear()
 
 # クエリ関数（候補）
 
@@ -127,6 +256,104 @@ def list_candidates_by_date(date):
         )
         return [dict(r) for r in cur.fetchall()]
 
+def list_candidates_between(start_date, end_date):
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT * FROM candidate WHERE date BETWEEN ? AND ? ORDER BY date ASC, start_time ASC",
+            (start_date, end_date)
+        )
+        return [dict(r) for r in cur.fetchall()]
+
+def list_candidates_on_dates(dates):
+    """dates（ISO 日付のリスト）のいずれかの日の候補"""
+    dates = sorted(set(dates))
+    if not dates:
+        return []
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            f"SELECT * FROM candidate WHERE date IN ({','.join('?' * len(dates))}) ORDER BY date ASC, start_time ASC",
+            dates
+        )
+        return [dict(r) for r in cur.fetchall()]
+
+# 候補の検索（並べ替え可能な列 → SQL 列）
+CANDIDATE_SORT_KEYS = ("date", "start_time", "title")
+_fts_mode = {}
+
+def _candidate_fts_trigram() -> bool:
+    """candidate_fts が trigram で作られているか（部分一致に使えるか）。DB ごとに 1 回だけ確認"""
+    key = str(DB_PATH)
+    if key not in _fts_mode:
+        with get_conn() as conn:
+            r = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'candidate_fts'").fetchone()
+        _fts_mode[key] = bool(r and "trigram" in (r[0] or ""))
+    return _fts_mode[key]
+
+def search_candidates(query="", date_range=None, sort=("date", True), page=None, page_size=50):
+    """
+    候補を検索して 1 ページ分返す（キーセット方式のページ送り）。
+    - query: 空白区切りの語を全て含む（タイトル・情報リンクの部分一致）。
+      3 文字以上の語は FTS5（trigram）索引で引き、それ以外は LIKE
+    - date_range: (start_date, end_date) の ISO 文字列（両端含む）。None なら全期間
+    - sort: (列, 昇順か)。列は CANDIDATE_SORT_KEYS。同値は id 昇順
+    - page: 前ページの戻り値の "next"（None なら先頭ページ）
+    戻り値: {"rows": [...], "next": 次ページ用のカーソル or None, "total": 条件に合う件数}
+    """
+    sort_key, asc = sort
+    if sort_key not in CANDIDATE_SORT_KEYS:
+        raise ValueError(f"unsupported sort key: {sort_key}")
+
+    where, params = [], []
+    if date_range:
+        where.append("c.date BETWEEN ? AND ?")
+        params.extend([date_range[0], date_range[1]])
+
+    terms = [t for t in (query or "").split() if t]
+    fts_terms = [t for t in terms if len(t) >= 3] if _candidate_fts_trigram() else []
+    if fts_terms:
+        # 各語をフレーズとして AND
+        match = " AND ".join('"' + t.replace('"', '""') + '"' for t in fts_terms)
+        where.append("c.id IN (SELECT rowid FROM candidate_fts WHERE candidate_fts MATCH ?)")
+        params.append(match)
+    for t in terms:
+        if t in fts_terms:
+            continue
+        like = "%" + t.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        where.append("(c.title LIKE ? ESCAPE '\\' OR IFNULL(c.info_url, '') LIKE ? ESCAPE '\\')")
+        params.extend([like, like])
+
+    base = "FROM candidate AS c" + (" WHERE " + " AND ".join(where) if where else "")
+
+    page_where, page_params = [], []
+    if page:
+        # (並べ替え列, id) が前ページの最後より後ろ
+        op = ">" if asc else "<"
+        page_where.append(f"(c.{sort_key} {op} ? OR (c.{sort_key} = ? AND c.id > ?))")
+        page_params.extend([page["value"], page["value"], page["id"]])
+    cond = (" AND " if where else " WHERE ") + " AND ".join(page_where) if page_where else ""
+
+    with get_conn() as conn:
+        cur = conn.cursor()
+        total = cur.execute(f"SELECT COUNT(*) {base}", params).fetchone()[0]
+        cur.execute(
+            f"""
+            SELECT c.id, c.date, c.title, c.start_time, c.end_time, c.info_url
+            {base}{cond}
+            ORDER BY c.{sort_key} {'ASC' if asc else 'DESC'}, c.id ASC
+            LIMIT ?
+            """,
+            [*params, *page_params, int(page_size) + 1]
+        )
+        rows = [dict(r) for r in cur.fetchall()]
+
+    nxt = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        nxt = {"value": rows[-1][sort_key], "id": rows[-1]["id"]}
+    return {"rows": rows, "next": nxt, "total": total}
+
 def get_candidate(cid):
     with get_conn() as conn:
         cur = conn.cursor()
@@ -134,6 +361,24 @@ def get_candidate(cid):
         r = cur.fetchone()
         return dict(r) if r else None
 
+def get_candidates(ids):
+    """id のリストに対応する候補を 1 クエリで取得（存在しない id は除外、入力順）"""
+    ids = list(dict.fromkeys(int(i) for i in ids))
+    if not ids:
+        return []
+    found = {}
+    with get_conn() as conn:
+        cur = conn.cursor()
+        # SQLite の変数上限を超えないように分割
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            cur.execute(
+                f"SELECT * FROM candidate WHERE id IN ({','.join('?' * len(chunk))})",
+                chunk
+            )
+            found.update({r["id"]: dict(r) for r in cur.fetchall()})
+    return [found[i] for i in ids if i in found]
+
 def update_candidate(cid, date, title, start_time, end_time, info_url):
     with get_conn() as conn:
         cur = conn.cursor()
@@ -148,60 +393,136 @@ def update_candidate(cid, date, title, start_time, end_time, info_url):
         return cur.rowcount
 
 def delete_candidate(cid):
-    # ゴミ箱へ移動
-    import datetime as dt
+    # ゴミ箱へ移動（deleted_at は UTC の 'YYYY-MM-DD HH:MM:SS'。SQLite の datetime() と同じ形式）
     with get_conn() as conn:
         cur = conn.cursor()
-        cur.execute("SELECT * FROM candidate WHERE id = ?", (cid,))
-        r = cur.fetchone()
-        if not r:
-            return 0
-        r = dict(r)
         cur.execute(
-            "INSERT INTO candidate_trash(id, date, title, start_time, end_time, info_url, deleted_at) VALUES (?,?,?,?,?,?,?)",
-            (r["id"], r["date"], r["title"], r["start_time"], r["end_time"], r["info_url"], dt.datetime.utcnow().isoformat())
+            """
+            INSERT INTO candidate_trash(id, date, title, start_time, end_time, info_url, deleted_at)
+            SELECT id, date, title, start_time, end_time, info_url, datetime('now')
+              FROM candidate WHERE id = ?
+            """,
+            (cid,)
         )
+        if cur.rowcount == 0:
+            return 0
         cur.execute("DELETE FROM candidate WHERE id = ?", (cid,))
         return 1
 
-def list_trash(limit=50):
+# ゴミ箱（候補）
+
+# 保持期間・最大件数（purge_trash の既定値）
+TRASH_RETENTION_DAYS = 90
+TRASH_MAX_ROWS = 1000
+TRASH_PURGE_BATCH = 500
+
+def list_trash(limit_days: int | None = 30, limit_rows: int | None = 200):
+    """candidate_trash から最近削除を新しい順に取得。期間・件数で絞り込み。"""
+    sql = "SELECT id, title, date, start_time, end_time, info_url, deleted_at FROM candidate_trash"
+    params = []
+    if limit_days is not None:
+        # deleted_at は datetime('now') と同じ形式なので文字列比較・インデックスがそのまま使える
+        sql += " WHERE deleted_at >= datetime('now', ?)"
+        params.append(f"-{int(limit_days)} days")
+    sql += " ORDER BY deleted_at DESC, id DESC"
+    if limit_rows is not None:
+        sql += " LIMIT ?"
+        params.append(int(limit_rows))
     with get_conn() as conn:
         cur = conn.cursor()
-        cur.execute("SELECT * FROM candidate_trash ORDER BY deleted_at DESC LIMIT ?", (limit,))
+        cur.execute(sql, params)
         return [dict(r) for r in cur.fetchall()]
 
-def restore_from_trash(cid):
+def _id_chunks(ids, size=500):
+    ids = list(dict.fromkeys(int(i) for i in ids))
+    for i in range(0, len(ids), size):
+        yield ids[i:i + size]
+
+def restore_from_trash_bulk(ids) -> int:
+    """ゴミ箱の候補をまとめて candidate に戻す（1 トランザクション）。戻り値は復元件数"""
+    n = 0
     with get_conn() as conn:
         cur = conn.cursor()
-        cur.execute("SELECT * FROM candidate_trash WHERE id = ?", (cid,))
-        r = cur.fetchone()
-        if not r:
-            return 0
-        r = dict(r)
-        cur.execute(
-            "INSERT INTO candidate(id, date, title, start_time, end_time, info_url) VALUES (?,?,?,?,?,?)",
-            (r["id"], r["date"], r["title"], r["start_time"], r["end_time"], r["info_url"])
-        )
-        cur.execute("DELETE FROM candidate_trash WHERE id = ?", (cid,))
-        return 1
+        for chunk in _id_chunks(ids):
+            marks = ",".join("?" * len(chunk))
+            cur.execute(
+                f"""
+                INSERT OR REPLACE INTO candidate(id, date, title, start_time, end_time, info_url)
+                SELECT id, date, title, start_time, end_time, info_url
+                  FROM candidate_trash WHERE id IN ({marks})
+                """,
+                chunk
+            )
+            cur.execute(f"DELETE FROM candidate_trash WHERE id IN ({marks})", chunk)
+            n += cur.rowcount
+    return n
+
+def delete_from_trash_bulk(ids) -> int:
+    """ゴミ箱から完全削除（復元不可）。戻り値は削除件数"""
+    n = 0
+    with get_conn() as conn:
+        cur = conn.cursor()
+        for chunk in _id_chunks(ids):
+            cur.execute(f"DELETE FROM candidate_trash WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+            n += cur.rowcount
+    return n
+
+def restore_from_trash(item_id: int) -> int:
+    return restore_from_trash_bulk([item_id])
+
+def delete_from_trash(item_id: int) -> int:
+    return delete_from_trash_bulk([item_id])
+
+def purge_trash(max_age_days: int | None = TRASH_RETENTION_DAYS, max_rows: int | None = TRASH_MAX_ROWS,
+                batch_size: int = TRASH_PURGE_BATCH) -> int:
+    """
+    保持期間より古い行と、新しい順で max_rows 件目より後の行を削除。
+    batch_size 件ずつ別トランザクションで消すので、書き込みロックを長く持たない
+    （DELETE ... LIMIT は標準ビルドで使えないため rowid IN (SELECT ... LIMIT) で代用）。
+    戻り値は削除件数。
+    """
+    batches = []
+    if max_age_days is not None:
+        batches.append((
+            "SELECT rowid FROM candidate_trash WHERE deleted_at < datetime('now', ?) LIMIT ?",
+            (f"-{int(max_age_days)} days",),
+        ))
+    if max_rows is not None:
+        batches.append((
+            "SELECT rowid FROM candidate_trash ORDER BY deleted_at DESC, id DESC LIMIT ? OFFSET ?",
+            None,
+        ))
+    total = 0
+    for select, params in batches:
+        while True:
+            if params is None:
+                args = (int(batch_size), int(max_rows))
+            else:
+                args = params + (int(batch_size),)
+            with get_conn() as conn:
+                cur = conn.cursor()
+                cur.execute(f"DELETE FROM candidate_trash WHERE rowid IN ({select})", args)
+                n = cur.rowcount
+            total += n
+            if n < batch_size:
+                break
+    return total
 
 # メタ情報（イベント紐づけ）
 
 def upsert_event_meta(event_id, event_date, info_url=None, proof_path=None):
     with get_conn() as conn:
         cur = conn.cursor()
-        cur.execute("SELECT id FROM event_meta WHERE event_id=? AND event_date=?", (event_id, event_date))
-        r = cur.fetchone()
-        if r:
-            cur.execute(
-                "UPDATE event_meta SET info_url=?, proof_path=? WHERE id=?",
-                (info_url, proof_path, r[0])
-            )
-        else:
-            cur.execute(
-                "INSERT INTO event_meta(event_id, event_date, info_url, proof_path) VALUES (?,?,?,?)",
-                (event_id, event_date, info_url, proof_path)
-            )
+        # (event_id, event_date) のユニークインデックス（migrations 1）で 1 文の UPSERT
+        cur.execute(
+            """
+            INSERT INTO event_meta(event_id, event_date, info_url, proof_path) VALUES (?,?,?,?)
+            ON CONFLICT(event_id, event_date) DO UPDATE SET
+                info_url = excluded.info_url,
+                proof_path = excluded.proof_path
+            """,
+            (event_id, event_date, info_url, proof_path)
+        )
         return True
 
 def get_event_meta_by_date(event_date):
@@ -210,6 +531,230 @@ def get_event_meta_by_date(event_date):
         cur.execute("SELECT * FROM event_meta WHERE event_date = ?", (event_date,))
         return [dict(r) for r in cur.fetchall()]
 
+# 証拠ファイルの実体（proof_store）
+
+def get_proof_blob(sha256):
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT * FROM proof_blob WHERE sha256 = ?", (sha256,))
+        r = cur.fetchone()
+        return dict(r) if r else None
+
+def add_proof_blob(sha256, path, size):
+    """実体を登録して行を返す。ファイルが消えて保存し直した実体は新しいパスに付け替える"""
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT INTO proof_blob(sha256, path, size, created_at) VALUES (?, ?, ?, datetime('now'))
+            ON CONFLICT(sha256) DO UPDATE SET path = excluded.path, size = excluded.size
+        """, (sha256, path, size))
+        cur.execute("SELECT * FROM proof_blob WHERE sha256 = ?", (sha256,))
+        return dict(cur.fetchone())
+
+# イベントキャッシュ
+
+def replace_cached_events(start_date, end_date, rows, fetched_at):
+    """
+    [start_date, end_date] のキャッシュを rows で置き換え、期間内の全日付を取得済みにする。
+    rows: dict(event_id, event_date, start_at, end_at, payload) のリスト
+    変わった行だけ書く（内容が同じ行は UPDATE しない・無くなった行だけ消す）ので、
+    何も変わっていない再取得では 'event:<日付>' の版数が進まず、日別の配分キャッシュが効く。
+    """
+    import datetime as dt
+    d0 = dt.date.fromisoformat(start_date)
+    d1 = dt.date.fromisoformat(end_date)
+    days = [(d0 + dt.timedelta(days=i)).isoformat() for i in range((d1 - d0).days + 1)]
+    keep = {(r["event_id"], r["event_date"]) for r in rows}
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT event_id, event_date FROM event_cache WHERE event_date BETWEEN ? AND ?",
+            (start_date, end_date)
+        )
+        gone = [tuple(r) for r in cur.fetchall() if tuple(r) not in keep]
+        cur.executemany("DELETE FROM event_cache WHERE event_id = ? AND event_date = ?", gone)
+        cur.executemany(
+            """
+            INSERT INTO event_cache(event_id, event_date, start_at, end_at, payload) VALUES (?,?,?,?,?)
+            ON CONFLICT(event_id, event_date) DO UPDATE SET
+                start_at = excluded.start_at,
+                end_at = excluded.end_at,
+                payload = excluded.payload
+            WHERE payload IS NOT excluded.payload
+               OR start_at IS NOT excluded.start_at
+               OR end_at IS NOT excluded.end_at
+            """,
+            [(r["event_id"], r["event_date"], r["start_at"], r["end_at"], r["payload"]) for r in rows]
+        )
+        cur.executemany(
+            "INSERT OR REPLACE INTO event_cache_day(event_date, fetched_at) VALUES (?,?)",
+            [(d, fetched_at) for d in days]
+        )
+        return len(rows)
+
+def list_cached_events(start_date, end_date):
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT * FROM event_cache
+            WHERE event_date BETWEEN ? AND ?
+            ORDER BY event_date ASC, start_at ASC
+            """,
+            (start_date, end_date)
+        )
+        return [dict(r) for r in cur.fetchall()]
+
+def list_cached_events_on_dates(dates):
+    """dates のいずれかの日に重なるキャッシュ済みイベント（複数日の予定は日付ごとの行）"""
+    dates = sorted(set(dates))
+    if not dates:
+        return []
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            f"""
+            SELECT * FROM event_cache
+            WHERE event_date IN ({','.join('?' * len(dates))})
+            ORDER BY event_date ASC, start_at ASC
+            """,
+            dates
+        )
+        return [dict(r) for r in cur.fetchall()]
+
+def list_cached_days(start_date, end_date):
+    """{event_date: fetched_at} を返す（キャッシュ済みの日付のみ）"""
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT event_date, fetched_at FROM event_cache_day WHERE event_date BETWEEN ? AND ?",
+            (start_date, end_date)
+        )
+        return {r["event_date"]: r["fetched_at"] for r in cur.fetchall()}
+
+def invalidate_cached_days(dates):
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.executemany("DELETE FROM event_cache_day WHERE event_date = ?", [(d,) for d in dates])
+        return cur.rowcount
+
+def apply_event_changes(window_start, window_end, event_ids, rows, fetched_at):
+    """
+    差分同期の結果を反映。event_ids のウィンドウ内の行を消してから rows を入れ直し、
+    ウィンドウ内の全日付を取得済みにする（削除イベントは rows に含めない）。
+    """
+    import datetime as dt
+    d0 = dt.date.fromisoformat(window_start)
+    d1 = dt.date.fromisoformat(window_end)
+    days = [(d0 + dt.timedelta(days=i)).isoformat() for i in range((d1 - d0).days + 1)]
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.executemany(
+            "DELETE FROM event_cache WHERE event_id = ? AND event_date BETWEEN ? AND ?",
+            [(eid, window_start, window_end) for eid in event_ids]
+        )
+        cur.executemany(
+            "INSERT OR REPLACE INTO event_cache(event_id, event_date, start_at, end_at, payload) VALUES (?,?,?,?,?)",
+            [(r["event_id"], r["event_date"], r["start_at"], r["end_at"], r["payload"]) for r in rows]
+        )
+        cur.executemany(
+            "INSERT OR REPLACE INTO event_cache_day(event_date, fetched_at) VALUES (?,?)",
+            [(d, fetched_at) for d in days]
+        )
+        return len(rows)
+
+def get_sync_state(window_start, window_end):
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT * FROM event_sync_state WHERE window_start = ? AND window_end = ?",
+            (window_start, window_end)
+        )
+        r = cur.fetchone()
+        return dict(r) if r else None
+
+def list_sync_states():
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT * FROM event_sync_state ORDER BY last_sync_at DESC")
+        return [dict(r) for r in cur.fetchall()]
+
+def save_sync_state(window_start, window_end, delta_link, synced_at, changed, nbytes, full):
+    """同期 1 回分を記録。full=True は初回（全件）同期"""
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            INSERT INTO event_sync_state(window_start, window_end, delta_link, last_sync_at,
+                                         last_changed, last_bytes, full_bytes, total_bytes, sync_count)
+            VALUES (?,?,?,?,?,?,?,?,1)
+            ON CONFLICT(window_start, window_end) DO UPDATE SET
+                delta_link = excluded.delta_link,
+                last_sync_at = excluded.last_sync_at,
+                last_changed = excluded.last_changed,
+                last_bytes = excluded.last_bytes,
+                full_bytes = CASE WHEN ? THEN excluded.full_bytes ELSE full_bytes END,
+                total_bytes = total_bytes + excluded.last_bytes,
+                sync_count = sync_count + 1
+            """,
+            (window_start, window_end, delta_link, synced_at, changed, nbytes,
+             nbytes if full else 0, nbytes, 1 if full else 0)
+        )
+        return True
+
+def clear_sync_state(window_start, window_end):
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "DELETE FROM event_sync_state WHERE window_start = ? AND window_end = ?",
+            (window_start, window_end)
+        )
+        return cur.rowcount
+
+# 入力データのバージョン・時間配分スナップショット
+
+def get_data_versions(start_date, end_date, scopes=("task", "routine", "efficiency")):
+    """scopes と、[start_date, end_date] の日付ごとの 'event:YYYY-MM-DD' の版数（未登録は含まない）"""
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            f"""
+            SELECT scope, version FROM data_version
+             WHERE scope IN ({','.join('?' * len(scopes))})
+                OR scope BETWEEN ? AND ?
+            """,
+            (*scopes, f"event:{start_date}", f"event:{end_date}")
+        )
+        return {r["scope"]: r["version"] for r in cur.fetchall()}
+
+def list_allocation_daily(start_date, end_date):
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT * FROM allocation_daily WHERE day BETWEEN ? AND ? ORDER BY day",
+            (start_date, end_date)
+        )
+        return [dict(r) for r in cur.fetchall()]
+
+def save_allocation_daily(rows, computed_at):
+    """rows: dict(day, fingerprint, schedule_h, routine_h, sleep_h, task_h) のリスト"""
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.executemany(
+            """
+            INSERT INTO allocation_daily(day, fingerprint, schedule_h, routine_h, sleep_h, task_h, computed_at)
+            VALUES (:day, :fingerprint, :schedule_h, :routine_h, :sleep_h, :task_h, :computed_at)
+            ON CONFLICT(day) DO UPDATE SET
+                fingerprint = excluded.fingerprint,
+                schedule_h = excluded.schedule_h,
+                routine_h = excluded.routine_h,
+                sleep_h = excluded.sleep_h,
+                task_h = excluded.task_h,
+                computed_at = excluded.computed_at
+            """,
+            [dict(r, computed_at=computed_at) for r in rows]
+        )
+
 # 課題系
 
 def insert_task(title, due_date, due_time, required_hours, info_url, progress=0.0):
@@ -221,12 +766,18 @@ def insert_task(title, due_date, due_time, required_hours, info_url, progress=0.
         )
         return cur.lastrowid
 
-def list_tasks(active=True):
+def list_tasks(active=True, limit=None, offset=0):
     """
     active=True  : 未完了（proofが無い）を表示。progressは無視。
     active=False : 完了（proofがある）を表示。progressは無視。
     戻り値は両方とも completed_at を列に含む（未完了側は None）。
+    limit / offset を渡すとその範囲だけ返す（ページ送り用）。
     """
+    page = ""
+    params = ()
+    if limit is not None:
+        page = "LIMIT ? OFFSET ?"
+        params = (int(limit), int(offset))
     with get_conn() as conn:
         cur = conn.cursor()
         if active:
@@ -242,7 +793,8 @@ def list_tasks(active=True):
                     WHERE p.task_id = t.id
                 )
                 ORDER BY t.due_date ASC, t.due_time ASC, t.id ASC
-                """
+                """ + page,
+                params
             )
         else:
             # 完了＝ task_proof が1件以上ある（最新completed_atでソート）
@@ -261,7 +813,8 @@ def list_tasks(active=True):
                     WHERE p.task_id = t.id
                 )
                 ORDER BY completed_at DESC, t.id DESC
-                """
+                """ + page,
+                params
             )
         return [dict(r) for r in cur.fetchall()]
 
@@ -331,7 +884,21 @@ def insert_efficiency(start_date, end_date, efficiency, repeat, interval_days):
             "INSERT INTO efficiency(start_date, end_date, efficiency, repeat, interval_days) VALUES (?,?,?,?,?)",
             (start_date, end_date, efficiency, repeat, interval_days)
         )
-        return cur.lastrowid
+        new_id = cur.lastrowid
+    _efficiency_changed(None, get_efficiency(new_id))
+    return new_id
+
+def get_efficiency(eff_id):
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT * FROM efficiency WHERE id = ?", (eff_id,))
+        r = cur.fetchone()
+        return dict(r) if r else None
+
+def _efficiency_changed(old, new):
+    # 日別能率タイムライン（efficiency_index）へ差分を通知
+    from efficiency_index import on_efficiency_changed
+    on_efficiency_changed(old, new)
 
 def list_efficiency():
     with get_conn() as conn:
@@ -339,13 +906,18 @@ def list_efficiency():
         cur.execute("SELECT * FROM efficiency ORDER BY start_date DESC")
         return [dict(r) for r in cur.fetchall()]
 
-def insert_routine(title, hours, period_days):
+def insert_routine(title, hours, period_days, anchor_date=None):
+    # anchor_date: 周期の起点（この日に 1 回目）。省略時は今日
     with get_conn() as conn:
         cur = conn.cursor()
-        cur.execute("INSERT INTO routine(title, hours, period_days) VALUES (?,?,?)", (title, hours, period_days))
+        cur.execute(
+            "INSERT INTO routine(title, hours, period_days, anchor_date) VALUES (?,?,?,COALESCE(?, date('now')))",
+            (title, hours, period_days, anchor_date)
+        )
         return cur.lastrowid
 
 def update_efficiency(eff_id, start_date, end_date, efficiency, repeat, interval_days):
+    old = get_efficiency(eff_id)
     with get_conn() as conn:
         cur = conn.cursor()
         cur.execute(
@@ -357,13 +929,20 @@ def update_efficiency(eff_id, start_date, end_date, efficiency, repeat, interval
             """,
             (start_date, end_date, efficiency, repeat, interval_days, eff_id),
         )
-        return cur.rowcount  # 1 が期待値
+        n = cur.rowcount  # 1 が期待値
+    if n:
+        _efficiency_changed(old, get_efficiency(eff_id))
+    return n
 
 def delete_efficiency(eff_id):
+    old = get_efficiency(eff_id)
     with get_conn() as conn:
         cur = conn.cursor()
         cur.execute("DELETE FROM efficiency WHERE id = ?", (eff_id,))
-        return cur.rowcount  # 1 が期待値
+        n = cur.rowcount  # 1 が期待値
+    if n:
+        _efficiency_changed(old, None)
+    return n
 
 
 def list_routine():
@@ -372,10 +951,14 @@ def list_routine():
         cur.execute("SELECT * FROM routine ORDER BY id DESC")
         return [dict(r) for r in cur.fetchall()]
 
-def update_routine(rid, title, hours, period_days):
+def update_routine(rid, title, hours, period_days, anchor_date=None):
+    # anchor_date を省略したときは変更しない
     with get_conn() as conn:
         cur = conn.cursor()
-        cur.execute("UPDATE routine SET title=?, hours=?, period_days=? WHERE id=?", (title, hours, period_days, rid))
+        cur.execute(
+            "UPDATE routine SET title=?, hours=?, period_days=?, anchor_date=COALESCE(?, anchor_date) WHERE id=?",
+            (title, hours, period_days, anchor_date, rid)
+        )
         return cur.rowcount
 
 def delete_routine(rid):
@@ -383,7 +966,8 @@ def delete_routine(rid):
         cur = conn.cursor()
         cur.execute("DELETE FROM routine WHERE id=?", (rid,))
         return cur.rowcount
-def list_task_proofs(task_id: int):
+def _task_proof_select():
+    """task_proof の SELECT 列（path / uploaded_at に揃える）と並び順の列"""
     cols = _get_columns("task_proof")
     path_candidates = ["path", "file_path", "filepath", "proof_path", "uri"]
     path_col = next((c for c in path_candidates if c in cols), None)
@@ -395,19 +979,53 @@ def list_task_proofs(task_id: int):
     select_cols = ["id", "task_id"]
     select_cols.append(f"{path_col} AS path" if path_col else "NULL AS path")
     select_cols.append(f"{ts_col} AS uploaded_at" if ts_col else "NULL AS uploaded_at")
+    return ", ".join(select_cols), ts_col or "id"
 
-    sql = f"SELECT {', '.join(select_cols)} FROM task_proof WHERE task_id = ? ORDER BY {ts_col or 'id'} DESC"
+def list_task_proofs(task_id: int):
+    select, order_col = _task_proof_select()
+    sql = f"SELECT {select} FROM task_proof WHERE task_id = ? ORDER BY {order_col} DESC"
 
     with get_conn() as conn:
         cur = conn.cursor()
         cur.execute(sql, (task_id,))
         return [dict(r) for r in cur.fetchall()]
 
-def _get_columns(table: str):
+def list_task_proofs_bulk(task_ids):
+    """
+    複数課題の完了証拠を 1 クエリ（500 件ずつ）で取得。
+    戻り値: {task_id: [proof, ...]}（各リストは list_task_proofs と同じ形・順。証拠の無い課題は空リスト）
+    """
+    ids = list(dict.fromkeys(int(i) for i in task_ids))
+    out = {tid: [] for tid in ids}
+    if not ids:
+        return out
+    select, order_col = _task_proof_select()
     with get_conn() as conn:
         cur = conn.cursor()
-        cur.execute(f"PRAGMA table_info({table})")
-        return {row[1] for row in cur.fetchall()}  # {colname, ...}
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            cur.execute(
+                f"SELECT {select} FROM task_proof WHERE task_id IN ({','.join('?' * len(chunk))}) "
+                f"ORDER BY task_id, {order_col} DESC",
+                chunk
+            )
+            for r in cur.fetchall():
+                out[r["task_id"]].append(dict(r))
+    return out
+
+# テーブルの列名（PRAGMA table_info）のキャッシュ。init_db（マイグレーション）でクリア
+_columns_cache = {}
+
+def _get_columns(table: str):
+    cols = _columns_cache.get(table)
+    if cols is None:
+        with get_conn() as conn:
+            cur = conn.cursor()
+            cur.execute(f"PRAGMA table_info({table})")
+            cols = frozenset(row[1] for row in cur.fetchall())  # {colname, ...}
+        if cols:
+            _columns_cache[table] = cols
+    return cols
 
 # =============================
 # msal_auth.py（Microsoft サインイン）
@@ -505,64 +1123,3 @@ def today_iso():
 def hhmm_to_minutes(hhmm: str) -> int:
     h, m = hhmm.split(":")
     return int(h)*60 + int(m)
-
-# ----- ゴミ箱（候補） -----
-
-def list_trash(limit_days: int | None = 30, limit_rows: int | None = 200):
-    """candidate_trash から最近削除を取得。期間・件数で絞り込み。"""
-    with get_conn() as conn:
-        cur = conn.cursor()
-        sql = """
-            SELECT id, title, date, start_time, end_time, info_url, deleted_at
-              FROM candidate_trash
-        """
-        params = []
-        where = []
-        if limit_days is not None:
-            where.append("deleted_at >= datetime('now', ?)")
-            params.append(f"-{limit_days} days")
-        if where:
-            sql += " WHERE " + " AND ".join(where)
-        sql += " ORDER BY deleted_at DESC"
-        if limit_rows is not None:
-            sql += " LIMIT ?"
-            params.append(limit_rows)
-        cur.execute(sql, params)
-        return [dict(r) for r in cur.fetchall()]
-
-def restore_from_trash(item_id: int, *, restore_table: str = "candidates"):
-    """
-    candidate_trash から元テーブルへ復元。
-    既定では candidates(id, title, date, start_time, end_time, info_url) へ挿入。
-    """
-    with get_conn() as conn:
-        cur = conn.cursor()
-        row = cur.execute(
-            "SELECT id, title, date, start_time, end_time, info_url FROM candidate_trash WHERE id = ?",
-            (item_id,)
-        ).fetchone()
-        if not row:
-            return 0
-        r = dict(row)
-
-        # 復元先スキーマに合わせて列を調整（必要なら try/except で存在確認を追加）
-        cur.execute(
-            f"""
-            INSERT OR REPLACE INTO {restore_table}
-                (id, title, date, start_time, end_time, info_url)
-            VALUES (?, ?, ?, ?, ?, ?)
-            """,
-            (r["id"], r["title"], r["date"], r["start_time"], r["end_time"], r["info_url"])
-        )
-        cur.execute("DELETE FROM candidate_trash WHERE id = ?", (item_id,))
-        return cur.rowcount
-    
-def delete_from_trash(item_id: int) -> int:
-    """candidate_trash から当該行を完全削除（復元不可）。戻り値は削除件数。"""
-    with get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute("DELETE FROM candidate_trash WHERE id = ?", (item_id,))
-        return cur.rowcount
-
-
-
@@ -0,0 +1,154 @@
+# =============================
+# efficiency_index.py（能率の日別タイムライン）
+# -----------------------------
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+
+# 既定で保持する範囲（今日を基準に過去・未来の日数）
+HORIZON_PAST = 90
+HORIZON_FUTURE = 400
+
+
+def rule_hits(rule, ords: np.ndarray):
+    """
+    efficiency の 1 行が当たる日を ords（日付の序数配列）上のマスクで返す。
+    - repeat=0: start_date〜end_date の期間のみ
+    - repeat=1: 同じ長さの期間を interval_days ごとに繰り返す（start_date 以降）
+    不正な行は None。
+    """
+    try:
+        eff = float(rule["efficiency"])
+        r0 = date.fromisoformat(rule["start_date"]).toordinal()
+        r1 = date.fromisoformat(rule["end_date"]).toordinal()
+    except (TypeError, ValueError, KeyError):
+        return None
+    length = r1 - r0 + 1
+    if length <= 0:
+        return None
+    k = ords - r0
+    interval = int(rule.get("interval_days") or 0)
+    if int(rule.get("repeat") or 0) and interval > 0:
+        hit = (k >= 0) & ((k % interval) < length)
+    else:
+        hit = (k >= 0) & (k < length)
+    return eff, hit
+
+
+class EfficiencyTimeline:
+    """
+    [start, start + n) の各日の能率を配列で持つ。
+    重なる行は平均し、どの行にも当たらない日（または平均が 0 以下）は 1.0。
+    行の追加・更新・削除は合計・件数配列への差分で反映する。
+    """
+
+    def __init__(self, rules, start: date, end: date):
+        self.start_ord = start.toordinal()
+        n = (end - start).days + 1
+        self.ords = np.arange(self.start_ord, self.start_ord + n)
+        self.total = np.zeros(n)
+        self.count = np.zeros(n)
+        for r in rules:
+            self._apply(r, +1)
+        self.mult = self._multipliers(slice(None))
+
+    @property
+    def start(self) -> date:
+        return date.fromordinal(self.start_ord)
+
+    @property
+    def end(self) -> date:
+        return date.fromordinal(self.start_ord + len(self.ords) - 1)
+
+    def covers(self, start: date, end: date) -> bool:
+        return self.start <= start and end <= self.end
+
+    def _apply(self, rule, sign):
+        res = rule_hits(rule, self.ords) if rule else None
+        if res is None:
+            return None
+        eff, hit = res
+        self.total[hit] += sign * eff
+        self.count[hit] += sign
+        return hit
+
+    def _multipliers(self, idx):
+        total, count = self.total[idx], self.count[idx]
+        m = np.divide(total, count, out=np.ones_like(total), where=count > 0)
+        m[m <= 0] = 1.0
+        return m
+
+    def change(self, old=None, new=None):
+        """行の差し替え（追加は old=None、削除は new=None）。影響した日だけ再計算"""
+        touched = np.zeros(len(self.ords), dtype=bool)
+        for rule, sign in ((old, -1), (new, +1)):
+            hit = self._apply(rule, sign)
+            if hit is not None:
+                touched |= hit
+        self.mult[touched] = self._multipliers(touched)
+
+    def slice(self, start: date, end: date) -> np.ndarray:
+        i = start.toordinal() - self.start_ord
+        j = end.toordinal() - self.start_ord + 1
+        return self.mult[i:j]
+
+
+_timeline: EfficiencyTimeline | None = None
+# _timeline を作った（差分を反映した）時点の efficiency の版数（data_version のトリガーで更新）
+_timeline_version = None
+_lock = threading.Lock()
+
+
+def _efficiency_version() -> int:
+    from db import get_data_versions
+    today = date.today().isoformat()
+    return get_data_versions(today, today, scopes=("efficiency",)).get("efficiency", 0)
+
+
+def _build(start: date, end: date) -> EfficiencyTimeline:
+    from db import list_efficiency
+    today = date.today()
+    lo = min(start, today - timedelta(days=HORIZON_PAST))
+    hi = max(end, today + timedelta(days=HORIZON_FUTURE))
+    return EfficiencyTimeline(list_efficiency(), lo, hi)
+
+
+def multipliers(start: date, end: date) -> np.ndarray:
+    """
+    [start, end] の日別能率（コピー）。範囲外を頼まれたとき、
+    または efficiency の版数が変わったとき（別プロセスからの書き込みなど）に作り直す。
+    """
+    global _timeline, _timeline_version
+    with _lock:
+        # 版数は行より先に読む（間に書き込みがあれば次回また作り直す）
+        version = _efficiency_version()
+        if _timeline is None or version != _timeline_version or not _timeline.covers(start, end):
+            _timeline = _build(start, end)
+            _timeline_version = version
+        return _timeline.slice(start, end).copy()
+
+
+def on_efficiency_changed(old=None, new=None):
+    """
+    db の insert/update/delete_efficiency から（1 行の変更をコミットした後に）呼ばれる。
+    版数がちょうど 1 つ進んでいれば自分の変更だけなので差分で反映し、
+    それ以外（別プロセスの書き込みが挟まった）は捨てて次回作り直す。
+    """
+    global _timeline, _timeline_version
+    with _lock:
+        if _timeline is None:
+            return
+        version = _efficiency_version()
+        if _timeline_version is not None and version == _timeline_version + 1:
+            _timeline.change(old, new)
+            _timeline_version = version
+        else:
+            _timeline = None
+
+
+def invalidate():
+    global _timeline, _timeline_version
+    with _lock:
+        _timeline = None
+        _timeline_version = None
@@ -0,0 +1,123 @@
+# =============================
+# event_cache.py（Outlook イベントのローカルキャッシュ）
+# -----------------------------
+import json
+import threading
+from datetime import date, datetime, timedelta, timezone
+
+import pandas as pd
+
+from graph_client import list_events_range
+from db import replace_cached_events, list_cached_events, list_cached_days, invalidate_cached_days
+from utils import graph_dts_to_london
+
+# この時間を過ぎたキャッシュ日は Graph から取り直す
+CACHE_TTL = timedelta(minutes=10)
+
+# キャッシュの命中状況（プロセス内の累計。日数単位）
+# hit/miss はページ表示時、prefetched は先読みで取り直した日数
+_stats = {"hit": 0, "miss": 0, "prefetched": 0}
+_stats_lock = threading.Lock()
+
+
+def _days(start: date, end: date):
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+def _to_rows(events, start: date, end: date):
+    """イベントを、重なるロンドン日付ごとの行に展開（期間外の日は捨てる）"""
+    rows = []
+    # 開始・終了はまとめて変換
+    starts = graph_dts_to_london([ev.get("start") for ev in events])
+    ends = graph_dts_to_london([ev.get("end") for ev in events])
+    for ev, st_ts, en_ts in zip(events, starts, ends):
+        if pd.isna(st_ts) or pd.isna(en_ts):
+            continue
+        st_dt, en_dt = st_ts.to_pydatetime(), en_ts.to_pydatetime()
+        first = st_dt.date()
+        # 終了がちょうど 0:00 のイベントは翌日に含めない
+        last = (en_dt - timedelta(microseconds=1)).date() if en_dt > st_dt else first
+        payload = json.dumps(ev, ensure_ascii=False)
+        for d in _days(max(first, start), min(last, end)):
+            rows.append({
+                "event_id": ev.get("id"),
+                "event_date": d.isoformat(),
+                "start_at": st_dt.isoformat(),
+                "end_at": en_dt.isoformat(),
+                "payload": payload,
+            })
+    return rows
+
+
+def _is_fresh(fetched_at: str | None, now: datetime, max_age: timedelta) -> bool:
+    if not fetched_at:
+        return False
+    return now - datetime.fromisoformat(fetched_at) < max_age
+
+
+def _count(**kw):
+    with _stats_lock:
+        for k, v in kw.items():
+            _stats[k] += v
+
+
+def cache_stats():
+    """{"hit", "miss", "prefetched", "hit_rate"}。hit_rate はページ表示時の命中率（未計測なら None）"""
+    with _stats_lock:
+        s = dict(_stats)
+    total = s["hit"] + s["miss"]
+    s["hit_rate"] = s["hit"] / total if total else None
+    return s
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        for k in _stats:
+            _stats[k] = 0
+
+
+def get_events_range(access_token, start: date, end: date, *, max_age: timedelta = CACHE_TTL,
+                     prefetch: bool = False):
+    """
+    [start, end] のイベントを {date_iso: [event, ...]} で返す。
+    キャッシュが古い/無い日があれば、同期ウィンドウ内は差分同期、
+    それ以外はその範囲だけ calendarView 1 回で取り直す。
+    Graph が失敗した場合は手元のキャッシュをそのまま返す。
+    prefetch=True（先読み）の呼び出しは命中率の集計に含めない。
+    """
+    now = datetime.now(timezone.utc)
+    cached = list_cached_days(start.isoformat(), end.isoformat())
+    days = _days(start, end)
+    stale = [d for d in days if not _is_fresh(cached.get(d.isoformat()), now, max_age)]
+    if prefetch:
+        _count(prefetched=len(stale) if access_token else 0)
+    else:
+        _count(hit=len(days) - len(stale), miss=len(stale))
+
+    if stale and access_token:
+        # 同期ウィンドウ内は delta で変更分だけ反映（循環 import を避けて遅延 import）
+        from event_sync import default_window, sync_events
+        win = default_window()
+        if any(win[0] <= d <= win[1] for d in stale) and sync_events(access_token, win) is not None:
+            stale = [d for d in stale if not (win[0] <= d <= win[1])]
+    if stale and access_token:
+        lo, hi = min(stale), max(stale)
+        events = list_events_range(access_token, lo.isoformat(), hi.isoformat())
+        if events is not None:
+            replace_cached_events(lo.isoformat(), hi.isoformat(), _to_rows(events, lo, hi), now.isoformat())
+
+    out = {d.isoformat(): [] for d in days}
+    for r in list_cached_events(start.isoformat(), end.isoformat()):
+        out[r["event_date"]].append(json.loads(r["payload"]))
+    return out
+
+
+def get_events(access_token, date_iso: str, *, max_age: timedelta = CACHE_TTL):
+    """list_events と同じ形（イベントのリスト）で 1 日分を返す"""
+    d = date.fromisoformat(date_iso)
+    return get_events_range(access_token, d, d, max_age=max_age)[date_iso]
+
+
+def invalidate(*date_isos: str):
+    """Outlook 側を更新したときに該当日を取り直させる"""
+    return invalidate_cached_days(list(date_isos))
@@ -0,0 +1,145 @@
+# =============================
+# event_sync.py（calendarView/delta による差分同期）
+# -----------------------------
+import calendar
+import threading
+from datetime import date, datetime, timezone
+
+from graph_client import delta_events
+from db import (
+    replace_cached_events, apply_event_changes,
+    get_sync_state, save_sync_state, list_sync_states,
+)
+from event_cache import _to_rows
+
+# 同期は 1 本ずつ（ページとバックグラウンドが同時に走らないように）
+_LOCK = threading.Lock()
+
+
+def default_window(today: date | None = None):
+    """前月 1 日〜3 か月後の月末。月単位で切り替わるので初回同期は月 1 回で済む"""
+    today = today or date.today()
+    y, m = (today.year, today.month - 1) if today.month > 1 else (today.year - 1, 12)
+    start = date(y, m, 1)
+    y, m = today.year + (today.month + 2) // 12, (today.month + 2) % 12 + 1
+    end = date(y, m, calendar.monthrange(y, m)[1])
+    return start, end
+
+
+def sync_events(access_token, window=None):
+    """
+    window=(start, end) の Outlook イベントをローカルのミラー（event_cache）へ同期。
+    delta_link があれば変更分のみ取得し、無い/期限切れなら初回同期する。
+    戻り値: {"changed": 件数, "bytes": 受信バイト数, "full": 初回同期か}。失敗時は None
+    """
+    start, end = window or default_window()
+    ws, we = start.isoformat(), end.isoformat()
+    with _LOCK:
+        state = get_sync_state(ws, we)
+        res = None
+        if state and state.get("delta_link"):
+            res = delta_events(access_token, delta_link=state["delta_link"])
+        full = res is None
+        if full:
+            res = delta_events(access_token, ws, we)
+            if res is None:
+                return None
+        events, delta_link, nbytes = res
+        now = datetime.now(timezone.utc).isoformat()
+
+        alive = [ev for ev in events if "@removed" not in ev]
+        rows = _to_rows(alive, start, end)
+        if full:
+            replace_cached_events(ws, we, rows, now)
+        else:
+            apply_event_changes(ws, we, [ev.get("id") for ev in events], rows, now)
+        save_sync_state(ws, we, delta_link, now, len(events), nbytes, full)
+        return {"changed": len(events), "bytes": nbytes, "full": full}
+
+
+def get_sync_status():
+    """
+    同期ウィンドウごとの状況。saved_bytes は「毎回全件取得していた場合」との差の概算
+    （初回同期のバイト数 × 同期回数 − 実際の受信バイト数）。
+    """
+    out = []
+    for s in list_sync_states():
+        s = dict(s)
+        s["saved_bytes"] = max(0, s["full_bytes"] * s["sync_count"] - s["total_bytes"])
+        s.pop("delta_link", None)
+        out.append(s)
+    return out
+
+
+# ----- バックグラウンド同期 -----
+
+class _SyncWorker(threading.Thread):
+    """
+    token_provider() を毎回呼んでアクセストークンを取る（トークンは 1 時間ほどで切れるので保持しない）。
+    None が返ったら（サインインし直しが必要）auth_failed を立てて止まる。
+    """
+
+    def __init__(self, token_provider, interval_sec):
+        super().__init__(name="event-sync", daemon=True)
+        self.token_provider = token_provider
+        self.interval_sec = interval_sec
+        self.last_result = None
+        self.last_error = None
+        self.auth_failed = False
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                token = self.token_provider()
+                if not token:
+                    self.auth_failed = True
+                    self.last_error = "No access token (sign in again to resume background sync)"
+                    return
+                # ウィンドウは毎回計算し直す（月替わりに追従）
+                self.last_result = sync_events(token)
+                self.last_error = None if self.last_result is not None else "Sync failed (Graph request error)"
+            except Exception as e:
+                self.last_error = repr(e)
+            self._stop_event.wait(self.interval_sec)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_worker: _SyncWorker | None = None
+_worker_lock = threading.Lock()
+
+
+def start_background_sync(token_provider, interval_sec: int = 300):
+    """
+    プロセス内で 1 本だけ同期スレッドを起動（既にあれば token_provider だけ差し替える）。
+    token_provider は msal_auth.silent_token_provider() など、呼ぶたびにトークンを返す関数。
+    Streamlit の再実行ごとに呼んでよい（認証切れで止まったスレッドもここで起動し直す）。
+    """
+    global _worker
+    with _worker_lock:
+        if _worker and _worker.is_alive():
+            _worker.token_provider = token_provider
+            _worker.interval_sec = interval_sec
+            return _worker
+        _worker = _SyncWorker(token_provider, interval_sec)
+        _worker.start()
+        return _worker
+
+
+def background_sync_status():
+    """同期スレッドの状況 {"running", "auth_failed", "last_error"}。未起動なら None"""
+    with _worker_lock:
+        w = _worker
+    if w is None:
+        return None
+    return {"running": w.is_alive(), "auth_failed": w.auth_failed, "last_error": w.last_error}
+
+
+def stop_background_sync():
+    global _worker
+    with _worker_lock:
+        if _worker:
+            _worker.stop()
+            _worker = None
@@ -0,0 +1,85 @@
+# =============================
+# free_slots.py（空き時間の検索）
+# -----------------------------
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from conflicts import MIN_PER_DAY, build_index
+from routine_engine import daily_split
+from utils import hhmm_to_minutes
+
+
+def _to_datetime(abs_min: int) -> datetime:
+    d = date.fromordinal(int(abs_min) // MIN_PER_DAY)
+    return datetime.combine(d, datetime.min.time()) + timedelta(minutes=int(abs_min) % MIN_PER_DAY)
+
+
+def routine_minutes(start: date, end: date) -> np.ndarray:
+    """
+    各日の routine の分数（routine_engine で実施日ごとに展開）。
+    時刻を持たないので、各日の 0:00 から 1 つの塊として置く。
+    """
+    other, sleep = daily_split(start, end)
+    return np.minimum(np.rint((other + sleep) * 60.0), MIN_PER_DAY).astype(np.int64)
+
+
+def merge_busy(starts, ends):
+    """
+    スイープラインで重なる区間をまとめる。開始でソートし、終了の累積最大が
+    次の開始より手前で途切れる所が区間の切れ目。戻り値は (starts, ends) の配列。
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    keep = ends > starts
+    starts, ends = starts[keep], ends[keep]
+    if len(starts) == 0:
+        return starts, ends
+    order = np.argsort(starts, kind="stable")
+    starts, ends = starts[order], np.maximum.accumulate(ends[order])
+    # 直前までの終了より後に始まる所で新しい塊
+    brk = np.empty(len(starts), dtype=bool)
+    brk[0] = True
+    brk[1:] = starts[1:] > ends[:-1]
+    first = np.nonzero(brk)[0]
+    last = np.append(first[1:] - 1, len(starts) - 1)
+    return starts[first], ends[last]
+
+
+def find_free_slots(start: date, end: date, min_minutes: int = 30, *, access_token=None,
+                    day_start: str = "00:00", day_end: str = "24:00", routine: bool = True):
+    """
+    [start, end] の空き時間を長い順に返す。
+    埋まっている時間 = Outlook 予定（キャッシュ）＋候補＋routine＋各日の day_start〜day_end の外。
+    戻り値: [{"start": datetime, "end": datetime, "minutes": int}, ...]
+    """
+    n_days = (end - start).days + 1
+    if n_days <= 0:
+        return []
+    idx = build_index(start, end, access_token)
+    lo = start.toordinal() * MIN_PER_DAY
+    hi = (end.toordinal() + 1) * MIN_PER_DAY
+
+    day0 = lo + np.arange(n_days, dtype=np.int64) * MIN_PER_DAY
+    ds, de = hhmm_to_minutes(day_start), hhmm_to_minutes(day_end)
+    parts_s = [idx.starts, day0, day0 + de]
+    parts_e = [idx.ends, day0 + ds, day0 + MIN_PER_DAY]
+    if routine:
+        parts_s.append(day0)
+        parts_e.append(day0 + routine_minutes(start, end))
+
+    bs, be = merge_busy(np.concatenate(parts_s), np.concatenate(parts_e))
+    bs, be = np.clip(bs, lo, hi), np.clip(be, lo, hi)
+
+    # 塊と塊の間（両端は期間の始まり・終わり）が空き
+    free_s = np.concatenate([[lo], be])
+    free_e = np.concatenate([bs, [hi]])
+    length = free_e - free_s
+    ok = length >= max(1, int(min_minutes))
+    free_s, free_e, length = free_s[ok], free_e[ok], length[ok]
+
+    order = np.lexsort((free_s, -length))
+    return [
+        {"start": _to_datetime(free_s[i]), "end": _to_datetime(free_e[i]), "minutes": int(length[i])}
+        for i in order
+    ]
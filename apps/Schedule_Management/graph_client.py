@@ -1,44 +1,301 @@
 # graph_client.py の list_events を置換
-import requests
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
 from zoneinfo import ZoneInfo
 
+import requests
+from requests.adapters import HTTPAdapter
+
 GRAPH = "https://graph.microsoft.com/v1.0"
 LONDON = ZoneInfo("Europe/London")
 UTC = ZoneInfo("UTC")
 
-def list_events(access_token, date_iso: str):
-    # 指定日の 00:00〜24:00（ロンドン時刻）を UTC に変換してクエリ
-    d = datetime.fromisoformat(date_iso).replace(tzinfo=LONDON)
-    start_utc = d.astimezone(UTC).isoformat().replace("+00:00", "Z")
-    end_utc = (d + timedelta(days=1)).astimezone(UTC).isoformat().replace("+00:00", "Z")
-
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        'Prefer': 'outlook.timezone="Europe/London"',  # ← レスポンスも London で返させる
-    }
-    r = requests.get(
-        f"{GRAPH}/me/calendarview",
-        headers=headers,
-        params={
-            "startdatetime": start_utc,
-            "enddatetime": end_utc,
-            "$orderby": "start/dateTime",
-            "$top": 50,
-        },
+# スロットリング・一時障害として再試行するステータス
+RETRY_STATUS = (429, 500, 502, 503, 504)
+# POST など非冪等なリクエストは「処理されていない」ことが確実なものだけ再試行
+RETRY_STATUS_UNSAFE = (429, 503)
+# JSON $batch 1 回に詰められる最大リクエスト数（Graph の上限）
+BATCH_LIMIT = 20
+# レスポンスも London で返させる
+PREFER_LONDON = 'outlook.timezone="Europe/London"'
+
+
+class GraphError(Exception):
+    def __init__(self, status_code, text=""):
+        super().__init__(f"Graph error: {status_code} {text[:200]}")
+        self.status_code = status_code
+        self.text = text
+
+
+class GraphClient:
+    """
+    Microsoft Graph 用の薄いクライアント。
+    - requests.Session を共有（keep-alive・コネクションプール）
+    - 429/5xx は Retry-After を優先し、無ければ指数バックオフで再試行
+    - @odata.nextLink を辿るページングはジェネレータで遅延評価
+    base_url を差し替えればローカルのスタブサーバーにも向けられる。
+    """
+
+    def __init__(self, base_url: str = GRAPH, *, max_retries: int = 4, backoff: float = 0.5,
+                 max_backoff: float = 30.0, pool_size: int = 10, timeout: float = 30.0,
+                 session: requests.Session | None = None):
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _url(self, path: str) -> str:
+        # nextLink / deltaLink は絶対 URL で返ってくる
+        return path if path.startswith(("http://", "https://")) else f"{self.base_url}{path}"
+
+    def _delay(self, attempt: int, retry_after: str | None) -> float:
+        if retry_after:
+            try:
+                return min(self.max_backoff, max(0.0, float(retry_after)))
+            except ValueError:
+                pass
+            try:
+                wait = (parsedate_to_datetime(retry_after) - datetime.now(UTC)).total_seconds()
+                return min(self.max_backoff, max(0.0, wait))
+            except (TypeError, ValueError):
+                pass
+        base = min(self.max_backoff, self.backoff * (2 ** attempt))
+        return base + random.uniform(0, self.backoff)
+
+    def request(self, method: str, path: str, access_token: str, *, params=None, json=None, headers=None):
+        """1 リクエスト（再試行込み）。最終的なレスポンスを返し、ステータスの判定は呼び出し側"""
+        h = {"Authorization": f"Bearer {access_token}"}
+        h.update(headers or {})
+        url = self._url(path)
+        idempotent = method.upper() in ("GET", "HEAD", "PUT", "DELETE")
+        retry_status = RETRY_STATUS if idempotent else RETRY_STATUS_UNSAFE
+        for attempt in range(self.max_retries + 1):
+            try:
+                r = self.session.request(method, url, params=params, json=json, headers=h, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if not idempotent or attempt == self.max_retries:
+                    raise
+                time.sleep(self._delay(attempt, None))
+                continue
+            if r.status_code in retry_status and attempt < self.max_retries:
+                time.sleep(self._delay(attempt, r.headers.get("Retry-After")))
+                continue
+            return r
+
+    def iter_pages(self, path: str, access_token: str, *, params=None, headers=None, stats: dict | None = None):
+        """
+        ページ（レスポンス JSON）を 1 つずつ返す。次ページは必要になった時点で取得。
+        stats を渡すと stats["bytes"] に受信バイト数を加算する。
+        """
+        url = path
+        while url:
+            r = self.request("GET", url, access_token, params=params, headers=headers)
+            if stats is not None:
+                stats["bytes"] = stats.get("bytes", 0) + len(r.content)
+            if r.status_code != 200:
+                raise GraphError(r.status_code, r.text)
+            body = r.json()
+            yield body
+            # nextLink にはクエリが含まれるので params は初回のみ
+            url = body.get("@odata.nextLink")
+            params = None
+
+    def iter_items(self, path: str, access_token: str, *, params=None, headers=None):
+        for body in self.iter_pages(path, access_token, params=params, headers=headers):
+            yield from body.get("value", [])
+
+    def batch(self, access_token: str, requests_: list[dict]) -> list[dict]:
+        """
+        JSON $batch（最大 BATCH_LIMIT 件）。requests_ の順に {"status", "headers", "body"} を返す。
+        個別に 429/503 になったものは Retry-After を待ってその分だけ送り直す。
+        """
+        if len(requests_) > BATCH_LIMIT:
+            raise ValueError(f"$batch accepts at most {BATCH_LIMIT} requests")
+        pending = {str(i): dict(req, id=str(i)) for i, req in enumerate(requests_)}
+        results = {}
+        for attempt in range(self.max_retries + 1):
+            r = self.request("POST", "/$batch", access_token, json={"requests": list(pending.values())})
+            if r.status_code != 200:
+                for rid in pending:
+                    results[rid] = {"status": r.status_code, "headers": {}, "body": {"error": {"message": r.text}}}
+                break
+            retry_after = None
+            for res in r.json().get("responses", []):
+                rid = str(res.get("id"))
+                status = int(res.get("status", 0))
+                results[rid] = res
+                if status in RETRY_STATUS_UNSAFE and attempt < self.max_retries:
+                    ra = (res.get("headers") or {}).get("Retry-After")
+                    retry_after = max(retry_after or 0.0, self._delay(attempt, ra))
+                else:
+                    pending.pop(rid, None)
+            if not pending or retry_after is None:
+                break
+            time.sleep(retry_after)
+        return [results.get(str(i), {"status": 0, "headers": {}, "body": None}) for i in range(len(requests_))]
+
+
+_client: GraphClient | None = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> GraphClient:
+    """プロセス内で共有する既定クライアント"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GraphClient()
+        return _client
+
+
+def configure(base_url: str = GRAPH, **kwargs) -> GraphClient:
+    """既定クライアントを作り直す（スタブサーバーやベンチマーク用）"""
+    global _client
+    with _client_lock:
+        _client = GraphClient(base_url, **kwargs)
+        return _client
+
+
+def _window_utc(start_date_iso: str, end_date_iso: str):
+    """ロンドン日付の [start, end] を UTC の開始・終了（end は翌日 0:00）文字列へ"""
+    start = datetime.fromisoformat(start_date_iso).replace(tzinfo=LONDON)
+    end = datetime.fromisoformat(end_date_iso).replace(tzinfo=LONDON) + timedelta(days=1)
+    return (
+        start.astimezone(UTC).isoformat().replace("+00:00", "Z"),
+        end.astimezone(UTC).isoformat().replace("+00:00", "Z"),
     )
-    if r.status_code != 200:
+
+def list_events(access_token, date_iso: str):
+    # 指定日の 00:00〜24:00（ロンドン時刻）を UTC に変換してクエリ（全ページ取得）
+    d = datetime.fromisoformat(date_iso).date().isoformat()
+    start_utc, end_utc = _window_utc(d, d)
+    try:
+        return list(get_client().iter_items(
+            "/me/calendarview",
+            access_token,
+            params={
+                "startdatetime": start_utc,
+                "enddatetime": end_utc,
+                "$orderby": "start/dateTime",
+                "$top": 50,
+            },
+            headers={"Prefer": PREFER_LONDON},
+        ))
+    except (GraphError, requests.RequestException):
         return []
-    return r.json().get("value", [])
 
-def create_event_from_candidate(access_token, date, title, start_time, end_time):
-    body = {
+def list_events_range(access_token, start_date_iso: str, end_date_iso: str):
+    """
+    [start_date, end_date]（両端含む・ロンドン日付）のイベントを calendarView 1 回で取得。
+    @odata.nextLink を辿って全ページを返す。エラー時は None（空の結果と区別するため）。
+    """
+    start_utc, end_utc = _window_utc(start_date_iso, end_date_iso)
+    try:
+        return list(get_client().iter_items(
+            "/me/calendarview",
+            access_token,
+            params={
+                "startdatetime": start_utc,
+                "enddatetime": end_utc,
+                "$orderby": "start/dateTime",
+                "$top": 200,
+            },
+            headers={"Prefer": PREFER_LONDON},
+        ))
+    except (GraphError, requests.RequestException):
+        return None
+
+def delta_events(access_token, start_date_iso: str = None, end_date_iso: str = None, delta_link: str = None):
+    """
+    calendarView/delta で変更分を取得。
+    delta_link があればそこから差分のみ、無ければ [start, end] の初回同期。
+    戻り値: (events, 次回用 delta_link, 受信バイト数)。エラー時は None
+    （delta_link の期限切れ 410 なども含む。呼び出し側で初回同期し直す）。
+    削除されたイベントは {"id": ..., "@removed": {...}} の形で events に入る。
+    """
+    if delta_link:
+        path, params = delta_link, None
+    else:
+        start_utc, end_utc = _window_utc(start_date_iso, end_date_iso)
+        path = "/me/calendarView/delta"
+        params = {"startDateTime": start_utc, "endDateTime": end_utc}
+
+    events = []
+    stats = {"bytes": 0}
+    last = {}
+    try:
+        for body in get_client().iter_pages(
+            path, access_token, params=params,
+            headers={"Prefer": f"{PREFER_LONDON}, odata.maxpagesize=200"}, stats=stats,
+        ):
+            events.extend(body.get("value", []))
+            last = body
+    except (GraphError, requests.RequestException):
+        return None
+    return events, last.get("@odata.deltaLink"), stats["bytes"]
+
+def _event_body(date, title, start_time, end_time):
+    return {
         "subject": title,
         "start": {"dateTime": f"{date}T{start_time}", "timeZone": "Europe/London"},
         "end":   {"dateTime": f"{date}T{end_time}",   "timeZone": "Europe/London"},
     }
-    headers = {"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"}
-    r = requests.post(f"{GRAPH}/me/events", headers=headers, json=body)
+
+def create_event_from_candidate(access_token, date, title, start_time, end_time):
+    body = _event_body(date, title, start_time, end_time)
+    r = get_client().request("POST", "/me/events", access_token, json=body)
     if r.status_code not in (200, 201):
         return None
     return r.json()
+
+def create_events_bulk(access_token, candidates, max_workers: int = 4):
+    """
+    候補（dict: id, date, title, start_time, end_time）をまとめて Outlook に作成。
+    BATCH_LIMIT 件ずつ $batch に詰め、バッチ同士は max_workers 本まで並行に送る。
+    戻り値は candidates と同じ順の
+    {"id": 候補ID, "ok": bool, "status": int, "event": 作成イベント or None, "error": str or None}
+    """
+    client = get_client()
+    chunks = [candidates[i:i + BATCH_LIMIT] for i in range(0, len(candidates), BATCH_LIMIT)]
+
+    def run(chunk):
+        reqs = [
+            {
+                "method": "POST",
+                "url": "/me/events",
+                "headers": {"Content-Type": "application/json"},
+                "body": _event_body(c["date"], c["title"], c["start_time"], c["end_time"]),
+            }
+            for c in chunk
+        ]
+        try:
+            responses = client.batch(access_token, reqs)
+        except requests.RequestException as e:
+            responses = [{"status": 0, "body": {"error": {"message": str(e)}}} for _ in chunk]
+        out = []
+        for c, res in zip(chunk, responses):
+            status = int(res.get("status") or 0)
+            body = res.get("body") or {}
+            ok = status in (200, 201)
+            out.append({
+                "id": c["id"],
+                "ok": ok,
+                "status": status,
+                "event": body if ok else None,
+                "error": None if ok else ((body.get("error") or {}).get("message") or f"HTTP {status}"),
+            })
+        return out
+
+    if not chunks:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as ex:
+        return [item for part in ex.map(run, chunks) for item in part]
@@ -0,0 +1,230 @@
+# =============================
+# migrations.py（スキーマのバージョン管理）
+# -----------------------------
+# PRAGMA user_version に適用済みの番号を持つ。
+# init_db が作る CREATE TABLE IF NOT EXISTS の状態を 0 とし、以降の変更はここに追記する。
+# 追加は末尾のみ（既存の番号・内容は変えない）。
+import sqlite3
+
+
+def _columns(conn: sqlite3.Connection, table: str):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _m001_indexes(conn: sqlite3.Connection):
+    """検索・並べ替えに使う列へのインデックス"""
+    # list_candidates_by_date / list_candidates_between（date で絞って start_time 順）
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_candidate_date ON candidate(date, start_time)")
+
+    # event_meta は (event_id, event_date) で 1 行。重複があれば最新（id 最大）を残す
+    conn.execute(
+        """
+        DELETE FROM event_meta
+         WHERE id NOT IN (SELECT MAX(id) FROM event_meta GROUP BY event_id, event_date)
+        """
+    )
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_event_meta_event ON event_meta(event_id, event_date)")
+    # get_event_meta_by_date は event_date だけで引く
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_event_meta_date ON event_meta(event_date)")
+
+    # list_tasks の EXISTS / MAX(completed_at) サブクエリ
+    if "completed_at" in _columns(conn, "task_proof"):
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_task_proof_task ON task_proof(task_id, completed_at)")
+    else:
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_task_proof_task ON task_proof(task_id)")
+
+    # 最近削除は deleted_at の新しい順
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_candidate_trash_deleted ON candidate_trash(deleted_at)")
+
+
+def _m002_trash_deleted_at(conn: sqlite3.Connection):
+    """
+    candidate_trash.deleted_at を datetime('now') と同じ 'YYYY-MM-DD HH:MM:SS'（UTC）に揃える。
+    以前は isoformat()（'T' 区切り・マイクロ秒付き）で書いていたため、
+    datetime('now', ?) との文字列比較が正しくなかった。解釈できない値・NULL は現在時刻にする。
+    """
+    conn.execute(
+        """
+        UPDATE candidate_trash
+           SET deleted_at = COALESCE(strftime('%Y-%m-%d %H:%M:%S', deleted_at), datetime('now'))
+         WHERE deleted_at IS NULL
+            OR deleted_at IS NOT strftime('%Y-%m-%d %H:%M:%S', deleted_at)
+        """
+    )
+
+
+# data_version を +1 する（トリガー本体から使う）
+_BUMP = (
+    "INSERT INTO data_version(scope, version) VALUES ({scope}, 1) "
+    "ON CONFLICT(scope) DO UPDATE SET version = version + 1;"
+)
+
+# 全体で 1 つのバージョンを持つテーブル → scope 名
+_VERSIONED_TABLES = {
+    "task": "task",
+    "task_proof": "task",  # 完了証拠の有無で未完了の課題が変わる
+    "routine": "routine",
+    "efficiency": "efficiency",
+}
+
+
+def _m003_data_version(conn: sqlite3.Connection):
+    """
+    入力データのバージョン（トリガーで更新）と、日別の時間配分スナップショット。
+    - data_version: scope ごとの版数。Outlook 予定は日付単位（'event:YYYY-MM-DD'）
+    - allocation_daily: 日別のカテゴリ別時間と、計算時の入力の指紋（fingerprint）
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS data_version (
+            scope TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS allocation_daily (
+            day TEXT PRIMARY KEY,
+            fingerprint TEXT NOT NULL,
+            schedule_h REAL NOT NULL DEFAULT 0,
+            routine_h REAL NOT NULL DEFAULT 0,
+            sleep_h REAL NOT NULL DEFAULT 0,
+            task_h REAL NOT NULL DEFAULT 0,
+            computed_at TEXT NOT NULL
+        )
+        """
+    )
+    for table, scope in _VERSIONED_TABLES.items():
+        for op in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_{op.lower()}_version
+                AFTER {op} ON {table}
+                BEGIN
+                    {_BUMP.format(scope=repr(scope))}
+                END
+                """
+            )
+    for op, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_event_cache_{op.lower()}_version
+            AFTER {op} ON event_cache
+            BEGIN
+                {_BUMP.format(scope=f"'event:' || {row}.event_date")}
+            END
+            """
+        )
+
+
+def _m004_candidate_fts(conn: sqlite3.Connection):
+    """
+    候補のタイトル・情報リンクの全文検索（FTS5、candidate を参照する external content）。
+    trigram トークナイザなら LIKE '%…%' と同じ部分一致（日本語も可）を索引で引ける。
+    FTS5 / trigram が無いビルドでは作らない（search_candidates は LIKE で検索する）。
+    """
+    for tokenize in ("trigram", "unicode61"):
+        try:
+            conn.execute(
+                f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS candidate_fts USING fts5(
+                    title, info_url, content='candidate', content_rowid='id', tokenize='{tokenize}'
+                )
+                """
+            )
+            break
+        except sqlite3.OperationalError:
+            continue
+    else:
+        return
+    for sql in (
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_candidate_fts_insert AFTER INSERT ON candidate BEGIN
+            INSERT INTO candidate_fts(rowid, title, info_url) VALUES (NEW.id, NEW.title, NEW.info_url);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_candidate_fts_delete AFTER DELETE ON candidate BEGIN
+            INSERT INTO candidate_fts(candidate_fts, rowid, title, info_url)
+            VALUES ('delete', OLD.id, OLD.title, OLD.info_url);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_candidate_fts_update AFTER UPDATE ON candidate BEGIN
+            INSERT INTO candidate_fts(candidate_fts, rowid, title, info_url)
+            VALUES ('delete', OLD.id, OLD.title, OLD.info_url);
+            INSERT INTO candidate_fts(rowid, title, info_url) VALUES (NEW.id, NEW.title, NEW.info_url);
+        END
+        """,
+    ):
+        conn.execute(sql)
+    # 既存の候補を索引に入れる
+    conn.execute("INSERT INTO candidate_fts(candidate_fts) VALUES ('rebuild')")
+
+
+def _m005_proof_blob(conn: sqlite3.Connection):
+    """完了証拠・エビデンスのファイル実体（内容ハッシュで 1 つだけ保存）。参照は event_meta / task_proof のパス"""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS proof_blob (
+            sha256 TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at TEXT NOT NULL
+        )
+        """
+    )
+
+
+def _m006_routine_anchor(conn: sqlite3.Connection):
+    """
+    routine に周期の起点日を追加。既存の行は routine_engine.ROUTINE_EPOCH を起点にする
+    （anchor_date が無いときと同じ起点なので、適用の前後で実施日は変わらない。適用日を使うと
+    いつ適用したかで周期の位相がずれる）
+    """
+    if "anchor_date" not in _columns(conn, "routine"):
+        conn.execute("ALTER TABLE routine ADD COLUMN anchor_date TEXT")
+    conn.execute("UPDATE routine SET anchor_date = '1970-01-01' WHERE anchor_date IS NULL")
+
+
+# (バージョン, 内容, 関数)
+MIGRATIONS = [
+    (1, "secondary indexes / unique event_meta", _m001_indexes),
+    (2, "normalize candidate_trash.deleted_at", _m002_trash_deleted_at),
+    (3, "data_version triggers / allocation_daily", _m003_data_version),
+    (4, "candidate full-text search (FTS5)", _m004_candidate_fts),
+    (5, "content-addressed proof blobs", _m005_proof_blob),
+    (6, "routine.anchor_date", _m006_routine_anchor),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    未適用のマイグレーションを順に適用し、適用後のバージョンを返す。
+    1 つずつ BEGIN IMMEDIATE のトランザクションで実行し、失敗したらその分だけ巻き戻す
+    （user_version も同じトランザクション内で更新するので中途半端な状態は残らない）。
+    別プロセスが先に適用していた場合は、ロック取得後に読み直してスキップする。
+    """
+    conn.commit()
+    for version, _desc, fn in MIGRATIONS:
+        if get_version(conn) >= version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if get_version(conn) >= version:
+                conn.rollback()
+                continue
+            fn(conn)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return get_version(conn)
@@ -1,6 +1,14 @@
+import hashlib
+import json
 import os
+import secrets
+import threading
+import time
+from pathlib import Path
+
 import streamlit as st
 import msal
+from streamlit.components.v1 import html
 
 TENANT = st.secrets.get("AZURE_TENANT_ID", os.environ.get("AZURE_TENANT_ID", "common"))
 AUTHORITY = f"https://login.microsoftonline.com/{TENANT}"
@@ -9,22 +17,214 @@ CLIENT_SECRET = st.secrets.get("AZURE_CLIENT_SECRET", os.environ.get("AZURE_CLIE
 REDIRECT_URI = st.secrets.get("REDIRECT_URI", os.environ.get("REDIRECT_URI", "http://localhost:8501/"))
 SCOPES = ["User.Read", "Calendars.ReadWrite"]
 
+# トークンキャッシュ（リフレッシュトークン込み）の保存先。ブラウザセッションをまたいで再利用する
+TOKEN_CACHE_PATH = Path(os.environ.get("MSAL_TOKEN_CACHE", ".msal_token_cache.json"))
+# 残りがこれ未満のアクセストークンは使わず、サイレント更新する
+EXPIRY_MARGIN_SEC = 120
+
+# ブラウザとキャッシュ内のアカウントの対応（cookie の鍵の sha256 → oid）。
+# 新しいブラウザセッションでも、この cookie があればそのアカウントだけでサイレント取得する
+BINDINGS_PATH = Path(os.environ.get("MSAL_BROWSER_BINDINGS", ".msal_browser_bindings.json"))
+BINDING_COOKIE = "schedule_msal_browser"
+# リフレッシュトークンの既定の無操作期限（90 日）に合わせる
+BINDING_TTL_SEC = 90 * 24 * 3600
+
+_cache = msal.SerializableTokenCache()
+_app_instance = None
+_bindings = None
+_lock = threading.Lock()
+
+
+def _load_cache():
+    if TOKEN_CACHE_PATH.exists():
+        try:
+            _cache.deserialize(TOKEN_CACHE_PATH.read_text(encoding="utf-8"))
+        except Exception:
+            # 壊れたキャッシュは捨てて再サインイン
+            pass
+
+
+def _write_private(path: Path, text: str):
+    """本人だけが読める権限で書いてから置き換える（途中で落ちても壊れたファイルを残さない）"""
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    try:
+        os.chmod(tmp, 0o600)
+    except OSError:
+        pass
+    os.replace(tmp, path)
+
+
+def _save_cache():
+    with _lock:
+        if not _cache.has_state_changed:
+            return
+        _write_private(TOKEN_CACHE_PATH, _cache.serialize())
+        _cache.has_state_changed = False
+
+
 def _app():
-    return msal.ConfidentialClientApplication(
-        client_id=CLIENT_ID,
-        authority=AUTHORITY,
-        client_credential=CLIENT_SECRET or None
+    """プロセス内で 1 つだけ作る（キャッシュを共有するため）"""
+    global _app_instance
+    with _lock:
+        if _app_instance is None:
+            _load_cache()
+            _app_instance = msal.ConfidentialClientApplication(
+                client_id=CLIENT_ID,
+                authority=AUTHORITY,
+                client_credential=CLIENT_SECRET or None,
+                token_cache=_cache,
+            )
+        return _app_instance
+
+
+def _remember(result):
+    """セッションにトークンを保持（期限付き）"""
+    result = dict(result)
+    result["expires_at"] = time.time() + int(result.get("expires_in", 0) or 0)
+    st.session_state["token"] = result
+    oid = (result.get("id_token_claims") or {}).get("oid")
+    if oid:
+        st.session_state["account_oid"] = oid
+
+
+def _key_hash(key: str) -> str:
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def _load_bindings():
+    """呼ぶ側で _lock を持つこと"""
+    global _bindings
+    if _bindings is None:
+        try:
+            _bindings = json.loads(BINDINGS_PATH.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            _bindings = {}
+    return _bindings
+
+
+def _bind_browser(oid) -> str:
+    """
+    このブラウザ用の鍵を発行して oid に結びつけ、鍵を返す。
+    サーバーには鍵の sha256 だけを残す（ファイルが漏れても cookie は作れない）。
+    """
+    key = secrets.token_urlsafe(32)
+    now = time.time()
+    with _lock:
+        bindings = _load_bindings()
+        for h in [h for h, b in bindings.items() if b.get("expires_at", 0) <= now]:
+            del bindings[h]
+        bindings[_key_hash(key)] = {"oid": oid, "expires_at": now + BINDING_TTL_SEC}
+        _write_private(BINDINGS_PATH, json.dumps(bindings))
+    return key
+
+
+def _bound_oid(key):
+    """cookie の鍵に結びついた oid（無い・期限切れなら None）"""
+    if not key:
+        return None
+    with _lock:
+        binding = _load_bindings().get(_key_hash(key))
+    if not binding or binding.get("expires_at", 0) <= time.time():
+        return None
+    return binding.get("oid")
+
+
+def _browser_key():
+    """このブラウザの cookie の鍵（無ければ None）"""
+    try:
+        key = st.context.cookies.get(BINDING_COOKIE)
+    except Exception:
+        return None
+    return key if isinstance(key, str) and key else None
+
+
+def _session_oid():
+    """このセッションのアカウント。まだ無ければブラウザの cookie から"""
+    return st.session_state.get("account_oid") or _bound_oid(_browser_key())
+
+
+def _write_browser_cookie():
+    """
+    サインイン直後に発行した鍵を cookie に書く（交換の直後は st.rerun するので、次の実行で）。
+    Streamlit からはレスポンスヘッダーを付けられないので、スクリプトで書く（HttpOnly にはできない）。
+    """
+    key = st.session_state.pop("browser_binding", None)
+    if not key:
+        return
+    secure = "; Secure" if REDIRECT_URI.startswith("https://") else ""
+    html(
+        f"""
+        <script>
+        window.parent.document.cookie =
+          "{BINDING_COOKIE}={key}; Path=/; Max-Age={BINDING_TTL_SEC}; SameSite=Lax{secure}";
+        </script>
+        """,
+        height=0,
     )
 
-def get_access_token():
-    import streamlit as st
-    import msal
 
-    if "token" in st.session_state and st.session_state["token"].get("access_token"):
-        return st.session_state["token"]["access_token"]
+def _session_token():
+    tok = st.session_state.get("token") or {}
+    if tok.get("access_token") and tok.get("expires_at", 0) - time.time() > EXPIRY_MARGIN_SEC:
+        return tok["access_token"]
+    return None
+
+
+def _account_for(oid):
+    """
+    oid のアカウント（local_account_id か home_account_id "<oid>.<tid>" が一致するもの）。
+    キャッシュはプロセス・ディスクで全ユーザー共有なので、別ユーザーのアカウントで代用はしない。
+    """
+    if not oid:
+        return None
+    for a in _app().get_accounts():
+        if a.get("local_account_id") == oid or (a.get("home_account_id") or "").split(".")[0] == oid:
+            return a
+    return None
+
+
+def _silent_result(oid):
+    account = _account_for(oid)
+    if account is None:
+        return None
+    result = _app().acquire_token_silent(SCOPES, account=account)
+    _save_cache()
+    if not result or "access_token" not in result:
+        return None
+    return result
+
+
+def _acquire_silent():
+    """
+    このセッション（新しいセッションならこのブラウザ）に結びついたアカウントからサイレント取得
+    （必要ならリフレッシュ）。無理なら None
+    """
+    oid = _session_oid()
+    result = _silent_result(oid)
+    if result is None:
+        return None
+    _remember(result)
+    st.session_state.setdefault("account_oid", oid)
+    return result["access_token"]
 
+
+def silent_token_provider():
+    """
+    このセッションのアカウントでサイレント取得する関数を返す（バックグラウンド同期用）。
+    呼ぶたびにキャッシュから取り、期限が近ければリフレッシュする。取れなければ None。
+    session_state はここで読むだけなので、返した関数は別スレッドから呼んでよい。
+    """
+    oid = _session_oid()
+
+    def provide():
+        result = _silent_result(oid)
+        return result["access_token"] if result else None
+    return provide
+
+
+def _query_code():
     # --- クエリ取得（新旧API両対応）---
-    code = None
     try:
         qp = st.query_params            # 新
         code = qp.get("code")
@@ -32,70 +232,74 @@ def get_access_token():
             code = code[0]
     except Exception:
         qp = st.experimental_get_query_params()  # 旧
-        code = qp.get("code", [None])[0] if qp else None
+        code = (qp.get("code", [None]) or [None])[0] if qp else None
+    return code
 
-    cca = _app()
-    if not code:
-        auth_url = cca.get_authorization_request_url(
-            scopes=["User.Read", "Calendars.ReadWrite"],
-            redirect_uri=REDIRECT_URI,
-            prompt="select_account"
-        )
-        st.link_button("Sign in with Microsoft", auth_url)
-        st.stop()
 
-    result = cca.acquire_token_by_authorization_code(
+def _exchange_code(code):
+    result = _app().acquire_token_by_authorization_code(
         code=code,
-        scopes=["User.Read", "Calendars.ReadWrite"],
+        scopes=SCOPES,
         redirect_uri=REDIRECT_URI
     )
+    _save_cache()
     if "access_token" not in result:
         st.error(f"Auth error: {result.get('error_description') or result}")
         st.stop()
 
-    st.session_state["token"] = result
+    _remember(result)
+    oid = st.session_state.get("account_oid")
+    if oid:
+        # 次のブラウザセッションでもこのアカウントでサイレント取得できるように
+        st.session_state["browser_binding"] = _bind_browser(oid)
 
-    # --- URL から ?code を消してリロード ---
+    # --- URL から ?code を消してリロード（多重交換防止）---
     try:
         st.query_params.clear()                 # 新
     except Exception:
         st.experimental_set_query_params()      # 旧（空にする）
     st.rerun()
 
+
+def _authorization_url():
+    """サインイン URL。このブラウザのアカウントが分かっていれば login_hint で選択画面を省く"""
+    account = _account_for(_bound_oid(_browser_key()))
+    if account and account.get("username"):
+        return _app().get_authorization_request_url(
+            scopes=SCOPES,
+            redirect_uri=REDIRECT_URI,
+            login_hint=account["username"]
+        )
+    return _app().get_authorization_request_url(
+        scopes=SCOPES,
+        redirect_uri=REDIRECT_URI,
+        prompt="select_account"
+    )
+
+
+def get_access_token():
+    # 1) セッション内の有効なトークン → 2) 永続キャッシュからサイレント取得 → 3) 対話サインイン
+    _write_browser_cookie()
+    token = _session_token() or _acquire_silent()
+    if token:
+        return token
+
+    code = _query_code()
+    if not code:
+        st.link_button("Sign in with Microsoft", _authorization_url())
+        st.stop()
+
+    _exchange_code(code)
+
 # msal_auth.py に追記
 def maybe_exchange_code_silently():
-    # 既にトークンがあれば何もしない
-    if "token" in st.session_state and st.session_state["token"].get("access_token"):
+    # 既にトークンがあれば（またはキャッシュから取れれば）何もしない
+    _write_browser_cookie()
+    if _session_token() or _acquire_silent():
         return
 
-    # クエリから code を拾う（新旧API両対応）
-    try:
-        qp = st.query_params
-        code = qp.get("code")
-        if isinstance(code, list):
-            code = code[0]
-    except Exception:
-        qp = st.experimental_get_query_params()
-        code = (qp.get("code", [None]) or [None])[0]
-
+    code = _query_code()
     if not code:
         return  # 何もせず帰る（プロンプトは出さない）
 
-    cca = _app()
-    result = cca.acquire_token_by_authorization_code(
-        code=code,
-        scopes=["User.Read", "Calendars.ReadWrite"],
-        redirect_uri=REDIRECT_URI
-    )
-    if "access_token" not in result:
-        st.error(f"Auth error: {result.get('error_description') or result}")
-        st.stop()
-
-    st.session_state["token"] = result
-
-    # URL から ?code を除去してリロード（多重交換防止）
-    try:
-        st.query_params.clear()
-    except Exception:
-        st.experimental_set_query_params()
-    st.rerun()
+    _exchange_code(code)
@@ -1,11 +1,15 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
-from datetime import date, datetime
-from db import list_routine, list_efficiency, list_tasks
-from msal_auth import get_access_token
-from graph_client import list_events
-from utils import graph_dt_to_london
+from datetime import date
+from db import list_tasks
+from msal_auth import get_access_token, silent_token_provider
+from event_cache import get_events_range
+from event_sync import start_background_sync
+from allocation import daily_breakdown, place_task_hours
+from free_slots import find_free_slots
+from efficiency_index import multipliers
+from allocation_summary import daily_summary
 
 st.title("10) Time Allocation (24h Base)")
 
@@ -17,123 +21,34 @@ with col[1]:
 
 st.markdown("---")
 
-# Total hours from Outlook events across the period
-def total_ms_hours(s, e):
+# Refresh the Outlook event cache for the period (one calendarView call, served locally when fresh)
+def refresh_events(s, e):
     try:
         token = get_access_token()
     except Exception:
-        return 0.0
-    cur = s
-    mins = 0
-    while cur <= e:
-        evs = list_events(token, cur.isoformat())
-        for ev in evs:
-            st_dt = graph_dt_to_london(ev.get("start"))
-            en_dt = graph_dt_to_london(ev.get("end"))
-            if st_dt and en_dt:
-                mins += max(0, int((en_dt - st_dt).total_seconds() / 60))
-        # move to next day
-        cur = cur.fromordinal(cur.toordinal() + 1)
-    return mins / 60.0
-
-# Routine time = number of days * (hours / period_days)
-def total_routine_hours(s, e):
-    days = (e - s).days + 1
-    tot = 0.0
-    for r in list_routine():
-        tot += days * (float(r['hours']) / int(r['period_days']))
-    return tot
-
-# Split out sleep from routine:
-# Sum entries whose title is "Sleep" and treat the rest as other routine.
-def split_sleep(s, e):
-    days = (e - s).days + 1
-    sleep = 0.0
-    other = 0.0
-    for r in list_routine():
-        hours = days * (float(r['hours']) / int(r['period_days']))
-        if r['title'] == 'Sleep':
-            sleep += hours
-        else:
-            other += hours
-    return sleep, other
-
-# Tasks: sum over days of (remaining_hours / days_until_due), adjusted by efficiency
-def total_task_hours(s, e):
-    from datetime import datetime as dt, timedelta
-
-    tasks = list_tasks(active=True)
-
-    def norm_progress(p):
-        try:
-            p = float(p)
-        except:
-            return 0.0
-        if p > 1.0:
-            p = p / 100.0
-        return min(max(p, 0.0), 1.0)
-
-    # Initialize remaining time per task
-    rem = []
-    dues = []
-    for t in tasks:
-        R = float(t.get('required_hours', 0.0) or 0.0)
-        P = norm_progress(t.get('progress', 0.0) or 0.0)
-        remaining = max(0.0, R * (1.0 - P))
-        rem.append(remaining)
-        dues.append(dt.fromisoformat(f"{t['due_date']}T{t['due_time']}"))
-
-    # Representative efficiency (mean). Fallback to 1.0 if unset/non-positive.
-    effs = list_efficiency()
-    eff_list = []
-    for r in effs:
-        try:
-            eff_list.append(float(r['efficiency']))
-        except:
-            pass
-    eff = (sum(eff_list) / len(eff_list)) if eff_list else 1.0
-    if eff <= 0:
-        eff = 1.0
-
-    total = 0.0
-    day = s
-    one_day = timedelta(days=1)
-    SEC_PER_DAY = 86400.0
-
-    while day <= e:
-        day_start = dt.combine(day, dt.min.time())
-        for i, _t in enumerate(tasks):
-            if rem[i] <= 0.0:
-                continue
-            due = dues[i]
-            delta_days = (due - day_start).total_seconds() / SEC_PER_DAY
-
-            if delta_days <= 0.0:
-                # overdue: allocate all remaining today
-                alloc = rem[i]
-            else:
-                # even allocation across remaining real days (inclusive of today)
-                alloc = rem[i] / delta_days
-
-            if alloc < 0.0:
-                alloc = 0.0
-            if alloc > rem[i]:
-                alloc = rem[i]
-
-            rem[i] -= alloc
-            total += alloc
-
-        day += one_day
-
-    return total / eff
-
-ms_h = total_ms_hours(s, e)
-sleep_h, life_other_h = split_sleep(s, e)  # life_other_h = routine excluding sleep
-work_h = total_task_hours(s, e)
-
-# Free time = 24h * days − (schedule + routine + sleep + tasks)
-N = (e - s).days + 1
-other = max(0.0, 24.0 * N - (ms_h + life_other_h + sleep_h + work_h))
+        return
+    start_background_sync(silent_token_provider())
+    get_events_range(token, s, e)
+
+# Tasks: simulated from today (per-day share of remaining hours until each due date),
+# adjusted by that day's efficiency, so each day's value does not depend on the picked range
+def task_breakdown(s, e):
+    today = date.today()
+    if e < today:
+        return daily_breakdown([], s, e)
+    lo = max(s, today)
+    daily = daily_breakdown(list_tasks(active=True), today, e, multipliers(today, e))
+    return daily[daily["date"] >= pd.Timestamp(lo)].reset_index(drop=True)
+
+refresh_events(s, e)
+# Per-day category hours; only days whose inputs changed are recomputed (see allocation_summary)
+summary = daily_summary(s, e)
+ms_h = float(summary["schedule_h"].sum())
+sleep_h = float(summary["sleep_h"].sum())
+life_other_h = float(summary["routine_h"].sum())  # routine excluding sleep
+work_h = float(summary["task_h"].sum())
+other = float(summary["free_h"].sum())
+task_daily = task_breakdown(s, e)
 
 src = pd.DataFrame({
     "category": ["Schedule", "Routine", "Sleep", "Tasks", "Free Time"],
@@ -179,3 +94,34 @@ with c1:
 
     st.altair_chart(pie + labels, use_container_width_width=True)
 
+st.markdown("---")
+st.subheader("Daily Task Allocation")
+if task_daily.empty:
+    st.info("No task hours allocated in this period.")
+else:
+    bars = alt.Chart(task_daily).mark_bar().encode(
+        x=alt.X("yearmonthdate(date):T", title=None),
+        y=alt.Y("sum(hours):Q", title="Hours"),
+        color=alt.Color("title:N", legend=alt.Legend(title="Task")),
+        tooltip=[
+            alt.Tooltip("yearmonthdate(date):T", title="Date"),
+            alt.Tooltip("title:N", title="Task"),
+            alt.Tooltip("sum(hours):Q", title="Hours", format=",.2f"),
+        ],
+    )
+    st.altair_chart(bars, use_container_width=True)
+
+st.markdown("---")
+st.subheader("Task Placement (Free Slots)")
+if not task_daily.empty:
+    # Place each day's task hours into that day's free slots (events/candidates/routine already reserved)
+    placed = place_task_hours(task_daily, find_free_slots(s, e, 15))
+    short_h = work_h - float(placed["hours"].sum())
+    if short_h > 0.01:
+        st.warning(f"{short_h:.1f}h of task time does not fit into free slots.")
+    if not placed.empty:
+        placed["Date"] = placed["start"].dt.strftime("%Y-%m-%d")
+        placed["Time"] = placed["start"].dt.strftime("%H:%M") + "–" + placed["end"].dt.strftime("%H:%M")
+        placed["Hours"] = placed["hours"].round(2)
+        st.dataframe(placed[["Date", "Time", "title", "Hours"]].rename(columns={"title": "Task"}),
+                     use_container_width=True, hide_index=True)
@@ -1,9 +1,12 @@
 import streamlit as st
+import altair as alt
+from datetime import date, timedelta
 from db import insert_routine, list_routine, update_routine, delete_routine
+from routine_engine import daily_routine, next_occurrence
 
 st.title("11) Routine Life (Regular Activities)")
 
-mode = st.tabs(["Add", "Edit / Delete"])
+mode = st.tabs(["Add", "Edit / Delete", "Projection"])
 
 # --- Add Routine ---
 with mode[0]:
@@ -11,9 +14,10 @@ with mode[0]:
         title = st.text_input("Activity Title (e.g., Sleep, Meals, Commute, etc.)")
         hrs = st.number_input("Required Time (hours per occurrence)", min_value=0.0, step=0.5)
         period = st.number_input("Cycle (days)", min_value=1, value=1)
+        anchor = st.date_input("Start date (first occurrence)", value=date.today())
         submitted = st.form_submit_button("Add")
         if submitted:
-            insert_routine(title, float(hrs), int(period))
+            insert_routine(title, float(hrs), int(period), anchor.isoformat())
             st.success("Added successfully.")
 
 # --- Edit / Delete Routine ---
@@ -24,14 +28,43 @@ with mode[1]:
             title = st.text_input("Title", r['title'])
             hrs = st.number_input("Required Time (hours per occurrence)", min_value=0.0, step=0.5, value=float(r['hours']))
             period = st.number_input("Cycle (days)", min_value=1, value=int(r['period_days']))
+            try:
+                anchor0 = date.fromisoformat(r.get('anchor_date') or "")
+            except ValueError:
+                # 起点が無い・壊れている行は今の周期のまま次の実施日を表示する
+                anchor0 = next_occurrence(r, date.today())
+            anchor = st.date_input("Start date (first occurrence)", value=anchor0)
             col1, col2 = st.columns(2)
             with col1:
                 saved = st.form_submit_button("Save")
             with col2:
                 removed = st.form_submit_button("Delete")
         if saved:
-            update_routine(r['id'], title, float(hrs), int(period))
+            update_routine(r['id'], title, float(hrs), int(period), anchor.isoformat())
             st.success("Saved successfully.")
         if removed:
             delete_routine(r['id'])
             st.success("Deleted successfully.")
+
+# --- Projection: which days each routine actually lands on ---
+with mode[2]:
+    horizon = st.slider("Days ahead", min_value=7, max_value=90, value=28, step=7)
+    today = date.today()
+    df = daily_routine(today, today + timedelta(days=horizon - 1))
+    if df.empty:
+        st.info("No routines registered.")
+    else:
+        chart = alt.Chart(df).mark_bar().encode(
+            x=alt.X("yearmonthdate(date):T", title="Date"),
+            y=alt.Y("sum(hours):Q", stack=True, title="Hours"),
+            color=alt.Color("title:N", legend=alt.Legend(title="Routine")),
+            tooltip=[
+                alt.Tooltip("yearmonthdate(date):T", title="Date"),
+                alt.Tooltip("title:N", title="Routine"),
+                alt.Tooltip("hours:Q", title="Hours", format=",.2f"),
+            ],
+        )
+        st.altair_chart(chart, use_container_width=True)
+        for r in list_routine():
+            nxt = next_occurrence(r, today)
+            st.caption(f"{r['title']}: every {int(r['period_days'])} day(s), next on {nxt.isoformat()}")
@@ -2,9 +2,11 @@ import streamlit as st
 import pandas as pd
 from datetime import date, timedelta
 
-from db import get_conn, delete_candidate, get_candidate
+from db import search_candidates, delete_candidate, get_candidate, get_candidates
 from msal_auth import get_access_token
-from graph_client import create_event_from_candidate
+from graph_client import create_event_from_candidate, create_events_bulk
+from event_cache import invalidate
+from conflicts import find_conflicts_for
 
 st.set_page_config(page_title="Candidate List", layout="wide")
 st.title("Candidate List")
@@ -51,29 +53,27 @@ if dfrom > dto:
     st.error("Start date exceeds end date.")
     st.stop()
 
-# --- 2) Fetch data (select directly without changing db.py) ---
-params = [dfrom.isoformat(), dto.isoformat()]
-where = ["date BETWEEN ? AND ?"]
-if q.strip():
-    where.append("(title LIKE ? OR IFNULL(info_url,'') LIKE ?)")
-    like = f"%{q.strip()}%"
-    params.extend([like, like])
-
-order = f"ORDER BY {sort_key} {'ASC' if asc else 'DESC'}, id ASC"
-sql = f"""
-SELECT id, date, title, start_time, end_time, info_url
-FROM candidate
-WHERE {' AND '.join(where)}
-{order}
-"""
-
-with get_conn() as conn:
-    cur = conn.cursor()
-    rows = [dict(r) for r in cur.execute(sql, params).fetchall()]
+# --- 2) Fetch one page (full-text search + keyset pagination in db.search_candidates) ---
+PAGE_SIZE = 50
+filters = (dfrom.isoformat(), dto.isoformat(), q.strip(), sort_key, asc)
+if st.session_state.get("cl_filters") != filters:
+    # Filters changed → back to the first page
+    st.session_state["cl_filters"] = filters
+    st.session_state["cl_cursors"] = [None]
+cursors = st.session_state["cl_cursors"]
+
+res = search_candidates(
+    q.strip(),
+    date_range=(dfrom.isoformat(), dto.isoformat()),
+    sort=(sort_key, asc),
+    page=cursors[-1],
+    page_size=PAGE_SIZE,
+)
+rows = res["rows"]
 
 # --- 3) Shape DataFrame (render once) ---
 def _mk_link(u: str | None) -> str:
-    if not u:
+    if not isinstance(u, str) or not u:
         return ""
     safe = u.replace('"', "%22")
     return f'<a href="{safe}" target="_blank">link</a>'
@@ -84,31 +84,52 @@ if df.empty:
 else:
     df["time_span"] = df["start_time"].astype(str) + "–" + df["end_time"].astype(str)
     df["link"] = df["info_url"].apply(_mk_link)
+    # Overlaps with confirmed Outlook events (cached) and other candidates, for the rows on this page only
+    conflicts = find_conflicts_for(rows)
+    df["conflict"] = df["id"].apply(
+        lambda cid: "⚠ " + ", ".join(x["title"] for x in conflicts[cid]) if cid in conflicts else ""
+    )
 
-    df_view = df[["id", "date", "time_span", "title", "link"]].rename(
+    df_view = df[["id", "date", "time_span", "title", "link", "conflict"]].rename(
         columns={
             "id": "ID",
             "date": "Date",
             "time_span": "Time",
             "title": "Title",
             "link": "Info",
+            "conflict": "Conflict",
         }
     )
-    st.caption(f"Count: {len(df_view)}")
+    page_no = len(cursors)
+    first = (page_no - 1) * PAGE_SIZE + 1
+    st.caption(
+        f"Count: {res['total']} (showing {first}–{first + len(df_view) - 1})  "
+        f"Conflicts on this page: {int((df['conflict'] != '').sum())}"
+    )
 
     # Rightmost column "Action" → jump to Schedule page
     df_view["Action"] = df["date"].apply(_mk_jump)
-    df_view = df_view[["ID", "Date", "Time", "Title", "Info", "Action"]]
+    df_view = df_view[["ID", "Date", "Time", "Title", "Info", "Conflict", "Action"]]
 
     st.write(df_view.to_html(escape=False, index=False), unsafe_allow_html=True)
 
+    p1, p2, _ = st.columns([1, 1, 4])
+    with p1:
+        if st.button("◀ Previous", disabled=page_no <= 1):
+            cursors.pop()
+            st.rerun()
+    with p2:
+        if st.button("Next ▶", disabled=res["next"] is None):
+            cursors.append(res["next"])
+            st.rerun()
+
 # --- 4) Row actions (single) ---
 st.subheader("Row Actions")
 aid = st.number_input("Enter target ID", min_value=0, step=1, value=0)
 c1, c2 = st.columns([1, 1])
 
 with c1:
-    if st.button("Add to Outlook", use_container_width_width=True, disabled=(aid <= 0)):
+    if st.button("Add to Outlook", use_container_width=True, disabled=(aid <= 0)):
         cand = get_candidate(aid)
         if not cand:
             st.error("Target ID not found.")
@@ -123,6 +144,7 @@ with c1:
                     cand["end_time"],
                 )
                 if res:
+                    invalidate(cand["date"])
                     st.success(
                         f"Created: {res.get('subject')} ({cand['date']} {cand['start_time']}–{cand['end_time']})"
                     )
@@ -134,7 +156,7 @@ with c2:
     if st.button(
         "Move to Trash (Delete)",
         type="secondary",
-        use_container_width_width=True,
+        use_container_width=True,
         disabled=(aid <= 0),
     ):
         cnt = delete_candidate(aid)
@@ -163,24 +185,23 @@ def _parse_ids(s: str) -> list[int]:
 with b1:
     if st.button("Create in Outlook (Bulk)", disabled=(not ids_str.strip())):
         token = get_access_token()
-        ok, ng = 0, 0
-        for cid in _parse_ids(ids_str):
-            cand = get_candidate(cid)
-            if not cand:
-                ng += 1
-                continue
-            try:
-                res = create_event_from_candidate(
-                    token,
-                    cand["date"],
-                    cand["title"],
-                    cand["start_time"],
-                    cand["end_time"],
-                )
-                ok += 1 if res else 0
-            except Exception:
-                ng += 1
+        ids = list(dict.fromkeys(_parse_ids(ids_str)))
+        cands = get_candidates(ids)
+        # Up to 20 creations per $batch request, batches sent concurrently
+        results = create_events_bulk(token, cands)
+        cand_by_id = {c["id"]: c for c in cands}
+        ok = sum(1 for r in results if r["ok"])
+        ng = len(ids) - ok
+        created_dates = {cand_by_id[r["id"]]["date"] for r in results if r["ok"]}
+        if created_dates:
+            invalidate(*created_dates)
         st.info(f"Creation  Success: {ok}  Failure: {ng}")
+        missing = sorted(set(ids) - set(cand_by_id))
+        if missing:
+            st.warning(f"IDs not found: {', '.join(map(str, missing))}")
+        for r in results:
+            if not r["ok"]:
+                st.error(f"ID {r['id']}: {r['error']}")
 
 with b2:
     if st.button("Move to Trash (Bulk)", type="secondary", disabled=(not ids_str.strip())):
@@ -0,0 +1,58 @@
+import streamlit as st
+import pandas as pd
+from datetime import date, time, timedelta
+
+from msal_auth import get_access_token, silent_token_provider
+from event_sync import start_background_sync
+from free_slots import find_free_slots
+
+st.title("13) Free Slots")
+
+col = st.columns(4)
+with col[0]:
+    s = st.date_input("Start Date", value=date.today(), format="YYYY-MM-DD")
+with col[1]:
+    e = st.date_input("End Date", value=date.today() + timedelta(days=7), format="YYYY-MM-DD")
+with col[2]:
+    min_minutes = st.number_input("Minimum length (minutes)", min_value=5, value=30, step=5)
+with col[3]:
+    use_routine = st.toggle("Reserve routine time", value=True)
+
+col = st.columns(2)
+with col[0]:
+    day_start = st.time_input("Day starts at", value=time(8, 0), step=timedelta(minutes=30))
+with col[1]:
+    day_end = st.time_input("Day ends at", value=time(22, 0), step=timedelta(minutes=30))
+
+if s > e:
+    st.error("Start date exceeds end date.")
+    st.stop()
+if day_start >= day_end:
+    st.error("Day start must be before day end.")
+    st.stop()
+
+# Outlook events refresh the local cache when signed in; otherwise only cached events are used
+try:
+    token = get_access_token()
+    start_background_sync(silent_token_provider())
+except Exception:
+    token = None
+
+slots = find_free_slots(
+    s, e, int(min_minutes),
+    access_token=token,
+    day_start=day_start.strftime("%H:%M"),
+    day_end=day_end.strftime("%H:%M"),
+    routine=use_routine,
+)
+
+st.markdown("---")
+if not slots:
+    st.info("No free slots in this period.")
+else:
+    df = pd.DataFrame(slots)
+    df["Date"] = df["start"].dt.strftime("%Y-%m-%d (%a)")
+    df["Time"] = df["start"].dt.strftime("%H:%M") + "–" + df["end"].dt.strftime("%H:%M")
+    df["Length"] = (df["minutes"] // 60).astype(str) + "h " + (df["minutes"] % 60).astype(str).str.zfill(2) + "m"
+    st.caption(f"Count: {len(df)} | Total: {df['minutes'].sum() / 60:.1f}h")
+    st.dataframe(df[["Date", "Time", "Length"]], use_container_width=True, hide_index=True)
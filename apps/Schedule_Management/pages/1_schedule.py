@@ -1,10 +1,12 @@
 import streamlit as st
+import pandas as pd
 from datetime import date
-from pathlib import Path
-from msal_auth import get_access_token
-from graph_client import list_events
-from db import get_event_meta_by_date, upsert_event_meta
-from utils import graph_dt_to_london, fmt_ymdhm
+from msal_auth import get_access_token, silent_token_provider
+from prefetch import get_events, prefetch_status
+from event_sync import start_background_sync, get_sync_status, background_sync_status
+from db import get_event_meta_by_date, upsert_event_meta, clear_sync_state
+from utils import graph_dts_to_london, fmt_ymdhm
+from proof_store import store_upload
 
 st.title("1) Schedule (Outlook + Meta Information)")
 
@@ -17,17 +19,48 @@ if "auth_skip" in st.session_state and st.session_state["auth_skip"]:
     events = []
 else:
     token = get_access_token()
-    events = list_events(token, d.isoformat())
+    start_background_sync(silent_token_provider())
+    # Also warms the neighbouring dates in the background, so stepping through dates hits the cache
+    events = get_events(token, d.isoformat())
+
+    with st.expander("Outlook sync status"):
+        status = get_sync_status()
+        if not status:
+            st.caption("Not synced yet.")
+        for s in status:
+            st.caption(
+                f"Window {s['window_start']} → {s['window_end']} | "
+                f"Last sync: {s['last_sync_at']} | "
+                f"Events changed: {s['last_changed']} | "
+                f"Last transfer: {s['last_bytes'] / 1024:,.1f} KB | "
+                f"Total: {s['total_bytes'] / 1024:,.1f} KB over {s['sync_count']} syncs | "
+                f"Saved vs full refresh: {s['saved_bytes'] / 1024:,.1f} KB"
+            )
+        bg = background_sync_status()
+        if bg and bg["last_error"]:
+            st.warning(f"Background sync: {bg['last_error']}")
+        if status and st.button("Full resync", key="full_resync"):
+            for s in status:
+                clear_sync_state(s["window_start"], s["window_end"])
+            st.rerun()
+        cs = prefetch_status()
+        rate = "n/a" if cs["hit_rate"] is None else f"{cs['hit_rate']:.0%}"
+        st.caption(
+            f"Cache hit rate: {rate} ({cs['hit']} hits / {cs['miss']} misses) | "
+            f"Days prefetched: {cs['prefetched']} | In flight: {cs['inflight']}"
+        )
 
 meta_list = get_event_meta_by_date(d.isoformat())
 meta_map = {(m["event_id"], m["event_date"]): m for m in meta_list}
 
 st.subheader(f"Schedule for {d.isoformat()}")
-for ev in events:
+ev_starts = graph_dts_to_london([ev.get("start") for ev in events])
+ev_ends = graph_dts_to_london([ev.get("end") for ev in events])
+for ev, st_dt, en_dt in zip(events, ev_starts, ev_ends):
     ev_id = ev.get("id")
     subj = ev.get("subject") or "(No title)"
-    st_dt = graph_dt_to_london(ev.get("start"))
-    en_dt = graph_dt_to_london(ev.get("end"))
+    st_dt = None if pd.isna(st_dt) else st_dt
+    en_dt = None if pd.isna(en_dt) else en_dt
     with st.expander(f"🟦 {subj} | {fmt_ymdhm(st_dt)} → {fmt_ymdhm(en_dt)}"):
         key = (ev_id, d.isoformat())
         exist = meta_map.get(key, {})
@@ -35,11 +68,8 @@ for ev in events:
         proof = st.file_uploader("Evidence (Screenshot, etc.)", type=["png", "jpg", "jpeg", "pdf"], key=f"proof_{ev_id}")
         saved_path = exist.get("proof_path", "")
         if proof is not None:
-            up_dir = Path("uploads"); up_dir.mkdir(exist_ok=True)
-            save_to = up_dir / f"proof_{ev_id}_{proof.name}"
-            with open(save_to, "wb") as f:
-                f.write(proof.getbuffer())
-            saved_path = str(save_to)
+            # Stored once per content hash; reruns with the same upload do not rewrite it
+            saved_path = store_upload(proof)
         if st.button("Save", key=f"save_{ev_id}"):
             upsert_event_meta(ev_id, d.isoformat(), info_url, saved_path or None)
             st.success("Saved successfully.")
@@ -2,10 +2,14 @@ import streamlit as st
 from datetime import date
 import pandas as pd
 import altair as alt
-from msal_auth import get_access_token
-from graph_client import list_events, create_event_from_candidate
+from msal_auth import get_access_token, silent_token_provider
+from graph_client import create_event_from_candidate
+from event_cache import invalidate
+from prefetch import get_events
+from event_sync import start_background_sync
 from db import list_candidates_by_date, delete_candidate, get_candidate
-from utils import graph_dt_to_london
+from utils import graph_dts_to_london
+from conflicts import find_conflicts
 
 st.title("2) Candidates (Timeline + Add/Edit/Delete)")
 
@@ -14,19 +18,25 @@ D = st.date_input("Date", value=date.today(), format="YYYY-MM-DD")
 # Graph events
 try:
     token = get_access_token()
-    ms_events = list_events(token, D.isoformat())
+    start_background_sync(silent_token_provider())
+    # Also warms the neighbouring dates in the background
+    ms_events = get_events(token, D.isoformat())
 except Exception:
     st.warning("Demo mode: Outlook not authenticated or failed to retrieve events. Displaying empty list.")
     ms_events = []
 
 # Candidate events
 cands = list_candidates_by_date(D.isoformat())
+# Overlaps with confirmed events / other candidates (events come from the local cache)
+conflicts = find_conflicts(D, D)
 
 # Data for timeline
 rows = []
-for ev in ms_events:
-    st_dt = graph_dt_to_london(ev.get("start"))
-    en_dt = graph_dt_to_london(ev.get("end"))
+ms_starts = graph_dts_to_london([ev.get("start") for ev in ms_events])
+ms_ends = graph_dts_to_london([ev.get("end") for ev in ms_events])
+for ev, st_dt, en_dt in zip(ms_events, ms_starts, ms_ends):
+    if pd.isna(st_dt) or pd.isna(en_dt):
+        continue
     rows.append({
         "line": "Confirmed",
         "title": ev.get("subject") or "(No title)",
@@ -73,6 +83,10 @@ for c in cands:
     colL, colR = st.columns([2,1])
     with colL:
         st.write(f"📝 {c['title']} | {c['start_time']} → {c['end_time']} | Info: {c.get('info_url', '')}")
+        if conflicts.get(c["id"]):
+            st.warning("Conflicts with: " + ", ".join(
+                f"{x['title']} ({x['start'][-5:]}–{x['end'][-5:]})" for x in conflicts[c["id"]]
+            ))
     with colR:
         info_col, add_col, edit_col, del_col = st.columns(4)
         with info_col:
@@ -92,6 +106,7 @@ for c in cands:
                     ev = None
 
                 if ev:
+                    invalidate(c['date'])
                     try:
                         delete_candidate(c['id'])
                         st.success("Added to Outlook and removed from database.")
@@ -1,5 +1,9 @@
 import streamlit as st
-from db import list_trash, restore_from_trash, delete_from_trash
+from db import (
+    list_trash, restore_from_trash, delete_from_trash,
+    restore_from_trash_bulk, delete_from_trash_bulk, purge_trash,
+    TRASH_RETENTION_DAYS, TRASH_MAX_ROWS,
+)
 
 st.title("5) Recently Deleted Items (Candidates)")
 
@@ -13,11 +17,44 @@ days = {"7 days": 7, "30 days": 30, "90 days": 90, "All": None}[period]
 
 trash = list_trash(limit_days=days, limit_rows=200)
 
+# --- Retention: purge old items (also runs automatically on app start) ---
+with st.expander("Retention / Purge"):
+    c1, c2, c3 = st.columns([2, 2, 1])
+    with c1:
+        keep_days = st.number_input("Keep for (days)", min_value=1, value=TRASH_RETENTION_DAYS)
+    with c2:
+        keep_rows = st.number_input("Keep at most (items)", min_value=1, value=TRASH_MAX_ROWS)
+    with c3:
+        if st.button("Purge now"):
+            n = purge_trash(max_age_days=int(keep_days), max_rows=int(keep_rows))
+            st.success(f"Purged {n} item(s).")
+            _rerun()
+
 if not trash:
     st.info("No deleted records found.")
 else:
+    # --- Bulk actions on checked items ---
+    selected = [int(t["id"]) for t in trash if st.session_state.get(f"sel_{t['id']}", False)]
+    b1, b2, b3 = st.columns([1, 1, 3])
+    with b1:
+        if st.button(f"Restore selected ({len(selected)})", disabled=not selected):
+            n = restore_from_trash_bulk(selected)
+            for i in selected:
+                st.session_state.pop(f"sel_{i}", None)
+            st.success(f"Restored {n} item(s).")
+            _rerun()
+    with b2:
+        if st.button(f"Delete selected ({len(selected)})", disabled=not selected):
+            n = delete_from_trash_bulk(selected)
+            for i in selected:
+                st.session_state.pop(f"sel_{i}", None)
+            st.success(f"Permanently deleted {n} item(s).")
+            _rerun()
+
     for t in trash:
-        colL, colR = st.columns([4, 1])
+        colC, colL, colR = st.columns([0.3, 4, 1])
+        with colC:
+            st.checkbox("Select", key=f"sel_{t['id']}", label_visibility="collapsed")
         with colL:
             info_url = t.get("info_url")
             lines = [
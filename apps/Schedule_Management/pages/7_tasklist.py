@@ -1,6 +1,8 @@
 import streamlit as st
 from pathlib import Path
-from db import list_tasks, update_task, delete_task, list_task_proofs
+from db import list_tasks, update_task, delete_task, list_task_proofs_bulk
+
+DONE_PAGE_SIZE = 20
 
 st.title("7) Task List")
 
@@ -88,13 +90,19 @@ with tab_active:
 
 # --- Completed Tasks ---
 with tab_done:
-    done = list_tasks(active=False)
+    # Load completed tasks page by page (one extra row tells whether more exist)
+    shown = st.session_state.setdefault("done_limit", DONE_PAGE_SIZE)
+    done = list_tasks(active=False, limit=shown + 1)
+    has_more = len(done) > shown
+    done = done[:shown]
+    # Proofs for all visible tasks in one query
+    proofs_by_task = list_task_proofs_bulk([t['id'] for t in done])
     for t in done:
         with st.container(border=True):
             st.write(f"✅ {t['title']} | Completed at: {t.get('completed_at','-')}")
 
             # Proof preview (optional)
-            proofs = list_task_proofs(int(t['id']))
+            proofs = proofs_by_task.get(int(t['id']), [])
             if proofs:
                 st.caption("Completion Proofs")
                 cols = st.columns(3)
@@ -143,3 +151,7 @@ with tab_done:
                         st.session_state.pop(confirm_key, None)
                         _rerun()
 
+    if has_more:
+        if st.button("Load more", key="done_more"):
+            st.session_state["done_limit"] = shown + DONE_PAGE_SIZE
+            _rerun()
@@ -1,7 +1,7 @@
 import streamlit as st
 import datetime as dt
-from pathlib import Path
 from db import get_task, update_task, delete_task, insert_task_proof
+from proof_store import store_upload
 
 st.title("9) Edit / Delete / Complete Task")
 
@@ -95,14 +95,10 @@ if st.session_state.get("proof_mode"):
         if up is None:
             st.warning("Please select a file first.")
         else:
-            up_dir = Path("uploads")
-            up_dir.mkdir(parents=True, exist_ok=True)
-            safe_name = f"task_{task_id}_{Path(up.name).name}"
-            save_to = up_dir / safe_name
-            with open(save_to, "wb") as f:
-                f.write(up.getbuffer())
-
-            insert_task_proof(task_id, str(save_to), dt.datetime.utcnow().isoformat())
+            # Stored once per content hash (duplicate screenshots share one file)
+            save_to = store_upload(up)
+
+            insert_task_proof(task_id, save_to, dt.datetime.utcnow().isoformat())
             update_task(task_id, title, d, tm, float(hrs), info, 1.0)
             st.success("Task marked as completed.")
             st.session_state.pop("proof_mode", None)
@@ -0,0 +1,69 @@
+# =============================
+# prefetch.py（前後の日付のイベントを先読み）
+# -----------------------------
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import date, timedelta
+
+from event_cache import get_events as _cached_events, get_events_range, cache_stats
+
+# 表示日の前後何日を温めるか
+PREFETCH_DAYS = 3
+# 表示日を先読み中なら、その完了をこの秒数まで待つ（二重に Graph を呼ばない）
+WAIT_SEC = 10.0
+
+# Streamlit の再実行をまたいで生きるよう、モジュールに 1 つだけ持つ
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="prefetch")
+# 先読み中の日付 → Future
+_inflight = {}
+_lock = threading.Lock()
+
+
+def _done(days):
+    def cb(_fut):
+        with _lock:
+            for d in days:
+                _inflight.pop(d, None)
+    return cb
+
+
+def prefetch_around(access_token, center: date, days: int = PREFETCH_DAYS):
+    """
+    center の前後 days 日をバックグラウンドでキャッシュに載せる（center 自身は除く）。
+    先読み中の日は投げ直さない。新鮮な日は get_events_range 側で Graph を呼ばない。
+    """
+    if not access_token or days <= 0:
+        return None
+    want = [center + timedelta(days=i) for i in range(-days, days + 1) if i != 0]
+    with _lock:
+        todo = [d for d in want if d not in _inflight]
+        if not todo:
+            return None
+        fut = _executor.submit(get_events_range, access_token, min(todo), max(todo), prefetch=True)
+        for d in todo:
+            _inflight[d] = fut
+    fut.add_done_callback(_done(todo))
+    return fut
+
+
+def get_events(access_token, date_iso: str, *, days: int = PREFETCH_DAYS):
+    """
+    event_cache.get_events と同じ形で 1 日分を返し、続けて前後の日を先読みする。
+    その日がまだ先読み中なら、終わるのを待ってからキャッシュを読む。
+    """
+    d = date.fromisoformat(date_iso)
+    with _lock:
+        fut = _inflight.get(d)
+    if fut is not None:
+        wait([fut], timeout=WAIT_SEC)
+    events = _cached_events(access_token, date_iso)
+    prefetch_around(access_token, d, days)
+    return events
+
+
+def prefetch_status():
+    """cache_stats() に先読み中の日数を加えたもの"""
+    s = cache_stats()
+    with _lock:
+        s["inflight"] = len(_inflight)
+    return s
@@ -0,0 +1,89 @@
+# =============================
+# proof_store.py（証拠ファイルの保存：内容ハッシュで重複排除）
+# -----------------------------
+import hashlib
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from db import add_proof_blob, get_proof_blob
+
+BLOB_DIR = Path("uploads") / "blobs"
+CHUNK_SIZE = 1024 * 1024
+
+# アップロード（file_id）→ 保存先パス。同じアップロードの再描画では書き込まない
+_seen = {}
+_seen_lock = threading.Lock()
+SEEN_MAX = 512
+
+
+def _blob_path(sha256: str, ext: str) -> Path:
+    # 1 ディレクトリにファイルが集中しないよう先頭 2 文字で分ける
+    return BLOB_DIR / sha256[:2] / f"{sha256}{ext}"
+
+
+def store_stream(fp, name: str = "") -> str:
+    """
+    ファイルオブジェクトを CHUNK_SIZE ずつ一時ファイルに書きながら SHA-256 を計算し、
+    uploads/blobs/<先頭2文字>/<sha256><拡張子> に保存してパスを返す。
+    同じ内容が既にあれば一時ファイルを捨てて既存のパスを返す（書き込みは 1 回分だけ）。
+    途中で失敗したときは一時ファイルも、この呼び出しで置いたファイルも残さない。
+    """
+    ext = Path(name).suffix.lower()
+    BLOB_DIR.mkdir(parents=True, exist_ok=True)
+    h = hashlib.sha256()
+    size = 0
+    if hasattr(fp, "seek"):
+        fp.seek(0)
+    fd, tmp = tempfile.mkstemp(dir=BLOB_DIR, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = fp.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                h.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        sha = h.hexdigest()
+
+        known = get_proof_blob(sha)
+        if known and Path(known["path"]).exists():
+            return known["path"]
+
+        target = _blob_path(sha, ext)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        created = not target.exists()
+        if created:
+            os.replace(tmp, target)
+        try:
+            return add_proof_blob(sha, str(target), size)["path"]
+        except Exception:
+            # 行のないファイルを残さない
+            if created:
+                target.unlink(missing_ok=True)
+            raise
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def store_upload(uploaded) -> str:
+    """
+    Streamlit の UploadedFile を保存してパスを返す。
+    file_id ごとに結果を覚えるので、アップローダーがファイルを持ったままの再描画では何もしない。
+    """
+    key = getattr(uploaded, "file_id", None)
+    if key:
+        with _seen_lock:
+            path = _seen.get(key)
+        if path and Path(path).exists():
+            return path
+    path = store_stream(uploaded, getattr(uploaded, "name", ""))
+    if key:
+        with _seen_lock:
+            if len(_seen) >= SEEN_MAX:
+                _seen.pop(next(iter(_seen)))
+            _seen[key] = path
+    return path
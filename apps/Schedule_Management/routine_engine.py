@@ -0,0 +1,111 @@
+# =============================
+# routine_engine.py（生活時間の日別展開）
+# -----------------------------
+import calendar
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from db import get_data_versions, list_routine
+
+SLEEP_TITLE = "Sleep"
+
+# anchor_date の無い routine の周期の起点。今日を起点にすると日ごとに実施日がずれるので固定の日にする
+# （migrations._m006_routine_anchor の既存行の埋め値と同じ）
+ROUTINE_EPOCH = date(1970, 1, 1)
+
+# (年, 月) → その月の日別×routine 別の時間 (日数, routine 数)。routine の版数が変わったら全て捨てる
+_months = {}
+_months_version = None
+_routines = []
+_lock = threading.Lock()
+
+
+def _anchor_ord(r) -> int:
+    try:
+        return date.fromisoformat(r.get("anchor_date") or "").toordinal()
+    except ValueError:
+        return ROUTINE_EPOCH.toordinal()
+
+
+def occurrence_matrix(routines, start: date, end: date) -> np.ndarray:
+    """
+    [start, end] の日別×routine 別の時間 (日数, routine 数)。
+    各 routine は anchor_date から period_days 日ごとの日に hours 時間（起点より前にも周期を延ばす）。
+    """
+    n_days = (end - start).days + 1
+    if n_days <= 0 or not routines:
+        return np.zeros((max(n_days, 0), len(routines)))
+    ords = np.arange(start.toordinal(), start.toordinal() + n_days)[:, None]
+    anchor = np.array([_anchor_ord(r) for r in routines])[None, :]
+    period = np.array([max(1, int(r["period_days"] or 1)) for r in routines])[None, :]
+    hours = np.array([float(r["hours"] or 0.0) for r in routines])[None, :]
+    return np.where((ords - anchor) % period == 0, hours, 0.0)
+
+
+def _refresh_if_changed():
+    """routine の版数（data_version のトリガーで更新）が変わっていればキャッシュを捨てる"""
+    global _months_version, _routines
+    today = date.today().isoformat()
+    version = get_data_versions(today, today, scopes=("routine",)).get("routine", 0)
+    if version != _months_version:
+        _months.clear()
+        _routines = list_routine()
+        _months_version = version
+
+
+def _month(year: int, month: int) -> np.ndarray:
+    key = (year, month)
+    if key not in _months:
+        last = calendar.monthrange(year, month)[1]
+        _months[key] = occurrence_matrix(_routines, date(year, month, 1), date(year, month, last))
+    return _months[key]
+
+
+def routine_matrix(start: date, end: date):
+    """
+    [start, end] の日別×routine 別の時間と、列に対応する routine のリスト。
+    月単位でキャッシュした配列をつないで切り出す。
+    """
+    with _lock:
+        _refresh_if_changed()
+        routines = list(_routines)
+        if end < start:
+            return np.zeros((0, len(routines))), routines
+        parts = []
+        y, m = start.year, start.month
+        while (y, m) <= (end.year, end.month):
+            parts.append(_month(y, m))
+            y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    mat = np.concatenate(parts, axis=0)
+    i = start.day - 1
+    return mat[i:i + (end - start).days + 1], routines
+
+
+def daily_split(start: date, end: date):
+    """日別の (その他 routine の時間, Sleep の時間) の配列"""
+    mat, routines = routine_matrix(start, end)
+    is_sleep = np.array([r["title"] == SLEEP_TITLE for r in routines], dtype=bool)
+    return mat[:, ~is_sleep].sum(axis=1), mat[:, is_sleep].sum(axis=1)
+
+
+def daily_routine(start: date, end: date) -> pd.DataFrame:
+    """日別×routine の縦長 DataFrame（0 の行は除く）。列: date, routine_id, title, hours"""
+    mat, routines = routine_matrix(start, end)
+    days = pd.date_range(start, end, freq="D")
+    df = pd.DataFrame({
+        "date": np.repeat(days.values, len(routines)),
+        "routine_id": np.tile([r["id"] for r in routines], len(days)),
+        "title": np.tile([r["title"] for r in routines], len(days)),
+        "hours": mat.ravel(),
+    })
+    return df[df["hours"] > 0].reset_index(drop=True)
+
+
+def next_occurrence(r, after: date) -> date:
+    """after 以降で最初の実施日"""
+    period = max(1, int(r["period_days"] or 1))
+    k = (_anchor_ord(r) - after.toordinal()) % period
+    return after + timedelta(days=k)
@@ -0,0 +1,28 @@
+# =============================
+# tests/conftest.py
+# -----------------------------
+# アプリのディレクトリで実行する（db / msal_auth が import 時に .streamlit/secrets.toml を読むため）:
+#
+#   cd apps/Schedule_Management && python -m pytest tests
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+APP_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(APP_DIR))
+os.chdir(APP_DIR)
+
+import db  # noqa: E402
+
+
+@pytest.fixture
+def tmp_db(tmp_path):
+    """一時ファイルの DB に差し替えて init_db 済みにする"""
+    old = db.DB_PATH
+    db.DB_PATH = tmp_path / "test.sqlite3"
+    db.init_db()
+    yield db.DB_PATH
+    db.close_pool()
+    db.DB_PATH = old
@@ -0,0 +1,105 @@
+import random
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+from allocation import daily_breakdown, norm_progress, simulate_tasks, total_task_hours
+
+
+def reference(tasks, start, end):
+    """旧実装（10_temeallocation.py の日ごとのループ）をそのまま日別×課題別にしたもの"""
+    n_days = (end - start).days + 1
+    out = np.zeros((max(n_days, 0), len(tasks)))
+    rem = [max(0.0, float(t.get("required_hours", 0.0) or 0.0) * (1.0 - norm_progress(t.get("progress", 0.0) or 0.0)))
+           for t in tasks]
+    dues = [datetime.fromisoformat(f"{t['due_date']}T{t['due_time']}") for t in tasks]
+    for k in range(n_days):
+        day_start = datetime.combine(start + timedelta(days=k), datetime.min.time())
+        for i in range(len(tasks)):
+            if rem[i] <= 0.0:
+                continue
+            delta_days = (dues[i] - day_start).total_seconds() / 86400.0
+            alloc = rem[i] if delta_days <= 0.0 else rem[i] / delta_days
+            alloc = min(max(alloc, 0.0), rem[i])
+            rem[i] -= alloc
+            out[k, i] = alloc
+    return out
+
+
+def task(i, due: datetime, hours=10.0, progress=0.0):
+    return {"id": i, "title": f"t{i}", "required_hours": hours, "progress": progress,
+            "due_date": due.date().isoformat(), "due_time": due.strftime("%H:%M:%S")}
+
+
+START = date(2025, 3, 1)
+
+
+def at(days, hour=0, minute=0):
+    return datetime.combine(START, datetime.min.time()) + timedelta(days=days, hours=hour, minutes=minute)
+
+
+def test_even_split_until_the_due_day_then_the_rest():
+    # 締切は 3 日と 12 時間後: 3 日は R/D、4 日目に残り、それ以降は 0
+    got = simulate_tasks([task(1, at(3, 12), hours=7.0)], START, START + timedelta(days=6))[:, 0]
+    np.testing.assert_allclose(got, [2.0, 2.0, 2.0, 1.0, 0.0, 0.0, 0.0])
+
+
+def test_due_exactly_at_midnight_cuts_off_on_that_day():
+    got = simulate_tasks([task(1, at(2), hours=4.0)], START, START + timedelta(days=4))[:, 0]
+    np.testing.assert_allclose(got, [2.0, 2.0, 0.0, 0.0, 0.0])
+
+
+@pytest.mark.parametrize("due", [at(-3, 9), at(0), at(0, 18)])
+def test_due_before_start_or_within_the_first_day_puts_everything_on_day_one(due):
+    got = simulate_tasks([task(1, due, hours=5.0)], START, START + timedelta(days=2))[:, 0]
+    np.testing.assert_allclose(got, [5.0, 0.0, 0.0])
+
+
+@pytest.mark.parametrize("progress, left", [(0.25, 7.5), (25, 7.5), (100, 0.0), (150, 0.0), (-1, 10.0), (None, 10.0)])
+def test_progress_reduces_the_remaining_hours(progress, left):
+    got = simulate_tasks([task(1, at(20), hours=10.0, progress=progress)], START, START + timedelta(days=30))
+    assert got.sum() == pytest.approx(left)
+
+
+@pytest.mark.parametrize("hours", [0.0, None, -3.0])
+def test_zero_remaining_hours_allocate_nothing(hours):
+    got = simulate_tasks([task(1, at(5), hours=hours)], START, START + timedelta(days=7))
+    assert got.shape == (8, 1) and not got.any()
+
+
+def test_empty_inputs():
+    assert simulate_tasks([], START, START + timedelta(days=3)).shape == (4, 0)
+    assert simulate_tasks([task(1, at(3))], START, START - timedelta(days=1)).shape == (0, 1)
+
+
+def test_matches_the_reference_loop_on_random_tasks():
+    rng = random.Random(11)
+    for _ in range(50):
+        tasks = [
+            task(i, at(rng.randint(-5, 45), rng.randint(0, 23), rng.choice((0, 15, 30, 59))),
+                 hours=rng.choice((0.0, None, round(rng.uniform(0.5, 80), 2))),
+                 progress=rng.choice((0, None, round(rng.random(), 2), rng.randint(0, 120))))
+            for i in range(rng.randint(1, 12))
+        ]
+        start = START + timedelta(days=rng.randint(0, 3))
+        end = start + timedelta(days=rng.randint(0, 60))
+        np.testing.assert_allclose(simulate_tasks(tasks, start, end), reference(tasks, start, end),
+                                   rtol=1e-9, atol=1e-9)
+
+
+def test_efficiency_multipliers_scale_each_day():
+    tasks = [task(1, at(4), hours=8.0), task(2, at(1, 12), hours=3.0)]
+    end = START + timedelta(days=5)
+    eff = np.array([1.0, 2.0, 0.5, 1.0, 4.0, 1.0])
+    want = reference(tasks, START, end) / eff[:, None]
+
+    df = daily_breakdown(tasks, START, end, efficiency=eff)
+    got = np.zeros_like(want)
+    for r in df.itertuples():
+        got[(r.date.date() - START).days, r.task_id - 1] = r.hours
+    np.testing.assert_allclose(got, want)
+    assert total_task_hours(tasks, START, end, efficiency=eff) == pytest.approx(want.sum())
+    # 能率が一定なら旧実装（合計 / 平均能率）と同じ
+    assert total_task_hours(tasks, START, end, efficiency=np.full(6, 1.6)) == pytest.approx(
+        reference(tasks, START, end).sum() / 1.6)
@@ -0,0 +1,117 @@
+import json
+import random
+from datetime import date
+
+import pytest
+
+import db
+from conflicts import find_conflicts, find_conflicts_for
+
+WORDS = ["Review", "Lunch", "Seminar", "Call", "Rev", "Planning"]
+
+
+@pytest.fixture
+def seeded(tmp_db):
+    """同じ日付・開始時刻・タイトルが重複する候補（同値の並びを試すため）"""
+    rng = random.Random(0)
+    for i in range(137):
+        db.insert_candidate(
+            f"2025-04-{rng.randint(1, 5):02d}",
+            f"{rng.choice(WORDS)} {rng.choice(WORDS).lower()}" if i % 4 else "Same title",
+            f"{rng.choice((9, 10, 11)):02d}:{rng.choice(('00', '30'))}",
+            "12:00",
+            f"https://example.com/{rng.choice(WORDS).lower()}/{i}" if i % 3 else None,
+        )
+    with db.get_conn() as conn:
+        return [dict(r) for r in conn.execute("SELECT * FROM candidate")]
+
+
+def _all_pages(page_size, **kwargs):
+    out, page, n_pages = [], None, 0
+    while True:
+        res = db.search_candidates(page=page, page_size=page_size, **kwargs)
+        n_pages += 1
+        out.extend(res["rows"])
+        if res["next"] is None:
+            return out, res["total"], n_pages
+        page = res["next"]
+
+
+def _matches(r, terms):
+    text = (r["title"] + " " + (r["info_url"] or "")).lower()
+    return all(t.lower() in text for t in terms)
+
+
+def _expected(rows, sort_key, asc):
+    # 並べ替え列で並べ、同値は id 昇順
+    ordered = sorted(rows, key=lambda r: r["id"])
+    return sorted(ordered, key=lambda r: r[sort_key], reverse=not asc)
+
+
+@pytest.mark.parametrize("sort_key", db.CANDIDATE_SORT_KEYS)
+@pytest.mark.parametrize("asc", [True, False])
+@pytest.mark.parametrize("page_size", [1, 7, 50, 137, 500])
+def test_keyset_pages_are_complete_and_ordered(seeded, sort_key, asc, page_size):
+    got, total, n_pages = _all_pages(page_size, sort=(sort_key, asc))
+    assert total == len(seeded)
+    assert [r["id"] for r in got] == [r["id"] for r in _expected(seeded, sort_key, asc)]
+    # ちょうど割り切れるときも空の最終ページは作らない
+    assert n_pages == max(1, -(-len(seeded) // page_size))
+
+
+def test_pages_with_date_range_and_query(seeded):
+    rng = ("2025-04-02", "2025-04-04")
+    want = [r for r in seeded if rng[0] <= r["date"] <= rng[1] and _matches(r, ["lunch"])]
+    got, total, _ = _all_pages(4, query="lunch", date_range=rng, sort=("start_time", False))
+    assert total == len(want)
+    assert [r["id"] for r in got] == [r["id"] for r in _expected(want, "start_time", False)]
+
+
+@pytest.mark.parametrize("query", ["review", "rev", "re", "Review lunch", "example.com/call", "%", "no-such"])
+def test_fts_and_like_fallback_agree(seeded, monkeypatch, query):
+    want = sorted(r["id"] for r in seeded if _matches(r, query.split()))
+    fts, _, _ = _all_pages(10, query=query, sort=("title", True))
+    monkeypatch.setattr(db, "_candidate_fts_trigram", lambda: False)
+    like, _, _ = _all_pages(10, query=query, sort=("title", True))
+    assert sorted(r["id"] for r in fts) == want
+    assert [r["id"] for r in like] == [r["id"] for r in fts]
+
+
+def test_index_follows_updates_and_deletes(seeded):
+    cid = seeded[0]["id"]
+    c = db.get_candidate(cid)
+    db.update_candidate(cid, c["date"], "Zebra crossing", c["start_time"], c["end_time"], None)
+    assert [r["id"] for r in db.search_candidates("zebra")["rows"]] == [cid]
+    db.delete_candidate(cid)
+    assert db.search_candidates("zebra") == {"rows": [], "next": None, "total": 0}
+
+
+def test_empty_result_has_no_cursor(tmp_db):
+    assert db.search_candidates("", page_size=10) == {"rows": [], "next": None, "total": 0}
+
+
+def test_conflicts_for_visible_rows_match_the_full_range(tmp_db):
+    rng = random.Random(1)
+    for _ in range(200):
+        s = rng.randrange(8 * 60, 20 * 60, 15)
+        e = s + rng.choice((15, 30, 60, 90))
+        db.insert_candidate(f"2025-05-{rng.randint(1, 10):02d}", f"c{_}",
+                            f"{s // 60:02d}:{s % 60:02d}", f"{e // 60:02d}:{e % 60:02d}", None)
+    rows = []
+    for i in range(30):
+        day = f"2025-05-{rng.randint(1, 10):02d}"
+        h = rng.randint(8, 19)
+        rows.append({"event_id": f"ev{i}", "event_date": day,
+                     "start_at": f"{day}T{h:02d}:00:00+01:00", "end_at": f"{day}T{h:02d}:45:00+01:00",
+                     "payload": json.dumps({"subject": f"Event {i}"})})
+    db.replace_cached_events("2025-05-01", "2025-05-10", rows, "t")
+
+    page = db.search_candidates("", sort=("title", True), page_size=25)["rows"]
+    full = find_conflicts(date(2025, 5, 1), date(2025, 5, 10))
+    got = find_conflicts_for(page)
+
+    def norm(d):
+        return {k: sorted((x["kind"], str(x["id"])) for x in v) for k, v in d.items()}
+    want = {c["id"]: full[c["id"]] for c in page if c["id"] in full}
+    assert want, "the seed should produce some conflicts on the page"
+    assert norm(got) == norm(want)
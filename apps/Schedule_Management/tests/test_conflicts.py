@@ -0,0 +1,92 @@
+import json
+import random
+from datetime import date
+
+import pytest
+
+import db
+from conflicts import IntervalIndex, find_conflicts
+
+
+def overlaps(a, b):
+    """半開区間の共通部分の長さが正か"""
+    return max(a[0], b[0]) < min(a[1], b[1])
+
+
+def index(spans):
+    return IntervalIndex([s for s, _ in spans], [e for _, e in spans], list(range(len(spans))))
+
+
+def pairs(idx):
+    return sorted(tuple(sorted((idx.items[i], idx.items[j]))) for i, j in idx.overlapping_pairs())
+
+
+def brute_pairs(spans):
+    return sorted((a, b) for a in range(len(spans)) for b in range(a + 1, len(spans))
+                  if overlaps(spans[a], spans[b]))
+
+
+@pytest.mark.parametrize("spans, want", [
+    ([(0, 10), (10, 20)], []),                      # end == start は重ならない
+    ([(10, 20), (0, 10)], []),
+    ([(0, 10), (9, 20)], [(0, 1)]),
+    ([(0, 100), (10, 20), (30, 40)], [(0, 1), (0, 2)]),
+    ([(5, 10), (5, 7)], [(0, 1)]),                  # 同じ開始
+    ([(0, 10), (5, 5)], []),                        # 長さ 0 は何とも重ならない
+    ([(5, 5), (5, 10)], []),
+    ([(5, 10), (5, 5)], []),
+    ([(5, 5), (5, 5)], []),
+    ([(0, 10), (8, 3)], []),                        # 終了が開始より前
+])
+def test_overlapping_pairs_edges(spans, want):
+    assert pairs(index(spans)) == want
+
+
+def test_query_edges():
+    idx = index([(0, 10), (10, 20), (15, 15), (30, 40)])
+    assert idx.query(10, 15) == [1]
+    assert idx.query(20, 30) == []                  # 両端で接するだけ
+    assert idx.query(5, 35) == [0, 1, 3]
+    assert idx.query(15, 15) == []                  # 長さ 0 の問い合わせ
+    assert idx.query(12, 8) == []
+    assert index([]).query(0, 10) == []
+
+
+def test_candidate_overlapping_several_events():
+    idx = index([(9 * 60, 10 * 60), (10 * 60, 11 * 60), (11 * 60, 12 * 60), (12 * 60, 13 * 60)])
+    # 9:30-12:00 は 9-10, 10-11, 11-12 と重なり、12-13 とは接するだけ
+    assert idx.query(9 * 60 + 30, 12 * 60) == [0, 1, 2]
+
+
+def test_matches_brute_force_on_random_intervals():
+    rng = random.Random(4)
+    for _ in range(300):
+        spans = []
+        for _ in range(rng.randint(0, 40)):
+            s = rng.randint(0, 200)
+            spans.append((s, s + rng.choice((0, 0, -5, rng.randint(1, 60)))))
+        idx = index(spans)
+        assert pairs(idx) == brute_pairs(spans)
+        for _ in range(10):
+            lo = rng.randint(-10, 260)
+            hi = lo + rng.randint(-5, 80)
+            assert sorted(idx.query(lo, hi)) == [k for k, sp in enumerate(spans) if overlaps(sp, (lo, hi))]
+
+
+def test_find_conflicts_reports_each_overlapping_event(tmp_db):
+    db.insert_candidate("2025-05-01", "Long one", "09:30", "12:00", None)
+    db.insert_candidate("2025-05-01", "After", "12:00", "12:30", None)
+    db.insert_candidate("2025-05-01", "Zero", "10:15", "10:15", None)
+    rows = [{"event_id": f"e{h}", "event_date": "2025-05-01",
+             "start_at": f"2025-05-01T{h:02d}:00:00+09:00", "end_at": f"2025-05-01T{h + 1:02d}:00:00+09:00",
+             "payload": json.dumps({"subject": f"Event {h}"})} for h in (9, 10, 11)]
+    # 前日 23 時から 1 時間半の予定（日をまたぐ）は候補と重ならない
+    rows.append({"event_id": "late", "event_date": "2025-04-30", "start_at": "2025-04-30T23:00:00+09:00",
+                 "end_at": "2025-05-01T00:30:00+09:00", "payload": json.dumps({"subject": "Late"})})
+    db.replace_cached_events("2025-04-30", "2025-05-01", rows, "t")
+
+    got = find_conflicts(date(2025, 4, 30), date(2025, 5, 1))
+    by_title = {c["title"]: c["id"] for c in db.search_candidates("")["rows"]}
+    assert sorted(x["id"] for x in got[by_title["Long one"]]) == ["e10", "e11", "e9"]
+    assert by_title["After"] not in got
+    assert by_title["Zero"] not in got
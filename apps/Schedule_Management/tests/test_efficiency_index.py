@@ -0,0 +1,67 @@
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+import db
+import efficiency_index
+from efficiency_index import multipliers
+
+TODAY = date.today()
+END = TODAY + timedelta(days=9)
+
+
+@pytest.fixture(autouse=True)
+def fresh_timeline(tmp_db):
+    efficiency_index.invalidate()
+    yield
+    efficiency_index.invalidate()
+
+
+def _other_process(sql, params=()):
+    """プール・フックを通らない別接続での書き込み（別プロセス・別ワーカーの代わり）"""
+    conn = sqlite3.connect(db.DB_PATH)
+    conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+
+
+def _rule(start, end, eff):
+    return (start.isoformat(), end.isoformat(), eff, 0, 0)
+
+
+def test_local_writes_are_applied_as_diffs():
+    assert list(multipliers(TODAY, END)) == [1.0] * 10
+    built = efficiency_index._timeline
+    eid = db.insert_efficiency(*_rule(TODAY, TODAY + timedelta(days=1), 0.5))
+    assert list(multipliers(TODAY, TODAY + timedelta(days=2))) == [0.5, 0.5, 1.0]
+    db.update_efficiency(eid, *_rule(TODAY, TODAY, 2.0))
+    assert list(multipliers(TODAY, TODAY + timedelta(days=1))) == [2.0, 1.0]
+    db.delete_efficiency(eid)
+    assert list(multipliers(TODAY, END)) == [1.0] * 10
+    # 差分で反映したので作り直していない
+    assert efficiency_index._timeline is built
+
+
+def test_write_from_another_process_is_picked_up():
+    assert multipliers(TODAY, TODAY)[0] == 1.0
+    _other_process("INSERT INTO efficiency(start_date, end_date, efficiency, repeat, interval_days) VALUES (?,?,?,?,?)",
+                   _rule(TODAY, TODAY, 0.25))
+    assert multipliers(TODAY, TODAY)[0] == 0.25
+    _other_process("UPDATE efficiency SET efficiency = 0.75")
+    assert multipliers(TODAY, TODAY)[0] == 0.75
+    _other_process("DELETE FROM efficiency")
+    assert multipliers(TODAY, TODAY)[0] == 1.0
+
+
+def test_local_diff_is_not_applied_over_a_foreign_write():
+    multipliers(TODAY, END)
+    _other_process("INSERT INTO efficiency(start_date, end_date, efficiency, repeat, interval_days) VALUES (?,?,?,?,?)",
+                   _rule(TODAY, TODAY, 0.5))
+    db.insert_efficiency(*_rule(TODAY, TODAY, 1.5))
+    # 両方の行が入っている（平均 1.0）ことを、差分ではなく読み直しで得る
+    assert efficiency_index._timeline is None
+    assert multipliers(TODAY, TODAY)[0] == pytest.approx(1.0)
+    assert multipliers(TODAY + timedelta(days=1), TODAY + timedelta(days=1))[0] == 1.0
+    _other_process("DELETE FROM efficiency WHERE efficiency = 1.5")
+    assert multipliers(TODAY, TODAY)[0] == 0.5
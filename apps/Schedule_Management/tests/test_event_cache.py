@@ -0,0 +1,55 @@
+import json
+
+import db
+
+START, END = "2025-03-01", "2025-03-03"
+
+
+def _row(eid, day, subject):
+    return {
+        "event_id": eid, "event_date": day,
+        "start_at": f"{day}T09:00:00+00:00", "end_at": f"{day}T10:00:00+00:00",
+        "payload": json.dumps({"id": eid, "subject": subject}),
+    }
+
+
+def _event_versions():
+    return db.get_data_versions(START, END, scopes=())
+
+
+def _cached():
+    return [(r["event_id"], r["event_date"], json.loads(r["payload"])["subject"])
+            for r in db.list_cached_events(START, END)]
+
+
+ROWS = [_row("a", "2025-03-01", "A"), _row("b", "2025-03-02", "B"), _row("c", "2025-03-02", "C")]
+
+
+def test_unchanged_refresh_does_not_bump_versions(tmp_db):
+    db.replace_cached_events(START, END, ROWS, "t1")
+    before = _event_versions()
+    assert set(before) == {"event:2025-03-01", "event:2025-03-02"}
+
+    db.replace_cached_events(START, END, ROWS, "t2")
+    assert _event_versions() == before
+    assert _cached() == [("a", "2025-03-01", "A"), ("b", "2025-03-02", "B"), ("c", "2025-03-02", "C")]
+    assert set(db.list_cached_days(START, END).values()) == {"t2"}
+
+
+def test_only_changed_and_removed_days_are_bumped(tmp_db):
+    db.replace_cached_events(START, END, ROWS, "t1")
+    before = _event_versions()
+
+    # b の件名を変え、c を消し、3 日に d を足す
+    db.replace_cached_events(START, END, [ROWS[0], _row("b", "2025-03-02", "B2"), _row("d", "2025-03-03", "D")], "t2")
+    after = _event_versions()
+    assert after["event:2025-03-01"] == before["event:2025-03-01"]
+    assert after["event:2025-03-02"] > before["event:2025-03-02"]
+    assert "event:2025-03-03" in after
+    assert _cached() == [("a", "2025-03-01", "A"), ("b", "2025-03-02", "B2"), ("d", "2025-03-03", "D")]
+
+
+def test_rows_outside_the_range_are_kept(tmp_db):
+    db.replace_cached_events("2025-02-28", "2025-02-28", [_row("x", "2025-02-28", "X")], "t1")
+    db.replace_cached_events(START, END, [], "t2")
+    assert [r["event_id"] for r in db.list_cached_events("2025-02-28", END)] == ["x"]
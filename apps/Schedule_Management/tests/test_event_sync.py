@@ -0,0 +1,49 @@
+import threading
+
+import event_sync
+
+
+def _run_worker(monkeypatch, tokens):
+    """tokens を順に返す token_provider で 1 本走らせ、止まるまで待つ"""
+    seen = []
+    done = threading.Event()
+    monkeypatch.setattr(event_sync, "sync_events", lambda token: seen.append(token) or {"changed": 0})
+    it = iter(tokens)
+
+    def provider():
+        tok = next(it, None)
+        if tok is None:
+            done.set()
+        return tok
+
+    w = event_sync._SyncWorker(provider, interval_sec=0)
+    w.start()
+    assert done.wait(5)
+    w.join(5)
+    return w, seen
+
+
+def test_worker_asks_for_a_fresh_token_every_cycle(monkeypatch):
+    w, seen = _run_worker(monkeypatch, ["t1", "t2", "t3"])
+    assert seen == ["t1", "t2", "t3"]
+
+
+def test_worker_stops_and_flags_when_auth_fails(monkeypatch):
+    w, seen = _run_worker(monkeypatch, ["t1"])
+    assert seen == ["t1"]
+    assert not w.is_alive()
+    assert w.auth_failed
+    assert "sign in" in w.last_error
+
+
+def test_start_background_sync_restarts_a_stopped_worker(monkeypatch):
+    monkeypatch.setattr(event_sync, "sync_events", lambda token: {"changed": 0})
+    first = event_sync.start_background_sync(lambda: None, interval_sec=60)
+    first.join(5)
+    assert event_sync.background_sync_status()["auth_failed"]
+    second = event_sync.start_background_sync(lambda: "fresh", interval_sec=60)
+    try:
+        assert second is not first and second.is_alive()
+        assert event_sync.background_sync_status() == {"running": True, "auth_failed": False, "last_error": None}
+    finally:
+        event_sync.stop_background_sync()
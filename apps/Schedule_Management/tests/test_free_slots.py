@@ -0,0 +1,211 @@
+import random
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import free_slots
+from allocation import place_task_hours
+from conflicts import MIN_PER_DAY, IntervalIndex
+from free_slots import find_free_slots, merge_busy
+
+START = date(2025, 6, 2)
+LO = START.toordinal() * MIN_PER_DAY
+
+
+def m(day, hh, mm=0):
+    """START から day 日目の hh:mm の通し分"""
+    return LO + day * MIN_PER_DAY + hh * 60 + mm
+
+
+def dt(day, hh, mm=0):
+    return datetime.combine(START, datetime.min.time()) + timedelta(days=day, hours=hh, minutes=mm)
+
+
+@pytest.fixture
+def busy(monkeypatch):
+    """build_index を決めた区間だけのインデックスに差し替える"""
+    spans = []
+    monkeypatch.setattr(free_slots, "build_index",
+                        lambda s, e, token=None: IntervalIndex([a for a, _ in spans], [b for _, b in spans],
+                                                               list(range(len(spans)))))
+    return spans
+
+
+# ----- merge_busy -----
+
+@pytest.mark.parametrize("spans, want", [
+    ([(0, 10), (5, 15)], [(0, 15)]),                    # 重なり
+    ([(0, 10), (10, 20)], [(0, 20)]),                   # 接する
+    ([(0, 100), (10, 20), (30, 40)], [(0, 100)]),       # 内側
+    ([(30, 40), (0, 10), (12, 20)], [(0, 10), (12, 20), (30, 40)]),
+    ([(5, 5), (8, 3)], []),                             # 長さ 0・逆転は捨てる
+    ([], []),
+])
+def test_merge_busy(spans, want):
+    s, e = merge_busy([a for a, _ in spans], [b for _, b in spans])
+    assert list(zip(s.tolist(), e.tolist())) == want
+
+
+def test_merge_busy_matches_a_minute_grid():
+    rng = random.Random(5)
+    for _ in range(200):
+        spans = [(a, a + rng.randint(-3, 40)) for a in (rng.randint(0, 300) for _ in range(rng.randint(0, 25)))]
+        grid = np.zeros(400, dtype=bool)
+        for a, b in spans:
+            grid[a:max(a, b)] = True
+        s, e = merge_busy([a for a, _ in spans], [b for _, b in spans])
+        got = np.zeros(400, dtype=bool)
+        for a, b in zip(s, e):
+            assert not got[a:b].any()
+            got[a:b] = True
+        assert (got == grid).all()
+        assert (s[1:] > e[:-1]).all()       # 接する塊も残らない
+
+
+# ----- find_free_slots -----
+
+def _oracle(spans, n_days, min_minutes, day_start=0, day_end=MIN_PER_DAY):
+    """1 分刻みの配列で空きを数える"""
+    free = np.ones(n_days * MIN_PER_DAY, dtype=bool)
+    for a, b in spans:
+        free[max(a - LO, 0):max(min(b - LO, len(free)), 0)] = False
+    for d in range(n_days):
+        free[d * MIN_PER_DAY:d * MIN_PER_DAY + day_start] = False
+        free[d * MIN_PER_DAY + day_end:(d + 1) * MIN_PER_DAY] = False
+    edges = np.flatnonzero(np.diff(np.concatenate([[0], free.astype(np.int8), [0]])))
+    runs = [(LO + a, LO + b) for a, b in zip(edges[::2], edges[1::2]) if b - a >= min_minutes]
+    return sorted(runs, key=lambda r: (-(r[1] - r[0]), r[0]))
+
+
+def _as_minutes(slots):
+    def to_m(x):
+        return x.date().toordinal() * MIN_PER_DAY + x.hour * 60 + x.minute
+    return [(to_m(s["start"]), to_m(s["end"])) for s in slots]
+
+
+def test_free_time_between_overlapping_touching_and_nested_events(busy):
+    busy += [(m(0, 9), m(0, 10)), (m(0, 9, 30), m(0, 11)),      # 重なり
+             (m(0, 11), m(0, 12)),                              # 接する
+             (m(0, 14), m(0, 18)), (m(0, 15), m(0, 16))]        # 内側
+    got = find_free_slots(START, START, min_minutes=30, routine=False)
+    assert [(s["start"], s["end"], s["minutes"]) for s in got] == [
+        (dt(0, 0), dt(0, 9), 540),
+        (dt(0, 18), dt(1, 0), 360),
+        (dt(0, 12), dt(0, 14), 120),
+    ]
+
+
+def test_busy_time_across_midnight_splits_both_days(busy):
+    busy += [(m(0, 22), m(1, 2))]
+    got = find_free_slots(START, START + timedelta(days=1), routine=False)
+    assert (dt(0, 0), dt(0, 22)) in [(s["start"], s["end"]) for s in got]
+    assert (dt(1, 2), dt(2, 0)) in [(s["start"], s["end"]) for s in got]
+    assert not any(s["start"] < dt(1, 2) and dt(0, 22) < s["end"] for s in got)
+
+
+def test_busy_time_outside_the_window_is_clipped(busy):
+    busy += [(m(-1, 20), m(0, 1)), (m(0, 23), m(3, 0))]
+    got = find_free_slots(START, START, routine=False)
+    assert [(s["start"], s["end"]) for s in got] == [(dt(0, 1), dt(0, 23))]
+
+
+def test_min_minutes_filter_and_ranking(busy):
+    # 空きは 0:00-9:00, 9:20-9:50, 10:00-10:30, 11:00-24:00
+    busy += [(m(0, 9), m(0, 9, 20)), (m(0, 9, 50), m(0, 10)), (m(0, 10, 30), m(0, 11))]
+    got = find_free_slots(START, START, min_minutes=30, routine=False)
+    # 同じ長さは早い順
+    assert [s["minutes"] for s in got] == [780, 540, 30, 30]
+    assert got[2]["start"] == dt(0, 9, 20) and got[3]["start"] == dt(0, 10)
+    assert [s["minutes"] for s in find_free_slots(START, START, min_minutes=31, routine=False)] == [780, 540]
+
+
+def test_day_window(busy):
+    busy += [(m(0, 12), m(0, 13))]
+    got = find_free_slots(START, START + timedelta(days=1), min_minutes=1, routine=False,
+                          day_start="08:00", day_end="20:00")
+    assert sorted(_as_minutes(got)) == [(m(0, 8), m(0, 12)), (m(0, 13), m(0, 20)), (m(1, 8), m(1, 20))]
+
+
+def test_matches_a_minute_grid_on_random_calendars(busy):
+    rng = random.Random(9)
+    for _ in range(40):
+        busy.clear()
+        n_days = rng.randint(1, 4)
+        for _ in range(rng.randint(0, 30)):
+            a = LO + rng.randint(-MIN_PER_DAY, (n_days + 1) * MIN_PER_DAY)
+            busy.append((a, a + rng.randint(0, 600)))
+        min_minutes = rng.choice((1, 15, 30, 90))
+        got = find_free_slots(START, START + timedelta(days=n_days - 1), min_minutes=min_minutes,
+                              routine=False, day_start="07:00", day_end="23:30")
+        assert _as_minutes(got) == _oracle(busy, n_days, min_minutes, 7 * 60, 23 * 60 + 30)
+        assert all(s["minutes"] == (s["end"] - s["start"]).total_seconds() / 60 for s in got)
+
+
+def test_routine_minutes_block_the_start_of_each_day(busy, monkeypatch):
+    monkeypatch.setattr(free_slots, "daily_split", lambda s, e: (np.array([1.0, 0.0]), np.array([7.0, 30.0])))
+    got = find_free_slots(START, START + timedelta(days=1), routine=True)
+    # 2 日目は 30 時間でも 1 日分まで
+    assert [(s["start"], s["end"]) for s in got] == [(dt(0, 8), dt(1, 0))]
+
+
+# ----- place_task_hours -----
+
+def _daily(rows):
+    return pd.DataFrame([{"date": pd.Timestamp(d), "task_id": i, "title": f"t{i}", "hours": h} for d, i, h in rows])
+
+
+def test_place_task_hours_fills_slots_in_order():
+    slots = [{"start": dt(0, 13), "end": dt(0, 14)}, {"start": dt(0, 9), "end": dt(0, 10, 30)}]
+    daily = _daily([(START, 1, 2.0), (START, 2, 1.0)])
+    got = place_task_hours(daily, slots)
+    assert list(zip(got["task_id"], got["start"], got["end"])) == [
+        (1, dt(0, 9), dt(0, 10, 30)), (1, dt(0, 13), dt(0, 13, 30)), (2, dt(0, 13, 30), dt(0, 14))]
+    # 入りきらない 0.5 時間は置かない
+    assert got["hours"].sum() == pytest.approx(2.5)
+
+
+def test_place_task_hours_splits_a_slot_across_midnight():
+    slots = [{"start": dt(0, 22), "end": dt(1, 3)}]
+    daily = _daily([(START, 1, 4.0), (START + timedelta(days=1), 1, 4.0)])
+    got = place_task_hours(daily, slots)
+    per_day = got.groupby(got["date"].dt.date)["hours"].sum()
+    assert per_day[START] == pytest.approx(2.0) and per_day[START + timedelta(days=1)] == pytest.approx(3.0)
+    assert (got["start"].dt.date == got["date"].dt.date).all()
+
+
+def test_place_task_hours_never_exceeds_free_time_or_need():
+    rng = random.Random(2)
+    placed = 0.0
+    for _ in range(30):
+        slots = []
+        for d in range(5):
+            t = rng.randint(0, 4) * 60
+            for _ in range(rng.randint(0, 4)):
+                a = t + rng.randint(0, 120)
+                b = a + rng.randint(10, 300)
+                slots.append({"start": dt(d, 0, a), "end": dt(d, 0, b)})
+                t = b
+        rows = [(START + timedelta(days=rng.randint(0, 5)), i, round(rng.uniform(0, 6), 2)) for i in range(8)]
+        daily = _daily(rows).groupby(["date", "task_id", "title"], as_index=False)["hours"].sum()
+        got = place_task_hours(daily, slots)
+        placed += got["hours"].sum()
+
+        free = {}
+        for s in slots:
+            cur = s["start"]
+            while cur < s["end"]:
+                nxt = min(s["end"], datetime.combine(cur.date() + timedelta(days=1), datetime.min.time()))
+                free[cur.date()] = free.get(cur.date(), 0.0) + (nxt - cur).total_seconds() / 3600
+                cur = nxt
+        for d, h in got.groupby(got["date"].dt.date)["hours"].sum().items():
+            assert h <= free.get(d, 0.0) + 1e-9
+        need = daily.set_index(["date", "task_id"])["hours"]
+        for (d, tid), h in got.groupby(["date", "task_id"])["hours"].sum().items():
+            assert h <= need[(d, tid)] + 1e-9
+        # 置いた区間は空き時間の中で、互いに重ならない
+        pieces = sorted(zip(got["start"], got["end"]))
+        assert all(a[1] <= b[0] for a, b in zip(pieces, pieces[1:]))
+        assert all(any(s["start"] <= a and b <= s["end"] for s in slots) for a, b in pieces)
+    assert placed > 0
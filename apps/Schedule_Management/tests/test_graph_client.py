@@ -0,0 +1,236 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+import graph_client
+from graph_client import GraphClient, GraphError
+
+
+class Stub:
+    """
+    パスごとに決めた応答 (status, headers, body) を順に返すローカル HTTP サーバー。
+    受けたリクエストは requests に (method, path, query, headers, body) で残る。
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                parts = urlsplit(self.path)
+                n = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(n)) if n else None
+                stub.requests.append((self.command, parts.path, parse_qs(parts.query), dict(self.headers), body))
+                queue = stub.routes.get((self.command, parts.path)) or [(404, {}, {"error": {"message": "no route"}})]
+                status, headers, payload = queue.pop(0) if len(queue) > 1 else queue[0]
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = _handle
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1.0"
+
+    def on(self, method, path, *responses):
+        self.routes[(method, "/v1.0" + path)] = list(responses)
+
+
+@pytest.fixture
+def stub():
+    s = Stub()
+    yield s
+    s.server.shutdown()
+    s.server.server_close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """テストのスレッドの time.sleep は待たずに待ち時間を記録する（他のスレッドはそのまま眠る）"""
+    out = []
+    real_sleep = graph_client.time.sleep
+    me = threading.get_ident()
+
+    def sleep(sec):
+        if threading.get_ident() == me:
+            out.append(sec)
+        else:
+            real_sleep(sec)
+    monkeypatch.setattr(graph_client.time, "sleep", sleep)
+    return out
+
+
+def client(stub, **kwargs):
+    kwargs.setdefault("backoff", 0.01)
+    return GraphClient(stub.url, **kwargs)
+
+
+# ----- ページング -----
+
+def test_iter_pages_follows_next_link_lazily(stub):
+    stub.on("GET", "/me/events", (200, {}, {"value": [1, 2], "@odata.nextLink": f"{stub.url}/me/events/page2?$skip=2"}))
+    stub.on("GET", "/me/events/page2", (200, {}, {"value": [3], "@odata.nextLink": f"{stub.url}/me/events/page3"}))
+    stub.on("GET", "/me/events/page3", (200, {}, {"value": [4]}))
+
+    pages = client(stub).iter_pages("/me/events", "tok", params={"$top": 2})
+    assert next(pages)["value"] == [1, 2]
+    # 次のページは取り出すまで取りに行かない
+    assert len(stub.requests) == 1
+    assert [p["value"] for p in pages] == [[3], [4]]
+
+    (_, _, q1, h1, _), (_, _, q2, _, _), _ = stub.requests
+    assert q1 == {"$top": ["2"]}
+    # nextLink のクエリだけを使い、初回の params は付け直さない
+    assert q2 == {"$skip": ["2"]}
+    assert h1["Authorization"] == "Bearer tok"
+
+
+def test_iter_items_and_byte_count(stub):
+    stub.on("GET", "/me/events", (200, {}, {"value": ["a"], "@odata.nextLink": f"{stub.url}/me/events2"}))
+    stub.on("GET", "/me/events2", (200, {}, {"value": ["b", "c"]}))
+    c = client(stub)
+    assert list(c.iter_items("/me/events", "tok")) == ["a", "b", "c"]
+    stats = {}
+    list(c.iter_pages("/me/events", "tok", stats=stats))
+    assert stats["bytes"] > 0
+
+
+def test_iter_pages_raises_on_error_status(stub):
+    stub.on("GET", "/me/events", (403, {}, {"error": {"message": "denied"}}))
+    with pytest.raises(GraphError) as e:
+        list(client(stub).iter_pages("/me/events", "tok"))
+    assert e.value.status_code == 403
+
+
+# ----- 再試行 -----
+
+def test_429_waits_retry_after_then_succeeds(stub, sleeps):
+    stub.on("GET", "/me/events",
+            (429, {"Retry-After": "3"}, {}),
+            (503, {"Retry-After": "1"}, {}),
+            (200, {}, {"value": [1]}))
+    assert list(client(stub).iter_items("/me/events", "tok")) == [1]
+    assert sleeps == [3.0, 1.0]
+    assert len(stub.requests) == 3
+
+
+def test_retry_after_is_capped_by_max_backoff(stub, sleeps):
+    stub.on("GET", "/me/events", (429, {"Retry-After": "120"}, {}), (200, {}, {"value": []}))
+    list(client(stub, max_backoff=5.0).iter_items("/me/events", "tok"))
+    assert sleeps == [5.0]
+
+
+def test_without_retry_after_backs_off_exponentially(stub, sleeps):
+    stub.on("GET", "/me/events", (500, {}, {}), (502, {}, {}), (200, {}, {"value": []}))
+    list(client(stub, backoff=1.0).iter_items("/me/events", "tok"))
+    assert 1.0 <= sleeps[0] < 2.0 and 2.0 <= sleeps[1] < 3.0
+
+
+def test_gives_up_after_max_retries(stub, sleeps):
+    stub.on("GET", "/me/events", (429, {"Retry-After": "0"}, {}))
+    with pytest.raises(GraphError) as e:
+        list(client(stub, max_retries=2).iter_pages("/me/events", "tok"))
+    assert e.value.status_code == 429
+    assert len(stub.requests) == 3
+
+
+def test_post_is_not_retried_on_500(stub, sleeps):
+    stub.on("POST", "/me/events", (500, {}, {}), (201, {}, {"id": "x"}))
+    r = client(stub).request("POST", "/me/events", "tok", json={"subject": "s"})
+    assert r.status_code == 500
+    assert len(stub.requests) == 1 and sleeps == []
+
+
+def test_post_is_retried_on_429(stub, sleeps):
+    stub.on("POST", "/me/events", (429, {"Retry-After": "2"}, {}), (201, {}, {"id": "x"}))
+    r = client(stub).request("POST", "/me/events", "tok", json={"subject": "s"})
+    assert r.status_code == 201 and sleeps == [2.0]
+
+
+# ----- $batch -----
+
+def _reqs(n):
+    return [{"method": "POST", "url": "/me/events", "body": {"subject": f"e{i}"}} for i in range(n)]
+
+
+def test_batch_resends_only_throttled_sub_requests(stub, sleeps):
+    stub.on("POST", "/$batch",
+            (200, {}, {"responses": [
+                {"id": "0", "status": 201, "body": {"id": "ev0"}},
+                {"id": "1", "status": 429, "headers": {"Retry-After": "4"}, "body": {}},
+                {"id": "2", "status": 400, "body": {"error": {"message": "bad"}}},
+                {"id": "3", "status": 503, "headers": {"Retry-After": "2"}, "body": {}},
+            ]}),
+            (200, {}, {"responses": [
+                {"id": "3", "status": 201, "body": {"id": "ev3"}},
+                {"id": "1", "status": 201, "body": {"id": "ev1"}},
+            ]}))
+    out = client(stub).batch("tok", _reqs(4))
+
+    assert [r["status"] for r in out] == [201, 201, 400, 201]
+    assert [r["body"].get("id") for r in out] == ["ev0", "ev1", None, "ev3"]
+    # 2 回目は 429/503 だったものだけ、最長の Retry-After を待ってから
+    first, second = [body for m, p, q, h, body in stub.requests]
+    assert [r["id"] for r in first["requests"]] == ["0", "1", "2", "3"]
+    assert [r["id"] for r in second["requests"]] == ["1", "3"]
+    assert second["requests"][0]["body"] == {"subject": "e1"}
+    assert sleeps == [4.0]
+
+
+def test_batch_reports_sub_requests_still_throttled_after_retries(stub, sleeps):
+    stub.on("POST", "/$batch", (200, {}, {"responses": [
+        {"id": "0", "status": 201, "body": {"id": "ev0"}},
+        {"id": "1", "status": 429, "headers": {"Retry-After": "0"}, "body": {}},
+    ]}), (200, {}, {"responses": [
+        {"id": "1", "status": 429, "headers": {"Retry-After": "0"}, "body": {}},
+    ]}))
+    out = client(stub, max_retries=2).batch("tok", _reqs(2))
+    assert [r["status"] for r in out] == [201, 429]
+    assert len(stub.requests) == 3
+
+
+def test_batch_whole_request_failure_marks_every_sub_request(stub, sleeps):
+    stub.on("POST", "/$batch", (400, {}, {"error": {"message": "malformed"}}))
+    out = client(stub).batch("tok", _reqs(3))
+    assert [r["status"] for r in out] == [400, 400, 400]
+    assert "malformed" in out[0]["body"]["error"]["message"]
+
+
+def test_batch_rejects_more_than_the_limit(stub):
+    with pytest.raises(ValueError):
+        client(stub).batch("tok", _reqs(graph_client.BATCH_LIMIT + 1))
+
+
+def test_create_events_bulk_maps_results_back_to_candidates(stub, sleeps, monkeypatch):
+    monkeypatch.setattr(graph_client, "_client", client(stub))
+    stub.on("POST", "/$batch", (200, {}, {"responses": [
+        {"id": "0", "status": 201, "body": {"id": "ev-a"}},
+        {"id": "1", "status": 400, "body": {"error": {"message": "bad time"}}},
+    ]}))
+    cands = [{"id": 10, "date": "2025-01-01", "title": "A", "start_time": "09:00", "end_time": "10:00"},
+             {"id": 11, "date": "2025-01-01", "title": "B", "start_time": "11:00", "end_time": "10:00"}]
+    out = graph_client.create_events_bulk("tok", cands)
+    assert [(r["id"], r["ok"], r["error"]) for r in out] == [(10, True, None), (11, False, "bad time")]
+    assert out[0]["event"] == {"id": "ev-a"}
@@ -0,0 +1,147 @@
+import sqlite3
+from datetime import date
+
+import numpy as np
+import pytest
+
+import db
+import migrations
+import routine_engine
+from migrations import LATEST_VERSION, MIGRATIONS, get_version, migrate
+
+
+@pytest.fixture
+def v0(tmp_path, monkeypatch):
+    """init_db の CREATE TABLE だけの状態（user_version = 0）の DB への接続"""
+    path = tmp_path / "v0.sqlite3"
+    monkeypatch.setattr(db, "DB_PATH", path)
+    monkeypatch.setattr(db, "migrate", lambda conn: 0)
+    db.init_db()
+    db.close_pool()
+    conn = sqlite3.connect(path)
+    assert get_version(conn) == 0
+    yield conn
+    conn.close()
+
+
+def _dump(conn):
+    """マイグレーションが触るテーブルの中身"""
+    return {
+        t: conn.execute(f"SELECT * FROM {t} ORDER BY 1").fetchall()
+        for t in ("event_meta", "candidate_trash", "candidate", "routine")
+    }
+
+
+def test_migrate_to_latest_and_again_is_a_no_op(v0):
+    assert migrate(v0) == LATEST_VERSION
+    before = _dump(v0)
+    schema = v0.execute("SELECT type, name, sql FROM sqlite_master ORDER BY name").fetchall()
+    assert migrate(v0) == LATEST_VERSION
+    assert _dump(v0) == before
+    assert v0.execute("SELECT type, name, sql FROM sqlite_master ORDER BY name").fetchall() == schema
+
+
+def test_m001_keeps_the_newest_event_meta_per_event_and_date(v0):
+    v0.executemany(
+        "INSERT INTO event_meta(id, event_id, event_date, info_url, proof_path) VALUES (?,?,?,?,?)",
+        [
+            (1, "e1", "2025-01-01", "old", None),
+            (2, "e2", "2025-01-01", "only", None),
+            (3, "e1", "2025-01-01", "newer", None),
+            (4, "e1", "2025-01-02", "other day", None),
+            (5, "e1", "2025-01-01", "newest", "proof.pdf"),
+        ],
+    )
+    v0.commit()
+    migrate(v0)
+    rows = v0.execute("SELECT id, event_id, event_date, info_url, proof_path FROM event_meta ORDER BY id").fetchall()
+    assert rows == [
+        (2, "e2", "2025-01-01", "only", None),
+        (4, "e1", "2025-01-02", "other day", None),
+        (5, "e1", "2025-01-01", "newest", "proof.pdf"),
+    ]
+    with pytest.raises(sqlite3.IntegrityError):
+        v0.execute("INSERT INTO event_meta(event_id, event_date) VALUES ('e1', '2025-01-01')")
+    v0.rollback()
+
+    migrate(v0)
+    assert v0.execute("SELECT COUNT(*) FROM event_meta").fetchone()[0] == 3
+
+
+def test_m002_normalizes_deleted_at(v0):
+    v0.executemany(
+        "INSERT INTO candidate_trash(id, title, deleted_at) VALUES (?,?,?)",
+        [
+            (1, "isoformat", "2024-05-01T10:20:30.123456"),
+            (2, "already normalized", "2024-05-02 08:00:00"),
+            (3, "with offset", "2024-05-03T10:00:00+01:00"),
+            (4, "date only", "2024-05-04"),
+            (5, "null", None),
+            (6, "garbage", "yesterday"),
+        ],
+    )
+    v0.commit()
+    migrate(v0)
+    now = v0.execute("SELECT datetime('now')").fetchone()[0]
+    got = dict(v0.execute("SELECT id, deleted_at FROM candidate_trash"))
+    assert got[1] == "2024-05-01 10:20:30"
+    assert got[2] == "2024-05-02 08:00:00"
+    assert got[3] == "2024-05-03 09:00:00"
+    assert got[4] == "2024-05-04 00:00:00"
+    # 解釈できない値・NULL は適用時刻
+    assert got[5][:13] == got[6][:13] == now[:13]
+
+    # 2 回目（関数を直接もう一度）も値は変わらない
+    fn = dict((v, f) for v, _, f in MIGRATIONS)[2]
+    fn(v0)
+    v0.commit()
+    assert dict(v0.execute("SELECT id, deleted_at FROM candidate_trash")) == got
+
+
+def test_m004_indexes_existing_candidates(v0):
+    v0.execute("INSERT INTO candidate(date, title, start_time, end_time, info_url) "
+               "VALUES ('2025-01-01', 'Quarterly review', '09:00', '10:00', NULL)")
+    v0.commit()
+    migrate(v0)
+    if not v0.execute("SELECT 1 FROM sqlite_master WHERE name = 'candidate_fts'").fetchone():
+        pytest.skip("FTS5 is not available in this SQLite build")
+    hits = v0.execute("SELECT rowid FROM candidate_fts WHERE candidate_fts MATCH 'review'").fetchall()
+    assert hits == [(1,)]
+
+
+def _occurrences(conn):
+    conn.row_factory = sqlite3.Row
+    routines = [dict(r) for r in conn.execute("SELECT * FROM routine ORDER BY id")]
+    conn.row_factory = None
+    mat = routine_engine.occurrence_matrix(routines, date(2024, 12, 20), date(2025, 3, 10))
+    return {r["id"]: np.flatnonzero(mat[:, j]).tolist() for j, r in enumerate(routines)}
+
+
+def test_m006_keeps_the_occurrence_dates_of_existing_routines(v0, monkeypatch):
+    monkeypatch.setattr(migrations, "MIGRATIONS", [m for m in MIGRATIONS if m[0] < 6])
+    migrations.migrate(v0)
+    assert "anchor_date" not in migrations._columns(v0, "routine")
+    v0.executemany(
+        "INSERT INTO routine(title, hours, period_days) VALUES (?,?,?)",
+        [("Sleep", 7.0, 1), ("Laundry", 1.0, 3), ("Gym", 2.0, 7), ("Haircut", 0.5, 30)],
+    )
+    v0.commit()
+    before = _occurrences(v0)
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", MIGRATIONS)
+    assert migrations.migrate(v0) == LATEST_VERSION
+    assert _occurrences(v0) == before
+    # 適用日ではなく固定の起点で埋める（いつ適用しても位相は同じ）
+    assert {a for (a,) in v0.execute("SELECT anchor_date FROM routine")} == {routine_engine.ROUTINE_EPOCH.isoformat()}
+
+
+def test_failed_migration_is_rolled_back(v0, monkeypatch):
+    def broken(conn):
+        conn.execute("CREATE TABLE half_done(x)")
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", [MIGRATIONS[0], (2, "broken", broken)])
+    with pytest.raises(RuntimeError):
+        migrations.migrate(v0)
+    assert get_version(v0) == 1
+    assert not v0.execute("SELECT 1 FROM sqlite_master WHERE name = 'half_done'").fetchone()
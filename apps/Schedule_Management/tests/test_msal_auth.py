@@ -0,0 +1,127 @@
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import msal_auth
+
+
+class FakeApp:
+    def __init__(self, accounts):
+        self.accounts = accounts
+        self.silent_calls = []
+
+    def get_accounts(self):
+        return self.accounts
+
+    def acquire_token_silent(self, scopes, account):
+        self.silent_calls.append(account)
+        return {"access_token": f"token-{account['local_account_id']}", "expires_in": 3600}
+
+    def get_authorization_request_url(self, scopes, redirect_uri, **kwargs):
+        self.auth_kwargs = kwargs
+        return "https://login.example/authorize"
+
+
+ALICE = {"local_account_id": "alice-oid", "home_account_id": "alice-oid.tenant", "username": "alice@example.com"}
+BOB = {"local_account_id": "bob-oid", "home_account_id": "bob-oid.tenant", "username": "bob@example.com"}
+
+
+def _use(monkeypatch, accounts):
+    fake = FakeApp(accounts)
+    monkeypatch.setattr(msal_auth, "_app", lambda: fake)
+    monkeypatch.setattr(msal_auth, "_save_cache", lambda: None)
+    return fake
+
+
+def test_session_without_account_gets_no_cached_token(monkeypatch):
+    fake = _use(monkeypatch, [ALICE, BOB])
+    assert msal_auth._silent_result(None) is None
+    assert fake.silent_calls == []
+
+
+def test_unknown_account_does_not_fall_back_to_another_user(monkeypatch):
+    fake = _use(monkeypatch, [ALICE, BOB])
+    assert msal_auth._silent_result("carol-oid") is None
+    assert fake.silent_calls == []
+
+
+def test_only_the_bound_account_is_used(monkeypatch):
+    fake = _use(monkeypatch, [ALICE, BOB])
+    assert msal_auth._silent_result("bob-oid")["access_token"] == "token-bob-oid"
+    assert fake.silent_calls == [BOB]
+
+
+def test_home_account_id_matches_too(monkeypatch):
+    guest = {"local_account_id": "guest-local", "home_account_id": "guest-oid.home-tenant"}
+    _use(monkeypatch, [ALICE, guest])
+    assert msal_auth._account_for("guest-oid") is guest
+
+
+# ----- ブラウザとアカウントの対応（新しいセッションでのサイレント取得）-----
+
+@pytest.fixture
+def browser(tmp_path, monkeypatch):
+    """新しいブラウザセッション: 空の session_state と、cookie（browser["key"]）"""
+    monkeypatch.setattr(msal_auth, "BINDINGS_PATH", tmp_path / "bindings.json")
+    monkeypatch.setattr(msal_auth, "_bindings", None)
+    monkeypatch.setattr(msal_auth.st, "session_state", {})
+    state = {"key": None}
+    monkeypatch.setattr(msal_auth, "_browser_key", lambda: state["key"])
+    return state
+
+
+def _new_session(monkeypatch, reload_bindings=False):
+    monkeypatch.setattr(msal_auth.st, "session_state", {})
+    if reload_bindings:
+        # 別プロセス（再起動後）ならファイルから読み直す
+        monkeypatch.setattr(msal_auth, "_bindings", None)
+
+
+def test_fresh_session_with_the_browser_binding_gets_a_token_silently(browser, monkeypatch):
+    fake = _use(monkeypatch, [ALICE, BOB])
+    browser["key"] = msal_auth._bind_browser("bob-oid")
+    _new_session(monkeypatch, reload_bindings=True)
+
+    assert msal_auth._acquire_silent() == "token-bob-oid"
+    assert fake.silent_calls == [BOB]
+    assert msal_auth.st.session_state["account_oid"] == "bob-oid"
+    assert msal_auth.silent_token_provider()() == "token-bob-oid"
+
+
+def test_fresh_session_without_the_binding_does_not(browser, monkeypatch):
+    fake = _use(monkeypatch, [ALICE, BOB])
+    msal_auth._bind_browser("bob-oid")          # 別のブラウザの対応
+    _new_session(monkeypatch)
+
+    assert msal_auth._acquire_silent() is None
+    browser["key"] = "forged-or-stale-key"
+    assert msal_auth._acquire_silent() is None
+    assert fake.silent_calls == []
+    assert msal_auth.silent_token_provider()() is None
+
+
+def test_expired_binding_is_ignored_and_pruned(browser, monkeypatch):
+    _use(monkeypatch, [ALICE])
+    browser["key"] = msal_auth._bind_browser("alice-oid")
+    later = time.time() + msal_auth.BINDING_TTL_SEC + 1
+    monkeypatch.setattr(msal_auth, "time", SimpleNamespace(time=lambda: later))
+    assert msal_auth._acquire_silent() is None
+    msal_auth._bind_browser("alice-oid")
+    assert len(json.loads(msal_auth.BINDINGS_PATH.read_text(encoding="utf-8"))) == 1
+
+
+def test_binding_file_does_not_hold_the_cookie_value(browser):
+    key = msal_auth._bind_browser("alice-oid")
+    text = msal_auth.BINDINGS_PATH.read_text(encoding="utf-8")
+    assert key not in text and "alice-oid" in text
+
+
+def test_sign_in_url_hints_the_bound_account(browser, monkeypatch):
+    fake = _use(monkeypatch, [ALICE, BOB])
+    msal_auth._authorization_url()
+    assert fake.auth_kwargs == {"prompt": "select_account"}
+    browser["key"] = msal_auth._bind_browser("alice-oid")
+    msal_auth._authorization_url()
+    assert fake.auth_kwargs == {"login_hint": "alice@example.com"}
@@ -0,0 +1,107 @@
+import hashlib
+import io
+import os
+from pathlib import Path
+
+import pytest
+
+import db
+import proof_store
+
+
+class Upload(io.BytesIO):
+    """Streamlit の UploadedFile の代わり（file_id・name 付きのファイルオブジェクト）。読んだサイズを記録する"""
+
+    def __init__(self, data, name="proof.pdf", file_id=None):
+        super().__init__(data)
+        self.name = name
+        self.file_id = file_id
+        self.reads = []
+
+    def read(self, size=-1):
+        self.reads.append(size)
+        return super().read(size)
+
+
+class Broken(Upload):
+    """2 チャンク目で読み込みが失敗する"""
+
+    def read(self, size=-1):
+        if len(self.reads) == 1:
+            raise IOError("connection reset")
+        return super().read(size)
+
+
+@pytest.fixture
+def store(tmp_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(proof_store, "BLOB_DIR", tmp_path / "blobs")
+    monkeypatch.setattr(proof_store, "CHUNK_SIZE", 4)
+    monkeypatch.setattr(proof_store, "_seen", {})
+    return tmp_path / "blobs"
+
+
+def _files(root):
+    return sorted(p for p in root.rglob("*") if p.is_file()) if root.exists() else []
+
+
+def _rows():
+    with db.get_conn() as conn:
+        return [dict(r) for r in conn.execute("SELECT * FROM proof_blob")]
+
+
+def test_path_is_the_sha256_path_and_writes_are_chunked(store):
+    data = b"receipt bytes 0123456789"
+    up = Upload(data, "Receipt.PDF", "f1")
+    path = proof_store.store_upload(up)
+    sha = hashlib.sha256(data).hexdigest()
+    assert path == str(store / sha[:2] / f"{sha}.pdf")
+    with open(path, "rb") as f:
+        assert f.read() == data
+    # 全体を一度に読まない
+    assert set(up.reads) == {4}
+    assert _rows() == [{"sha256": sha, "path": path, "size": len(data), "created_at": _rows()[0]["created_at"]}]
+
+
+def test_identical_bytes_give_one_file_and_one_row(store):
+    a = proof_store.store_upload(Upload(b"same content", "a.pdf", "f1"))
+    b = proof_store.store_upload(Upload(b"same content", "b.png", "f2"))
+    c = proof_store.store_stream(io.BytesIO(b"same content"), "c.pdf")
+    assert a == b == c
+    assert _files(store) == [Path(a)]
+    assert len(_rows()) == 1
+    other = proof_store.store_upload(Upload(b"other content", "a.pdf", "f3"))
+    assert other != a and len(_files(store)) == 2 and len(_rows()) == 2
+
+
+def test_rerender_of_the_same_upload_does_not_read_again(store):
+    up = Upload(b"abc", "x.pdf", "f1")
+    path = proof_store.store_upload(up)
+    up.reads.clear()
+    assert proof_store.store_upload(up) == path
+    assert up.reads == []
+
+
+def test_failed_read_leaves_no_partial_file_or_row(store):
+    with pytest.raises(IOError):
+        proof_store.store_upload(Broken(b"0123456789abcdef", "x.pdf", "f1"))
+    assert _files(store) == []
+    assert _rows() == []
+    assert proof_store._seen == {}
+
+
+def test_failed_registration_leaves_no_file(store, monkeypatch):
+    def fail(*args):
+        raise RuntimeError("db is locked")
+    monkeypatch.setattr(proof_store, "add_proof_blob", fail)
+    with pytest.raises(RuntimeError):
+        proof_store.store_upload(Upload(b"0123456789", "x.pdf", "f1"))
+    assert _files(store) == []
+    assert _rows() == []
+
+
+def test_row_whose_file_was_removed_is_repointed(store):
+    first = proof_store.store_upload(Upload(b"lost file", "x.pdf", "f1"))
+    os.remove(first)
+    again = proof_store.store_upload(Upload(b"lost file", "y.jpg", "f2"))
+    assert os.path.exists(again)
+    assert [r["path"] for r in _rows()] == [again]
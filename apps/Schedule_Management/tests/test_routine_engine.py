@@ -0,0 +1,150 @@
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+import db
+import routine_engine
+from routine_engine import ROUTINE_EPOCH, next_occurrence, occurrence_matrix, routine_matrix
+
+
+def routine(anchor, period, hours=1.0, title="r"):
+    return {"id": 0, "title": title, "hours": hours, "period_days": period,
+            "anchor_date": anchor.isoformat() if isinstance(anchor, date) else anchor}
+
+
+def brute(routines, start, end):
+    """1 日ずつ起点からの日数を割って数える"""
+    days = [start + timedelta(days=k) for k in range((end - start).days + 1)]
+    out = np.zeros((len(days), len(routines)))
+    for j, r in enumerate(routines):
+        try:
+            anchor = date.fromisoformat(r["anchor_date"] or "")
+        except ValueError:
+            anchor = ROUTINE_EPOCH
+        period = max(1, int(r["period_days"] or 1))
+        for k, d in enumerate(days):
+            if (d - anchor).days % period == 0:
+                out[k, j] = float(r["hours"] or 0.0)
+    return out
+
+
+@pytest.fixture
+def engine(tmp_db, monkeypatch):
+    """月キャッシュを空にして、空の DB から始める"""
+    monkeypatch.setattr(routine_engine, "_months", {})
+    monkeypatch.setattr(routine_engine, "_months_version", None)
+    monkeypatch.setattr(routine_engine, "_routines", [])
+    return routine_engine
+
+
+# ----- occurrence_matrix -----
+
+def test_anchor_phase_extends_before_the_anchor():
+    got = occurrence_matrix([routine(date(2025, 5, 10), 3, hours=2.0)], date(2025, 5, 4), date(2025, 5, 16))[:, 0]
+    # 5/10 から 3 日ごと。起点より前の 5/4, 5/7 も同じ周期
+    want = {date(2025, 5, d) for d in (4, 7, 10, 13, 16)}
+    assert [date(2025, 5, 4) + timedelta(days=int(k)) for k in np.flatnonzero(got)] == sorted(want)
+    assert set(got[got > 0]) == {2.0}
+
+
+@pytest.mark.parametrize("period", [0, None, 1])
+def test_period_zero_or_missing_means_every_day(period):
+    got = occurrence_matrix([routine(date(2025, 1, 1), period, hours=1.5)], date(2024, 12, 30), date(2025, 1, 3))
+    np.testing.assert_allclose(got[:, 0], [1.5] * 5)
+
+
+@pytest.mark.parametrize("anchor", [None, "", "not a date"])
+def test_missing_anchor_uses_the_fixed_epoch(anchor):
+    r = routine(anchor, 7)
+    got = occurrence_matrix([r], date(2025, 3, 1), date(2025, 3, 31))[:, 0]
+    # 今日によらず 1970-01-01 からの 7 日周期
+    days = [date(2025, 3, 1) + timedelta(days=int(k)) for k in np.flatnonzero(got)]
+    assert days and all((d - ROUTINE_EPOCH).days % 7 == 0 for d in days)
+    assert next_occurrence(r, date(2025, 3, 1)) == days[0]
+
+
+def test_empty_inputs():
+    assert occurrence_matrix([], date(2025, 1, 1), date(2025, 1, 5)).shape == (5, 0)
+    assert occurrence_matrix([routine(date(2025, 1, 1), 2)], date(2025, 1, 5), date(2025, 1, 1)).shape == (0, 1)
+
+
+def test_matches_a_day_by_day_count_on_random_routines():
+    rng = random.Random(18)
+    for _ in range(100):
+        routines = [routine(date(2025, 1, 1) + timedelta(days=rng.randint(-400, 400)),
+                            rng.choice((0, None, 1, 2, 3, 7, 14, 30, 365)),
+                            hours=rng.choice((0.0, None, 0.5, 8.0)))
+                    for _ in range(rng.randint(1, 6))]
+        start = date(2025, 1, 1) + timedelta(days=rng.randint(-200, 200))
+        end = start + timedelta(days=rng.randint(0, 120))
+        np.testing.assert_allclose(occurrence_matrix(routines, start, end), brute(routines, start, end))
+
+
+# ----- routine_matrix（月単位のキャッシュ） -----
+
+def test_window_across_months_equals_the_concatenated_month_cache(engine):
+    db.insert_routine("Sleep", 7.0, 1, "2024-01-01")
+    db.insert_routine("Gym", 1.5, 3, "2025-02-27")
+    db.insert_routine("Review", 2.0, 10, "2025-04-01")
+
+    start, end = date(2024, 12, 20), date(2025, 3, 5)
+    mat, routines = routine_matrix(start, end)
+    np.testing.assert_allclose(mat, occurrence_matrix(routines, start, end))
+    assert [r["title"] for r in routines] == [r["title"] for r in db.list_routine()]
+
+    # 同じ窓はキャッシュした月（12 月・1 月・2 月・3 月）の連結の切り出し
+    assert sorted(engine._months) == [(2024, 12), (2025, 1), (2025, 2), (2025, 3)]
+    months = np.concatenate([engine._months[k] for k in sorted(engine._months)], axis=0)
+    np.testing.assert_allclose(mat, months[19:19 + (end - start).days + 1])
+    for (y, m), part in engine._months.items():
+        first = date(y, m, 1)
+        np.testing.assert_allclose(part, occurrence_matrix(routines, first, first + timedelta(days=len(part) - 1)))
+
+    # 2 回目は月を作り直さない
+    cached = dict(engine._months)
+    mat2, _ = routine_matrix(date(2025, 1, 31), date(2025, 2, 1))
+    assert all(engine._months[k] is v for k, v in cached.items())
+    np.testing.assert_allclose(mat2, mat[42:44])
+
+
+def test_single_day_and_empty_windows(engine):
+    db.insert_routine("Gym", 1.0, 2, "2025-06-01")
+    mat, routines = routine_matrix(date(2025, 6, 30), date(2025, 6, 30))
+    assert mat.shape == (1, 1) and mat[0, 0] == 0.0
+    mat, _ = routine_matrix(date(2025, 7, 1), date(2025, 7, 1))
+    assert mat[0, 0] == 1.0
+    mat, _ = routine_matrix(date(2025, 7, 2), date(2025, 7, 1))
+    assert mat.shape == (0, 1)
+
+
+def test_routine_changes_reset_the_cache_through_the_data_version(engine):
+    rid = db.insert_routine("Gym", 1.0, 2, "2025-06-01")
+    start, end = date(2025, 6, 25), date(2025, 7, 6)
+    before, _ = routine_matrix(start, end)
+    assert engine._months
+
+    db.update_routine(rid, "Gym", 3.0, 7)
+    after, routines = routine_matrix(start, end)
+    assert routines[0]["hours"] == 3.0 and routines[0]["period_days"] == 7
+    np.testing.assert_allclose(after, occurrence_matrix(routines, start, end))
+    assert not np.allclose(before, after)
+
+    db.insert_routine("Read", 0.5, 1, "2025-01-01")
+    mat, routines = routine_matrix(start, end)
+    assert mat.shape == (12, 2)
+    np.testing.assert_allclose(mat, occurrence_matrix(routines, start, end))
+
+    db.delete_routine(rid)
+    mat, routines = routine_matrix(start, end)
+    assert [r["title"] for r in routines] == ["Read"]
+    np.testing.assert_allclose(mat[:, 0], 0.5)
+
+
+def test_daily_split_separates_sleep(engine):
+    db.insert_routine(routine_engine.SLEEP_TITLE, 7.0, 1, "2025-01-01")
+    db.insert_routine("Gym", 1.5, 2, "2025-01-01")
+    other, sleep = routine_engine.daily_split(date(2025, 1, 1), date(2025, 1, 4))
+    np.testing.assert_allclose(sleep, [7.0] * 4)
+    np.testing.assert_allclose(other, [1.5, 0.0, 1.5, 0.0])
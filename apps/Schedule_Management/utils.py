@@ -1,14 +1,158 @@
 # utils.py に追加/置換
 from datetime import datetime
-from zoneinfo import ZoneInfo
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import numpy as np
+import pandas as pd
 
 LONDON = ZoneInfo("Europe/London")
 UTC = ZoneInfo("UTC")
 
+# Windows のタイムゾーン名 → IANA（CLDR windowsZones.xml の territory="001"）
 WINDOWS_TZ_TO_IANA = {
-    "GMT Standard Time": "Europe/London",
+    "Dateline Standard Time": "Etc/GMT+12",
+    "UTC-11": "Etc/GMT+11",
+    "Aleutian Standard Time": "America/Adak",
+    "Hawaiian Standard Time": "Pacific/Honolulu",
+    "Marquesas Standard Time": "Pacific/Marquesas",
+    "Alaskan Standard Time": "America/Anchorage",
+    "UTC-09": "Etc/GMT+9",
+    "Pacific Standard Time (Mexico)": "America/Tijuana",
+    "UTC-08": "Etc/GMT+8",
+    "Pacific Standard Time": "America/Los_Angeles",
+    "US Mountain Standard Time": "America/Phoenix",
+    "Mountain Standard Time (Mexico)": "America/Mazatlan",
+    "Mountain Standard Time": "America/Denver",
+    "Yukon Standard Time": "America/Whitehorse",
+    "Central America Standard Time": "America/Guatemala",
+    "Central Standard Time": "America/Chicago",
+    "Easter Island Standard Time": "Pacific/Easter",
+    "Central Standard Time (Mexico)": "America/Mexico_City",
+    "Canada Central Standard Time": "America/Regina",
+    "SA Pacific Standard Time": "America/Bogota",
+    "Eastern Standard Time (Mexico)": "America/Cancun",
+    "Eastern Standard Time": "America/New_York",
+    "Haiti Standard Time": "America/Port-au-Prince",
+    "Cuba Standard Time": "America/Havana",
+    "US Eastern Standard Time": "America/Indiana/Indianapolis",
+    "Turks And Caicos Standard Time": "America/Grand_Turk",
+    "Paraguay Standard Time": "America/Asuncion",
+    "Atlantic Standard Time": "America/Halifax",
+    "Venezuela Standard Time": "America/Caracas",
+    "Central Brazilian Standard Time": "America/Cuiaba",
+    "SA Western Standard Time": "America/La_Paz",
+    "Pacific SA Standard Time": "America/Santiago",
+    "Newfoundland Standard Time": "America/St_Johns",
+    "Tocantins Standard Time": "America/Araguaina",
+    "E. South America Standard Time": "America/Sao_Paulo",
+    "SA Eastern Standard Time": "America/Cayenne",
+    "Argentina Standard Time": "America/Argentina/Buenos_Aires",
+    "Greenland Standard Time": "America/Nuuk",
+    "Montevideo Standard Time": "America/Montevideo",
+    "Magallanes Standard Time": "America/Punta_Arenas",
+    "Saint Pierre Standard Time": "America/Miquelon",
+    "Bahia Standard Time": "America/Bahia",
+    "UTC-02": "Etc/GMT+2",
+    "Mid-Atlantic Standard Time": "Etc/GMT+2",
+    "Azores Standard Time": "Atlantic/Azores",
+    "Cape Verde Standard Time": "Atlantic/Cape_Verde",
     "UTC": "UTC",
-    # 必要に応じて追加
+    "GMT Standard Time": "Europe/London",
+    "Greenwich Standard Time": "Atlantic/Reykjavik",
+    "Sao Tome Standard Time": "Africa/Sao_Tome",
+    "Morocco Standard Time": "Africa/Casablanca",
+    "W. Europe Standard Time": "Europe/Berlin",
+    "Central Europe Standard Time": "Europe/Budapest",
+    "Romance Standard Time": "Europe/Paris",
+    "Central European Standard Time": "Europe/Warsaw",
+    "W. Central Africa Standard Time": "Africa/Lagos",
+    "Jordan Standard Time": "Asia/Amman",
+    "GTB Standard Time": "Europe/Bucharest",
+    "Middle East Standard Time": "Asia/Beirut",
+    "Egypt Standard Time": "Africa/Cairo",
+    "E. Europe Standard Time": "Europe/Chisinau",
+    "Syria Standard Time": "Asia/Damascus",
+    "West Bank Standard Time": "Asia/Hebron",
+    "South Africa Standard Time": "Africa/Johannesburg",
+    "FLE Standard Time": "Europe/Kiev",
+    "Israel Standard Time": "Asia/Jerusalem",
+    "South Sudan Standard Time": "Africa/Juba",
+    "Kaliningrad Standard Time": "Europe/Kaliningrad",
+    "Sudan Standard Time": "Africa/Khartoum",
+    "Libya Standard Time": "Africa/Tripoli",
+    "Namibia Standard Time": "Africa/Windhoek",
+    "Arabic Standard Time": "Asia/Baghdad",
+    "Turkey Standard Time": "Europe/Istanbul",
+    "Arab Standard Time": "Asia/Riyadh",
+    "Belarus Standard Time": "Europe/Minsk",
+    "Russian Standard Time": "Europe/Moscow",
+    "E. Africa Standard Time": "Africa/Nairobi",
+    "Volgograd Standard Time": "Europe/Volgograd",
+    "Iran Standard Time": "Asia/Tehran",
+    "Arabian Standard Time": "Asia/Dubai",
+    "Astrakhan Standard Time": "Europe/Astrakhan",
+    "Azerbaijan Standard Time": "Asia/Baku",
+    "Russia Time Zone 3": "Europe/Samara",
+    "Mauritius Standard Time": "Indian/Mauritius",
+    "Saratov Standard Time": "Europe/Saratov",
+    "Georgian Standard Time": "Asia/Tbilisi",
+    "Caucasus Standard Time": "Asia/Yerevan",
+    "Armenian Standard Time": "Asia/Yerevan",
+    "Afghanistan Standard Time": "Asia/Kabul",
+    "West Asia Standard Time": "Asia/Tashkent",
+    "Qyzylorda Standard Time": "Asia/Qyzylorda",
+    "Ekaterinburg Standard Time": "Asia/Yekaterinburg",
+    "Pakistan Standard Time": "Asia/Karachi",
+    "India Standard Time": "Asia/Kolkata",
+    "Sri Lanka Standard Time": "Asia/Colombo",
+    "Nepal Standard Time": "Asia/Kathmandu",
+    "Central Asia Standard Time": "Asia/Bishkek",
+    "Bangladesh Standard Time": "Asia/Dhaka",
+    "Omsk Standard Time": "Asia/Omsk",
+    "Myanmar Standard Time": "Asia/Yangon",
+    "SE Asia Standard Time": "Asia/Bangkok",
+    "Altai Standard Time": "Asia/Barnaul",
+    "W. Mongolia Standard Time": "Asia/Hovd",
+    "North Asia Standard Time": "Asia/Krasnoyarsk",
+    "N. Central Asia Standard Time": "Asia/Novosibirsk",
+    "Tomsk Standard Time": "Asia/Tomsk",
+    "China Standard Time": "Asia/Shanghai",
+    "North Asia East Standard Time": "Asia/Irkutsk",
+    "Singapore Standard Time": "Asia/Singapore",
+    "W. Australia Standard Time": "Australia/Perth",
+    "Taipei Standard Time": "Asia/Taipei",
+    "Ulaanbaatar Standard Time": "Asia/Ulaanbaatar",
+    "Aus Central W. Standard Time": "Australia/Eucla",
+    "Transbaikal Standard Time": "Asia/Chita",
+    "Tokyo Standard Time": "Asia/Tokyo",
+    "North Korea Standard Time": "Asia/Pyongyang",
+    "Korea Standard Time": "Asia/Seoul",
+    "Yakutsk Standard Time": "Asia/Yakutsk",
+    "Cen. Australia Standard Time": "Australia/Adelaide",
+    "AUS Central Standard Time": "Australia/Darwin",
+    "E. Australia Standard Time": "Australia/Brisbane",
+    "AUS Eastern Standard Time": "Australia/Sydney",
+    "West Pacific Standard Time": "Pacific/Port_Moresby",
+    "Tasmania Standard Time": "Australia/Hobart",
+    "Vladivostok Standard Time": "Asia/Vladivostok",
+    "Lord Howe Standard Time": "Australia/Lord_Howe",
+    "Bougainville Standard Time": "Pacific/Bougainville",
+    "Russia Time Zone 10": "Asia/Srednekolymsk",
+    "Magadan Standard Time": "Asia/Magadan",
+    "Norfolk Standard Time": "Pacific/Norfolk",
+    "Sakhalin Standard Time": "Asia/Sakhalin",
+    "Central Pacific Standard Time": "Pacific/Guadalcanal",
+    "Russia Time Zone 11": "Asia/Kamchatka",
+    "Kamchatka Standard Time": "Asia/Kamchatka",
+    "New Zealand Standard Time": "Pacific/Auckland",
+    "UTC+12": "Etc/GMT-12",
+    "Fiji Standard Time": "Pacific/Fiji",
+    "Chatham Islands Standard Time": "Pacific/Chatham",
+    "UTC+13": "Etc/GMT-13",
+    "Tonga Standard Time": "Pacific/Tongatapu",
+    "Samoa Standard Time": "Pacific/Apia",
+    "Line Islands Standard Time": "Pacific/Kiritimati",
 }
 
 def _to_iana(tz_name: str | None) -> str:
@@ -19,6 +163,14 @@ def _to_iana(tz_name: str | None) -> str:
     # 既に IANA 形式（Europe/…）ならそのまま
     return tz_name
 
+@lru_cache(maxsize=None)
+def _zone(tz_name: str | None) -> ZoneInfo:
+    """名前ごとに ZoneInfo を 1 回だけ作る。表に無く IANA としても解釈できない名前は UTC"""
+    try:
+        return ZoneInfo(_to_iana(tz_name))
+    except (ZoneInfoNotFoundError, ValueError):
+        return UTC
+
 def graph_dt_to_london(dt_dict_or_str) -> datetime | None:
     """
     Graph の {'dateTime': '...', 'timeZone': '...'} あるいは dateTime 文字列を
@@ -45,7 +197,7 @@ def graph_dt_to_london(dt_dict_or_str) -> datetime | None:
 
     # 2) tz_hint がある（Windows/IANA） → そのゾーンとして解釈
     if tz_hint:
-        zone = ZoneInfo(_to_iana(tz_hint))
+        zone = _zone(tz_hint)
         dt_any = datetime.fromisoformat(dt_str)
         if dt_any.tzinfo is None:
             dt_any = dt_any.replace(tzinfo=zone)
@@ -59,5 +211,48 @@ def graph_dt_to_london(dt_dict_or_str) -> datetime | None:
         dt_any = dt_any.replace(tzinfo=LONDON)
     return dt_any.astimezone(LONDON)
 
+def graph_dts_to_london(values) -> pd.Series:
+    """
+    graph_dt_to_london のベクトル版。Graph の start/end（dict または文字列）のリスト/Series を
+    ロンドン時間の tz-aware な Series にまとめて変換する（解釈できない値は NaT）。
+    文字列のパースはタイムゾーンごとに 1 回の pd.to_datetime で行う。
+    """
+    index = values.index if isinstance(values, pd.Series) else None
+    strs, hints = [], []
+    for v in values:
+        if isinstance(v, dict):
+            strs.append(v.get("dateTime"))
+            hints.append(v.get("timeZone"))
+        else:
+            strs.append(v)
+            hints.append(None)
+    df = pd.DataFrame({"s": pd.Series(strs, dtype=object), "tz": pd.Series(hints, dtype=object)})
+    if index is not None:
+        df.index = index
+    out = pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns, Europe/London]")
+    if df.empty:
+        return out
+
+    s = df["s"].astype("string")
+    tz = df["tz"].fillna("")
+    # 'Z' / オフセット付き / 明示 UTC はそのまま UTC として解釈
+    aware = s.str.endswith("Z", na=False) | s.str.contains(r"[+-]\d\d:?\d\d$", na=False) | (tz.str.upper() == "UTC")
+    if aware.any():
+        out[aware] = pd.to_datetime(s[aware], utc=True, format="ISO8601", errors="coerce").dt.tz_convert(LONDON.key)
+
+    # 素の日時はヒントのゾーン（無ければ London）で解釈
+    naive = ~aware & s.notna()
+    for hint, idx in df[naive].groupby(tz[naive]).groups.items():
+        zone = _zone(hint) if hint else LONDON
+        parsed = pd.to_datetime(s[idx], format="ISO8601", errors="coerce")
+        out[idx] = parsed.dt.tz_localize(
+            zone.key, ambiguous=np.ones(len(parsed), dtype=bool), nonexistent="shift_forward"
+        ).dt.tz_convert(LONDON.key)
+    return out
+
 def fmt_ymdhm(dt: datetime | None) -> str:
     return dt.strftime("%Y-%m-%d %H:%M") if dt else "-"
+
+def hhmm_to_minutes(hhmm: str) -> int:
+    h, m = hhmm.split(":")[:2]
+    return int(h)*60 + int(m)